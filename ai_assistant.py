@@ -3,16 +3,330 @@ AI Assistant Service for Food Tracker
 Provides nutrition analysis, suggestions, and recommendations
 """
 
+import operator
+import os
+import re
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from db_service import DatabaseService
+from nutrient_index import NutrientDensityIndex
+from llm_backends import LLMBackend
+
+
+# Recommended daily values (approximate for average adult)
+NUTRITION_TARGETS = {
+    'calories': {'min': 1800, 'max': 2400},
+    'protein': {'min': 50, 'max': 175},  # 10-35% of calories
+    'carbs': {'min': 225, 'max': 325},   # 45-65% of calories
+    'fat': {'min': 44, 'max': 78},       # 20-35% of calories
+    'fiber': {'min': 25, 'max': 38}      # 25g women, 38g men
+}
+
+# Declarative suggestion rules, evaluated in order for each day.
+# Each rule reads one metric and fires the first branch whose `when` condition
+# matches (a branch without `when` is the fallback). Branches that carry a
+# recommendation are reported as suggestions, the others as insights.
+# Messages are formatted with `value` (the rounded metric) and `threshold`.
+SUGGESTION_RULES = [
+    {
+        'category': 'calories',
+        'metric': 'calories',
+        'branches': [
+            {
+                'when': ('<', NUTRITION_TARGETS['calories']['min']),
+                'type': 'warning',
+                'message': 'Your calorie intake ({value} kcal) is below the recommended minimum of {threshold} kcal.',
+                'recommendation': 'Consider adding nutrient-dense foods like nuts, avocados, or whole grains to meet your energy needs.'
+            },
+            {
+                'when': ('>', NUTRITION_TARGETS['calories']['max']),
+                'type': 'info',
+                'message': 'Your calorie intake ({value} kcal) exceeds the typical recommendation of {threshold} kcal.',
+                'recommendation': 'Monitor portion sizes and consider reducing high-calorie processed foods if weight management is a goal.'
+            },
+            {
+                'type': 'success',
+                'message': 'Great! Your calorie intake ({value} kcal) is within the recommended range.'
+            }
+        ]
+    },
+    {
+        'category': 'protein',
+        'metric': 'protein',
+        'branches': [
+            {
+                'when': ('<', NUTRITION_TARGETS['protein']['min']),
+                'type': 'warning',
+                'message': 'Your protein intake ({value}g) is below the recommended minimum.',
+                'recommendation': 'Add protein-rich foods like lentils, chickpeas, tofu, eggs, or Greek yogurt to your meals.'
+            },
+            {
+                'type': 'success',
+                'message': 'Excellent protein intake ({value}g)! Protein helps with muscle maintenance and satiety.'
+            }
+        ]
+    },
+    {
+        'category': 'fiber',
+        'metric': 'fiber',
+        'branches': [
+            {
+                'when': ('<', NUTRITION_TARGETS['fiber']['min']),
+                'type': 'warning',
+                'message': 'Your fiber intake ({value}g) is below the recommended {threshold}g.',
+                'recommendation': 'Increase fiber by eating more vegetables, fruits, whole grains, and legumes. Fiber aids digestion and heart health.'
+            },
+            {
+                'type': 'success',
+                'message': 'Great fiber intake ({value}g)! This supports digestive health.'
+            }
+        ]
+    },
+    {
+        'category': 'balance',
+        'metric': 'carbs_percent',
+        'branches': [
+            {
+                'when': ('>', 70),
+                'type': 'info',
+                'message': 'Your diet is high in carbohydrates ({value}% of calories).',
+                'recommendation': 'Consider balancing with more protein and healthy fats for sustained energy.'
+            }
+        ]
+    },
+    {
+        'category': 'balance',
+        'metric': 'fat_percent',
+        'branches': [
+            {
+                'when': ('<', 20),
+                'type': 'info',
+                'message': 'Your fat intake is relatively low ({value}% of calories).',
+                'recommendation': 'Include healthy fats from sources like nuts, seeds, olive oil, and avocados for better nutrient absorption.'
+            }
+        ]
+    },
+    {
+        'category': 'frequency',
+        'metric': 'meal_count',
+        'branches': [
+            {
+                'when': ('<', 2),
+                'type': 'info',
+                'message': 'You logged fewer than 2 meals today.',
+                'recommendation': 'Regular meals help maintain stable energy levels. Aim for 3 balanced meals or 2-3 main meals with healthy snacks.'
+            }
+        ]
+    }
+]
+
+_OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge
+}
+
+
+def compile_rules(rules: List[Dict]) -> Tuple:
+    """Compile the rule table into (metric, category, branches) tuples"""
+    compiled = []
+    
+    for rule in rules:
+        branches = []
+        for branch in rule['branches']:
+            when = branch.get('when')
+            test, threshold = (_OPERATORS[when[0]], when[1]) if when else (None, None)
+            bucket = 'suggestions' if 'recommendation' in branch else 'insights'
+            branches.append((test, threshold, bucket, branch['type'],
+                             branch['message'], branch.get('recommendation')))
+        compiled.append((rule['metric'], rule['category'], tuple(branches)))
+    
+    return tuple(compiled)
+
+
+COMPILED_RULES = compile_rules(SUGGESTION_RULES)
+
+
+def day_metrics(summary: Dict) -> Dict:
+    """Derive the metrics the rule table reads from a daily summary row"""
+    total_cals = summary['total_calories'] or 1
+    
+    return {
+        'calories': summary['total_calories'],
+        'protein': summary['total_protein'],
+        'carbs': summary['total_carbs'],
+        'fat': summary['total_fat'],
+        'fiber': summary['total_fiber'],
+        'meal_count': summary['meal_count'],
+        'protein_percent': (summary['total_protein'] * 4 / total_cals) * 100,
+        'carbs_percent': (summary['total_carbs'] * 4 / total_cals) * 100,
+        'fat_percent': (summary['total_fat'] * 9 / total_cals) * 100
+    }
+
+
+def evaluate_rules(date: str, summary: Dict, meal_types: List[str], rules: Tuple = COMPILED_RULES) -> Dict:
+    """Evaluate the compiled rule table against one day's summary"""
+    metrics = day_metrics(summary)
+    result = {'suggestions': [], 'insights': []}
+    
+    for metric, category, branches in rules:
+        value = metrics[metric]
+        for test, threshold, bucket, kind, message, recommendation in branches:
+            if test is not None and not test(value, threshold):
+                continue
+            
+            entry = {
+                'type': kind,
+                'category': category,
+                'message': message.format(value=round(value), threshold=threshold)
+            }
+            if recommendation:
+                entry['recommendation'] = recommendation
+            result[bucket].append(entry)
+            break
+    
+    # Variety analysis
+    result['insights'].append({
+        'type': 'info',
+        'category': 'variety',
+        'message': f'You logged {summary["meal_count"]} meal(s) across {len(meal_types)} meal type(s): {", ".join(meal_types)}.'
+    })
+    
+    return {
+        'date': date,
+        'summary': summary,
+        'suggestions': result['suggestions'],
+        'insights': result['insights'],
+        'macroBreakdown': {
+            'protein': {'grams': round(summary['total_protein']), 'percent': round(metrics['protein_percent'])},
+            'carbs': {'grams': round(summary['total_carbs']), 'percent': round(metrics['carbs_percent'])},
+            'fat': {'grams': round(summary['total_fat']), 'percent': round(metrics['fat_percent'])}
+        }
+    }
+
+
+# Token budget for the server-built context in chat prompts; sections that
+# don't fit are dropped, least important first
+CONTEXT_TOKEN_BUDGET = int(os.getenv('AI_CONTEXT_TOKEN_BUDGET', 250))
+
+# Dates whose chat context is kept in memory
+CONTEXT_CACHE_SIZE = 64
+
+# Most frequent foods listed in the chat context
+TOP_FOODS = 5
+
+CHAT_PREAMBLE = 'You are a helpful nutrition assistant.'
+
+CHAT_INSTRUCTIONS = ('Provide concise, helpful nutrition advice. Keep responses under 100 words '
+                     'unless detailed analysis is requested. Use a friendly, encouraging tone.')
+
+
+def food_name(description: str) -> str:
+    """Meal description without its trailing quantity, e.g. 'idli (2.5 servings)' -> 'idli'"""
+    return re.sub(r'\s*\([^)]*\)\s*$', '', description).strip()
+
+
+def today_section(date: str, summary: Dict) -> str:
+    """Chat context line for one day's totals"""
+    s = summary
+    return (f"Today ({date}) the user has logged {s.get('meal_count', 0)} meals with "
+            f"{round(s.get('total_calories') or 0)} calories, {round(s.get('total_protein') or 0)}g protein, "
+            f"{round(s.get('total_carbs') or 0)}g carbs, {round(s.get('total_fat') or 0)}g fat, "
+            f"and {round(s.get('total_fiber') or 0)}g fiber.")
 
 
 class AIAssistantService:
     """AI-powered nutrition assistant"""
     
-    def __init__(self, db_service: DatabaseService):
+    def __init__(self, db_service: DatabaseService, llm: Optional[LLMBackend] = None):
         self.db = db_service
+        self.llm = llm
+        self.nutrient_index = NutrientDensityIndex(db_service)
+        db_service.add_change_listener(self.nutrient_index.handle_change)
+        self._context_lock = threading.Lock()
+        self._contexts = OrderedDict()
+    
+    # ============= CHAT CONTEXT =============
+    
+    def get_chat_context(self, date: str) -> Dict:
+        """Chat context sections for a date, most important first.
+        
+        Built from the daily_summary rollups and the suggestion rules, and
+        cached until the meal change log moves on, so repeated questions
+        cost one indexed lookup.
+        """
+        version = self.db.get_change_log_head()
+        with self._context_lock:
+            cached = self._contexts.get(date)
+            if cached and cached['version'] == version:
+                self._contexts.move_to_end(date)
+                return cached
+        
+        with self.db.read_snapshot():
+            context = self._build_chat_context(date)
+        context['version'] = version
+        
+        with self._context_lock:
+            self._contexts[date] = context
+            self._contexts.move_to_end(date)
+            while len(self._contexts) > CONTEXT_CACHE_SIZE:
+                self._contexts.popitem(last=False)
+        return context
+    
+    def _build_chat_context(self, date: str) -> Dict:
+        day = datetime.strptime(date, '%Y-%m-%d')
+        suggestions = self.generate_suggestions(date)
+        summary = suggestions['summary']
+        sections = [today_section(date, summary)]
+        
+        if summary['meal_count'] and suggestions['suggestions']:
+            sections.append('Flagged today: ' + ' '.join(s['message'] for s in suggestions['suggestions']))
+        
+        for days in (7, 30):
+            start = (day - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+            averages = self.db.get_average_summary(start, date)
+            if averages['days']:
+                sections.append(
+                    f"Over the last {days} days ({averages['days']} logged) the daily average was "
+                    f"{round(averages['calories'])} calories, {round(averages['protein'])}g protein, "
+                    f"{round(averages['carbs'])}g carbs, {round(averages['fat'])}g fat "
+                    f"and {round(averages['fiber'])}g fiber."
+                )
+        
+        start = (day - timedelta(days=29)).strftime('%Y-%m-%d')
+        foods = {}
+        for row in self.db.get_meal_description_counts(start, date):
+            name = food_name(row['description'])
+            foods[name] = foods.get(name, 0) + row['count']
+        if foods:
+            top = sorted(foods.items(), key=lambda item: (-item[1], item[0]))[:TOP_FOODS]
+            sections.append('Most logged foods recently: ' + ', '.join(f'{name} ({count}x)' for name, count in top) + '.')
+        
+        return {'date': date, 'summary': summary, 'sections': sections}
+    
+    @staticmethod
+    def summary_chat_context(date: str, summary: Optional[Dict]) -> Dict:
+        """Chat context from a client-supplied summary, when the database is unavailable"""
+        return {'date': date, 'summary': summary, 'sections': [today_section(date, summary)] if summary else []}
+    
+    def build_chat_prompt(self, message: str, context: Dict, token_budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+        """Prompt for a chat question with as many context sections as fit the token budget"""
+        count_tokens = self.llm.count_tokens if self.llm else lambda text: (len(text) + 3) // 4
+        
+        parts = [CHAT_PREAMBLE]
+        used = 0
+        for section in context['sections']:
+            tokens = count_tokens(section)
+            if used + tokens > token_budget:
+                break
+            parts.append(section)
+            used += tokens
+        parts.append(CHAT_INSTRUCTIONS)
+        
+        return f"{' '.join(parts)}\n\nUser question: {message}\n\nResponse:"
     
     def analyze_nutrition_pattern(self, start_date: str, end_date: str) -> Dict:
         """Analyze user's nutrition patterns over a date range"""
@@ -53,172 +367,54 @@ class AIAssistantService:
     def generate_suggestions(self, date: str) -> Dict:
         """Generate nutrition suggestions based on WHO/USDA guidelines"""
         summary = self.db.get_daily_summary(date)
-        meals = self.db.get_meals_by_date(date)
+        meal_types = self.db.get_meal_types_by_date_range(date, date).get(date, [])
         
-        suggestions = []
-        insights = []
-        
-        # Recommended daily values (approximate for average adult)
-        targets = {
-            'calories': {'min': 1800, 'max': 2400},
-            'protein': {'min': 50, 'max': 175},  # 10-35% of calories
-            'carbs': {'min': 225, 'max': 325},   # 45-65% of calories
-            'fat': {'min': 44, 'max': 78},       # 20-35% of calories
-            'fiber': {'min': 25, 'max': 38}      # 25g women, 38g men
-        }
-        
-        # Analyze calories
-        if summary['total_calories'] < targets['calories']['min']:
-            suggestions.append({
-                'type': 'warning',
-                'category': 'calories',
-                'message': f'Your calorie intake ({round(summary["total_calories"])} kcal) is below the recommended minimum of {targets["calories"]["min"]} kcal.',
-                'recommendation': 'Consider adding nutrient-dense foods like nuts, avocados, or whole grains to meet your energy needs.'
-            })
-        elif summary['total_calories'] > targets['calories']['max']:
-            suggestions.append({
-                'type': 'info',
-                'category': 'calories',
-                'message': f'Your calorie intake ({round(summary["total_calories"])} kcal) exceeds the typical recommendation of {targets["calories"]["max"]} kcal.',
-                'recommendation': 'Monitor portion sizes and consider reducing high-calorie processed foods if weight management is a goal.'
-            })
-        else:
-            insights.append({
-                'type': 'success',
-                'category': 'calories',
-                'message': f'Great! Your calorie intake ({round(summary["total_calories"])} kcal) is within the recommended range.'
-            })
-        
-        # Analyze protein
-        if summary['total_protein'] < targets['protein']['min']:
-            suggestions.append({
-                'type': 'warning',
-                'category': 'protein',
-                'message': f'Your protein intake ({round(summary["total_protein"])}g) is below the recommended minimum.',
-                'recommendation': 'Add protein-rich foods like lentils, chickpeas, tofu, eggs, or Greek yogurt to your meals.'
-            })
-        elif summary['total_protein'] >= targets['protein']['min']:
-            insights.append({
-                'type': 'success',
-                'category': 'protein',
-                'message': f'Excellent protein intake ({round(summary["total_protein"])}g)! Protein helps with muscle maintenance and satiety.'
-            })
-        
-        # Analyze fiber
-        if summary['total_fiber'] < targets['fiber']['min']:
-            suggestions.append({
-                'type': 'warning',
-                'category': 'fiber',
-                'message': f'Your fiber intake ({round(summary["total_fiber"])}g) is below the recommended {targets["fiber"]["min"]}g.',
-                'recommendation': 'Increase fiber by eating more vegetables, fruits, whole grains, and legumes. Fiber aids digestion and heart health.'
-            })
-        else:
-            insights.append({
-                'type': 'success',
-                'category': 'fiber',
-                'message': f'Great fiber intake ({round(summary["total_fiber"])}g)! This supports digestive health.'
-            })
-        
-        # Analyze macronutrient balance
-        total_cals = summary['total_calories'] or 1
-        protein_percent = (summary['total_protein'] * 4 / total_cals) * 100
-        carbs_percent = (summary['total_carbs'] * 4 / total_cals) * 100
-        fat_percent = (summary['total_fat'] * 9 / total_cals) * 100
-        
-        if carbs_percent > 70:
-            suggestions.append({
-                'type': 'info',
-                'category': 'balance',
-                'message': f'Your diet is high in carbohydrates ({round(carbs_percent)}% of calories).',
-                'recommendation': 'Consider balancing with more protein and healthy fats for sustained energy.'
-            })
+        return evaluate_rules(date, summary, meal_types)
+    
+    def analyze_range(self, start_date: str, end_date: str) -> Dict:
+        """Generate suggestions for every date in a range using two bulk queries"""
+        start = datetime.strptime(start_date, '%Y-%m-%d')
+        end = datetime.strptime(end_date, '%Y-%m-%d')
         
-        if fat_percent < 20:
-            suggestions.append({
-                'type': 'info',
-                'category': 'balance',
-                'message': f'Your fat intake is relatively low ({round(fat_percent)}% of calories).',
-                'recommendation': 'Include healthy fats from sources like nuts, seeds, olive oil, and avocados for better nutrient absorption.'
-            })
+        if end < start:
+            raise ValueError('endDate must not be before startDate')
         
-        # Meal frequency analysis
-        if summary['meal_count'] < 2:
-            suggestions.append({
-                'type': 'info',
-                'category': 'frequency',
-                'message': 'You logged fewer than 2 meals today.',
-                'recommendation': 'Regular meals help maintain stable energy levels. Aim for 3 balanced meals or 2-3 main meals with healthy snacks.'
-            })
+        summaries = {row['date']: row for row in self.db.get_weekly_summary(start_date, end_date)}
+        meal_types = self.db.get_meal_types_by_date_range(start_date, end_date)
         
-        # Variety analysis
-        meal_types = list(set(meal['mealType'] for meal in meals))
-        insights.append({
-            'type': 'info',
-            'category': 'variety',
-            'message': f'You logged {summary["meal_count"]} meal(s) across {len(meal_types)} meal type(s): {", ".join(meal_types)}.'
-        })
+        days = []
+        current = start
+        while current <= end:
+            date = current.strftime('%Y-%m-%d')
+            summary = summaries.get(date) or self.db.empty_daily_summary(date)
+            days.append(evaluate_rules(date, summary, meal_types.get(date, [])))
+            current += timedelta(days=1)
         
         return {
-            'date': date,
-            'summary': summary,
-            'suggestions': suggestions,
-            'insights': insights,
-            'macroBreakdown': {
-                'protein': {'grams': round(summary['total_protein']), 'percent': round(protein_percent)},
-                'carbs': {'grams': round(summary['total_carbs']), 'percent': round(carbs_percent)},
-                'fat': {'grams': round(summary['total_fat']), 'percent': round(fat_percent)}
-            }
+            'startDate': start_date,
+            'endDate': end_date,
+            'days': days
         }
     
-    def get_food_recommendations(self, deficient_nutrients: List[str]) -> Dict:
-        """Get specific food recommendations for deficient nutrients"""
-        recommendations = {
-            'protein': [
-                'Lentils (toor dal, moong dal) - excellent protein source',
-                'Chickpeas (chana) - versatile and protein-rich',
-                'Paneer - Indian cottage cheese, high in protein',
-                'Greek yogurt or hung curd - probiotic-rich protein',
-                'Eggs - complete protein with all essential amino acids',
-                'Tofu or soy products - plant-based complete protein'
-            ],
-            'fiber': [
-                'Whole wheat chapati instead of white rice',
-                'Oats upma or dalia for breakfast',
-                'Mixed vegetable sabzi with leafy greens',
-                'Fresh fruits like apple, pear, or guava',
-                'Brown rice or quinoa instead of white rice',
-                'Sprouts (moong, chana) - fiber and protein rich'
-            ],
-            'calories': [
-                'Nuts and seeds (almonds, walnuts, pumpkin seeds)',
-                'Ghee or coconut oil in moderation',
-                'Banana or dates for natural energy',
-                'Whole grain bread with nut butter',
-                'Smoothie with banana, oats, and milk',
-                'Energy balls made with dates and nuts'
-            ],
-            'fat': [
-                'Avocado or avocado toast',
-                'Nuts (almonds, cashews, walnuts)',
-                'Seeds (chia, flax, pumpkin)',
-                'Olive oil or coconut oil for cooking',
-                'Fatty fish like salmon (if non-vegetarian)',
-                'Nut butters (peanut, almond)'
-            ],
-            'carbs': [
-                'Whole grains (brown rice, quinoa, oats)',
-                'Sweet potato or regular potato',
-                'Whole wheat bread or chapati',
-                'Fruits (banana, mango, apple)',
-                'Legumes (rajma, chole)',
-                'Idli or dosa made from whole grains'
-            ]
+    def get_food_recommendations(self, deficient_nutrients: List[str],
+                                 gaps: Optional[Dict[str, float]] = None, limit: int = 5) -> Dict:
+        """Get catalog foods that best close the gap for each deficient nutrient.
+        
+        Gaps default to the recommended daily minimum for each nutrient. When more
+        than one nutrient is requested, a `combined` ranking is included as well.
+        """
+        gaps = {
+            nutrient: (gaps or {}).get(nutrient, NUTRITION_TARGETS[nutrient]['min'])
+            for nutrient in deficient_nutrients
+            if nutrient in NUTRITION_TARGETS
         }
         
         result = {}
-        for nutrient in deficient_nutrients:
-            if nutrient in recommendations:
-                result[nutrient] = recommendations[nutrient]
+        for nutrient in gaps:
+            result[nutrient] = self.nutrient_index.top_k([nutrient], gaps, limit)
+        
+        if len(gaps) > 1:
+            result['combined'] = self.nutrient_index.top_k(list(gaps), gaps, limit)
         
         return result
     
@@ -0,0 +1,172 @@
+"""
+AI Response Cache for Food Tracker
+SQLite-backed cache of AI chat answers with single-flight request coalescing
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from db_service import DatabaseService
+
+
+# Cached answers older than this are regenerated
+TTL_SECONDS = float(os.getenv('AI_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+
+# Most answers kept; the least recently used are evicted first
+MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', 5000))
+
+# Eviction runs on the first new entry and then every this many
+EVICT_EVERY = 50
+
+# Hit counts and last-used times are written back in one transaction once
+# this many entries have pending hits, or HIT_FLUSH_SECONDS after the last
+# write, rather than with an UPDATE under the write lock on every hit
+HIT_FLUSH_EVERY = 100
+HIT_FLUSH_SECONDS = 30.0
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase the message and drop punctuation and repeated whitespace"""
+    return ' '.join(re.findall(r'\w+', message.lower()))
+
+
+class AIResponseCache:
+    """Persistent AI response cache.
+    
+    Answers survive restarts and are shared by every server process through
+    the database. Within a process, concurrent requests for the same key wait
+    for one model call instead of each making their own.
+    """
+    
+    def __init__(self, db_service: DatabaseService, ttl: float = TTL_SECONDS,
+                 max_entries: int = MAX_ENTRIES):
+        self.db = db_service
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._inserts = 0
+        self._pending_hits = {}
+        self._flushed_at = time.time()
+        self._counts = {'hits': 0, 'misses': 0, 'coalesced': 0, 'evicted': 0}
+    
+    @staticmethod
+    def make_key(message: str, sections: Sequence[str] = ()) -> str:
+        """Cache key for a chat message asked with the given context sections.
+        
+        The sections are the text the prompt is built from (today's totals,
+        the 7 and 30 day averages, recent foods), so an answer is only reused
+        while everything the model was shown is unchanged.
+        """
+        parts = [normalize_message(message)] + list(sections)
+        return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Fresh cached response for key, or None, counted as a hit or miss"""
+        now = time.time()
+        response = self.db.get_ai_cached_response(key, now - self.ttl)
+        if response is None:
+            with self._lock:
+                self._counts['misses'] += 1
+        else:
+            self._hit(key, now)
+        return response
+    
+    def get_or_compute(self, key: str, message: str, compute: Callable[[], str]) -> Tuple[str, bool]:
+        """(response, cached) for key, calling compute on a miss.
+        
+        Exceptions from compute are raised to every request waiting on it and
+        nothing is cached.
+        """
+        now = time.time()
+        response = self.db.get_ai_cached_response(key, now - self.ttl)
+        if response is not None:
+            self._hit(key, now)
+            return response, True
+        
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+                self._counts['misses'] += 1
+            else:
+                self._counts['coalesced'] += 1
+        
+        if not leader:
+            return future.result(), True
+        
+        try:
+            response = compute()
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            self.store(key, message, response)
+            future.set_result(response)
+            return response, False
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+    
+    def _hit(self, key: str, now: float):
+        """Count a hit, writing pending hits back when enough have built up"""
+        with self._lock:
+            self._counts['hits'] += 1
+            _, count = self._pending_hits.get(key, (now, 0))
+            self._pending_hits[key] = (now, count + 1)
+            flush = len(self._pending_hits) >= HIT_FLUSH_EVERY or now - self._flushed_at >= HIT_FLUSH_SECONDS
+        if flush:
+            self.flush_hits()
+    
+    def flush_hits(self):
+        """Write pending hit counts and last-used times to the database.
+        
+        Hits still pending when the process exits are lost; they only steer
+        which entries eviction keeps.
+        """
+        with self._lock:
+            hits, self._pending_hits = self._pending_hits, {}
+            self._flushed_at = time.time()
+        if not hits:
+            return
+        try:
+            self.db.record_ai_cache_hits(hits)
+        except Exception as error:
+            print(f'Error recording AI cache hits: {error}')
+    
+    def store(self, key: str, message: str, response: str):
+        """Cache a response, evicting old entries every EVICT_EVERY inserts"""
+        now = time.time()
+        try:
+            self.db.put_ai_cached_response(key, message, response, now)
+            
+            with self._lock:
+                self._inserts += 1
+                evict = (self._inserts - 1) % EVICT_EVERY == 0
+            if evict:
+                # Eviction keeps the most recently used entries, so it needs current use times
+                self.flush_hits()
+                evicted = self.db.evict_ai_cached_responses(now - self.ttl, self.max_entries)
+                with self._lock:
+                    self._counts['evicted'] += evicted
+        except Exception as error:
+            print(f'Error caching AI response: {error}')
+    
+    def metrics(self) -> Dict:
+        """Hit, miss and coalesced request counts, hit rate and cache size"""
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts['hits'] + counts['misses'] + counts['coalesced']
+        return {
+            **counts,
+            'hitRate': round((counts['hits'] + counts['coalesced']) / lookups, 4) if lookups else None,
+            'entries': self.db.count_ai_cached_responses(),
+            'maxEntries': self.max_entries,
+            'ttlSeconds': self.ttl
+        }
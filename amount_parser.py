@@ -0,0 +1,64 @@
+"""
+Amount Parser for Food Tracker
+Parses recipe ingredient amount strings and scales measurement nutrition
+"""
+
+import math
+import re
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+
+# The web UI stores amounts as "<quantity>x <measurement>", e.g. "1.33x 1 cup uncooked"
+_AMOUNT_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?|\.\d+|\d+\s*/\s*\d+)\s*[x×]\s*(.+?)\s*$', re.IGNORECASE)
+
+
+@lru_cache(maxsize=4096)
+def measurement_slug(measurement: str) -> str:
+    """Canonical form of a measurement key or its display text.
+    
+    "1_cup_uncooked", "1 cup uncooked" and "1  cup uncooked" all map to the
+    same slug, as do "100g" and "100 g".
+    """
+    return re.sub(r'[\s_]+', '', measurement.lower())
+
+
+def parse_amount(amount: str) -> Optional[Tuple[float, str]]:
+    """Parse "<quantity>x <measurement>" into (quantity, measurement slug)"""
+    match = _AMOUNT_PATTERN.match(amount or '')
+    if not match:
+        return None
+    
+    quantity_text, measurement = match.groups()
+    if '/' in quantity_text:
+        numerator, denominator = (float(part) for part in quantity_text.split('/'))
+        if denominator == 0:
+            return None
+        quantity = numerator / denominator
+    else:
+        quantity = float(quantity_text)
+    
+    return quantity, measurement_slug(measurement)
+
+
+def scale_nutrition(nutrition: Dict, quantity: float) -> Dict:
+    """Multiply every value of a nutrition dict by a quantity"""
+    return {n: (value or 0) * quantity for n, value in nutrition.items()}
+
+
+def _js_round(value: float, digits: int = 0) -> float:
+    """Round half up like JavaScript's Math.round, which the web UI uses"""
+    factor = 10 ** digits
+    return math.floor(value * factor + 0.5) / factor
+
+
+def per_serving(totals: Dict, servings: int) -> Dict:
+    """Per-serving nutrition rounded the same way the web UI saves recipes"""
+    servings = servings or 1
+    return {
+        'calories': _js_round(totals['calories'] / servings),
+        'protein': _js_round(totals['protein'] / servings, 1),
+        'carbs': _js_round(totals['carbs'] / servings, 1),
+        'fat': _js_round(totals['fat'] / servings, 1),
+        'fiber': _js_round(totals['fiber'] / servings, 1)
+    }
@@ -4,75 +4,262 @@ A REST API for tracking food intake, nutrition, and recipes
 """
 
 import os
-from flask import Flask, request, jsonify, send_from_directory
-from flask_cors import CORS
-from datetime import datetime
-import google.generativeai as genai
-from db_service import DatabaseService
-from ai_assistant import AIAssistantService
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
+from typing import Optional
+from startup import Startup
+
+# Created first so every import below is timed; each app's start-up profile
+# begins with these steps
+imports = Startup()
+
+with imports.step('import flask'):
+    from flask import (Flask, Blueprint, current_app, request, jsonify, send_from_directory,
+                       Response, stream_with_context)
+    from flask.json.provider import DefaultJSONProvider
+    from flask_cors import CORS
+    from dotenv import load_dotenv
+    from werkzeug.local import LocalProxy
+
+# Load environment variables from .env file (before the services read their settings)
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
+with imports.step('import database'):
+    from datetime import datetime
+    from concurrent.futures import TimeoutError as FutureTimeout
+    from db_service import DatabaseService, NUTRIENTS, SEARCH_TYPES
+    import json_codec
 
-# Configure max request size
-app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB
+with imports.step('import catalog services'):
+    from ai_assistant import AIAssistantService
+    from meal_planner import MealPlanner
+    from nutrition_calculator import NutritionCalculator, MAX_LINES
+    from meal_parser import MealParser, MAX_TEXT_LENGTH
+    from autocomplete import AutocompleteIndex
 
-# Initialize Gemini AI
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', 'YOUR_API_KEY_HERE')
-gemini_model = None
+with imports.step('import AI services'):
+    from llm_executor import LLMExecutor, Overloaded
+    from llm_backends import create_backend
+    from ai_cache import AIResponseCache
 
-if GEMINI_API_KEY and GEMINI_API_KEY != 'YOUR_API_KEY_HERE':
-    try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        gemini_model = genai.GenerativeModel('gemini-pro')
-        print('✅ Gemini AI initialized')
-    except Exception as error:
-        print(f'❌ Failed to initialize Gemini AI: {error}')
-        gemini_model = None
-else:
-    print('⚠️  Gemini API key not set. AI chat will use fallback responses.')
-    print('   Set GEMINI_API_KEY environment variable to enable AI chat.')
+with imports.step('import web helpers'):
+    from events import EventBroker, RETRY_MS, TooManySubscribers, format_event
 
-# Initialize database service
-db = DatabaseService()
-ai_assistant = AIAssistantService(db)
 
-# Database connection flag
-db_connected = False
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by json_codec (orjson when installed)"""
+    
+    def dumps(self, obj, **kwargs):
+        return json_codec.dumps(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys),
+                                default=kwargs.get('default', self.default))
+    
+    def loads(self, s, **kwargs):
+        return json_codec.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Pretty-printed debug output keeps Flask's own formatting
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        
+        obj = self._prepare_response_obj(args, kwargs)
+        body = json_codec.dumps_bytes(obj, sort_keys=self.sort_keys, default=self.default)
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
 
 
-def initialize_database():
-    """Initialize database connection"""
-    global db_connected
-    try:
-        db.connect()
-        db_connected = True
-        print('✅ Database service initialized')
-    except Exception as error:
-        print(f'❌ Failed to initialize database: {error}')
-        db_connected = False
-        raise
+api = Blueprint('api', __name__)
+
+# Directory the web interface and other static files are served from
+STATIC_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Key of each app's Services in app.extensions
+EXTENSION = 'food_tracker'
+
+# Longest a request waits for a subsystem that is still starting up
+STARTUP_WAIT_SECONDS = 10
+
+# Longest date range accepted by /api/ai/analyze-range
+MAX_ANALYSIS_RANGE_DAYS = 366
+
+# Default and maximum search time for /api/ai/plan
+PLAN_BUDGET_MS = 50
+MAX_PLAN_BUDGET_MS = 1000
+
+# Largest page size for /api/search
+MAX_SEARCH_LIMIT = 100
+
+# Largest number of suggestions from /api/autocomplete
+MAX_AUTOCOMPLETE_LIMIT = 50
+
+# Largest number of sub-requests in one /api/batch call
+MAX_BATCH_OPERATIONS = 500
+
+# Paths a transactional /api/batch refuses: these call the AI backend or move
+# whole files, and the batch holds the database write lock while they run
+SLOW_BATCH_PATHS = ('/api/ai/', '/api/import-json', '/api/export-excel', '/api/download-db')
+
+
+class Services:
+    """The database, indexes, caches and AI backend behind one app.
+    
+    create_app() builds one for each app and keeps it in app.extensions, so
+    two apps in a process (the default app and a test app, say) never share
+    a connection or a cache. Modules with heavy imports (numpy, brotli,
+    openpyxl) are loaded by the start-up step that creates their service.
+    """
+    
+    def __init__(self, startup: Startup, db_path: Optional[str] = None):
+        self.startup = startup
+        
+        # Model calls run here so slow model responses can't tie up every server thread
+        self.llm_executor = LLMExecutor()
+        # AI model backend (AI_BACKEND: gemini, http or template), created during start-up
+        self.llm_backend = None
+        
+        self.db = DatabaseService(db_path) if db_path else DatabaseService()
+        self.db_connected = False
+        self.ai_assistant = AIAssistantService(self.db)
+        self.meal_planner = MealPlanner(self.db)
+        self.db.add_change_listener(self.meal_planner.handle_change)
+        self.nutrition_calculator = NutritionCalculator(self.db)
+        self.db.add_change_listener(self.nutrition_calculator.handle_change)
+        self.meal_parser = MealParser(self.db, self.nutrition_calculator)
+        self.db.add_change_listener(self.meal_parser.handle_change)
+        self.autocomplete_index = AutocompleteIndex(self.db)
+        self.db.add_change_listener(self.autocomplete_index.handle_change)
+        self.event_broker = EventBroker(self.db)
+        self.db.add_change_listener(self.event_broker.handle_change)
+        self.ai_response_cache = AIResponseCache(self.db)
+        
+        # Created by their start-up steps
+        self.recipe_index = None
+        self.monthly_workbooks = None
+        self.static_assets = None
+        self.compress_response = None
+    
+    def subsystems(self):
+        """(name, initializer) pairs for Startup.run, in start-up order"""
+        return [
+            ('database', self.initialize_database),
+            ('event broker', self.event_broker.start),
+            ('autocomplete index', self.initialize_autocomplete),
+            ('recipe index', self.initialize_recipe_index),
+            ('excel export', self.initialize_excel_export),
+            ('importer', self.initialize_importer),
+            ('AI backend', self.initialize_ai_backend),
+            ('static assets', self.initialize_static_assets)
+        ]
+    
+    def initialize_database(self):
+        """Initialize database connection"""
+        try:
+            self.db.connect()
+            self.db_connected = True
+            print('✅ Database service initialized')
+        except Exception as error:
+            print(f'❌ Failed to initialize database: {error}')
+            self.db_connected = False
+            raise
+    
+    def initialize_autocomplete(self):
+        """Build the in-memory autocomplete index"""
+        self.autocomplete_index.build()
+        print(f'✅ Autocomplete index built ({len(self.autocomplete_index)} entries)')
+    
+    def initialize_recipe_index(self):
+        """Build the recipe similarity index (imports numpy)"""
+        from recipe_similarity import RecipeVectorIndex
+        
+        recipe_index = RecipeVectorIndex(self.db)
+        self.db.add_change_listener(recipe_index.handle_change)
+        recipe_index.build()
+        self.recipe_index = recipe_index
+    
+    def initialize_excel_export(self):
+        """Create the monthly workbook cache (imports the workbook writer)"""
+        import excel_export
+        
+        self.monthly_workbooks = excel_export.MonthlyWorkbooks(self.db)
+    
+    def initialize_importer(self):
+        """Load the JSON importer ahead of the first /api/import-json request"""
+        import importer  # noqa: F401
+    
+    def initialize_ai_backend(self):
+        """Create the AI model backend (imports its SDK)"""
+        self.llm_backend = create_backend()
+        self.ai_assistant.llm = self.llm_backend
+        if self.llm_backend:
+            print(f'✅ AI backend initialized: {self.llm_backend.name}')
+    
+    def initialize_static_assets(self):
+        """Load response compression (imports brotli) and precompress static files"""
+        from compression import StaticAssets, compress_response
+        
+        static_assets = StaticAssets(STATIC_ROOT)
+        static_assets.precompress_all()
+        self.static_assets = static_assets
+        self.compress_response = compress_response
+
+
+def _service(name: str) -> LocalProxy:
+    """Proxy to one of the current app's services"""
+    return LocalProxy(lambda: getattr(current_app.extensions[EXTENSION], name))
+
+
+# Routes use the current app's services through these names
+startup = _service('startup')
+db = _service('db')
+db_connected = _service('db_connected')
+llm_executor = _service('llm_executor')
+llm_backend = _service('llm_backend')
+ai_assistant = _service('ai_assistant')
+recipe_index = _service('recipe_index')
+meal_planner = _service('meal_planner')
+nutrition_calculator = _service('nutrition_calculator')
+meal_parser = _service('meal_parser')
+autocomplete_index = _service('autocomplete_index')
+event_broker = _service('event_broker')
+ai_response_cache = _service('ai_response_cache')
+monthly_workbooks = _service('monthly_workbooks')
+static_assets = _service('static_assets')
 
 
 def require_db():
     """Middleware to check database connection"""
+    if not db_connected:
+        # Requests arriving during start-up wait for the database instead of failing
+        startup.wait('database', STARTUP_WAIT_SECONDS)
     if not db_connected:
         return jsonify({'error': 'Database not available'}), 503
     return None
 
 
+def require_subsystem(name: str):
+    """503 unless a subsystem has started, waiting for it during start-up"""
+    if not startup.wait(name, STARTUP_WAIT_SECONDS):
+        return jsonify({'error': f'{name.capitalize()} not available'}), 503
+    return None
+
+
+def send_static(filename: str):
+    """Serve a static file, precompressed once the static assets have been prepared"""
+    if static_assets:
+        return static_assets.send(filename)
+    return send_from_directory(STATIC_ROOT, filename)
+
+
+def compress(response):
+    """after_request hook compressing responses once the compression module has loaded"""
+    hook = current_app.extensions[EXTENSION].compress_response
+    return hook(response) if hook else response
+
+
 # ============= STATIC FILES & WEB INTERFACE =============
 
-@app.route('/')
+@api.route('/')
 def index():
     """Serve the main HTML file"""
-    return send_from_directory('.', 'food_tracker.html')
+    return send_static('food_tracker.html')
 
-@app.route('/api')
+@api.route('/api')
 def api_info():
     """API information endpoint"""
     return jsonify({
@@ -90,7 +277,7 @@ def api_info():
         'status': 'running'
     })
 
-@app.route('/api/download-db')
+@api.route('/api/download-db')
 def download_database():
     """Download the database file"""
     try:
@@ -100,23 +287,47 @@ def download_database():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/favicon.ico')
+@api.route('/favicon.ico')
 def favicon():
     """Return 204 for favicon requests"""
     return '', 204
 
-@app.route('/<path:filename>')
+@api.route('/<path:filename>')
 def serve_static(filename):
     """Serve static files (if any exist)"""
     try:
-        return send_from_directory('.', filename)
+        return send_static(filename)
     except:
         return jsonify({'error': 'File not found'}), 404
 
 
+# ============= BOOTSTRAP API =============
+
+@api.route('/api/bootstrap', methods=['GET'])
+def bootstrap():
+    """Catalog, meals and summaries the web UI needs on load, in one response"""
+    check = require_db()
+    if check:
+        return check
+    
+    try:
+        date = request.args.get('date') or datetime.now().strftime('%Y-%m-%d')
+        catalog_version = request.args.get('catalogVersion', type=int)
+        
+        try:
+            datetime.strptime(date, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+        
+        return jsonify(db.get_bootstrap(date, catalog_version))
+    except Exception as error:
+        print(f'Error building bootstrap payload: {error}')
+        return jsonify({'error': 'Failed to load bootstrap data'}), 500
+
+
 # ============= INGREDIENTS API =============
 
-@app.route('/api/ingredients', methods=['GET'])
+@api.route('/api/ingredients', methods=['GET'])
 def get_ingredients():
     """Get all ingredients"""
     check = require_db()
@@ -131,7 +342,7 @@ def get_ingredients():
         return jsonify({'error': 'Failed to read ingredients'}), 500
 
 
-@app.route('/api/ingredients', methods=['POST'])
+@api.route('/api/ingredients', methods=['POST'])
 def add_ingredient():
     """Add a new ingredient"""
     check = require_db()
@@ -183,7 +394,7 @@ def add_ingredient():
         return jsonify({'error': str(error) or 'Failed to add ingredient'}), 500
 
 
-@app.route('/api/ingredients/<category>/<ingredient_key>', methods=['PUT'])
+@api.route('/api/ingredients/<category>/<ingredient_key>', methods=['PUT'])
 def update_ingredient(category, ingredient_key):
     """Update an existing ingredient"""
     check = require_db()
@@ -197,18 +408,19 @@ def update_ingredient(category, ingredient_key):
         if not ingredient_data or not ingredient_data.get('name') or not ingredient_data.get('measurements'):
             return jsonify({'error': 'Invalid ingredient data'}), 400
         
-        db.update_ingredient(category, ingredient_key, ingredient_data)
+        result = db.update_ingredient(category, ingredient_key, ingredient_data)
         
         return jsonify({
             'success': True,
-            'message': f'Ingredient "{ingredient_data["name"]}" updated successfully'
+            'message': f'Ingredient "{ingredient_data["name"]}" updated successfully',
+            'recipesUpdated': result['recipesUpdated']
         })
     except Exception as error:
         print(f'Error updating ingredient: {error}')
         return jsonify({'error': str(error) or 'Failed to update ingredient'}), 500
 
 
-@app.route('/api/ingredients/<category>/<ingredient_key>', methods=['DELETE'])
+@api.route('/api/ingredients/<category>/<ingredient_key>', methods=['DELETE'])
 def delete_ingredient(category, ingredient_key):
     """Delete an ingredient"""
     check = require_db()
@@ -227,7 +439,7 @@ def delete_ingredient(category, ingredient_key):
         return jsonify({'error': str(error) or 'Failed to delete ingredient'}), 500
 
 
-@app.route('/api/categories', methods=['GET'])
+@api.route('/api/categories', methods=['GET'])
 def get_categories():
     """Get all ingredient categories"""
     check = require_db()
@@ -244,7 +456,7 @@ def get_categories():
 
 # ============= RECIPES API =============
 
-@app.route('/api/recipes', methods=['GET'])
+@api.route('/api/recipes', methods=['GET'])
 def get_recipes():
     """Get all recipes"""
     check = require_db()
@@ -259,7 +471,7 @@ def get_recipes():
         return jsonify({'error': 'Failed to read recipes'}), 500
 
 
-@app.route('/api/recipes', methods=['POST'])
+@api.route('/api/recipes', methods=['POST'])
 def add_recipe():
     """Add a new recipe"""
     check = require_db()
@@ -288,7 +500,7 @@ def add_recipe():
         return jsonify({'error': 'Failed to add recipe'}), 500
 
 
-@app.route('/api/recipes/<key>', methods=['PUT'])
+@api.route('/api/recipes/<key>', methods=['PUT'])
 def update_recipe(key):
     """Update an existing recipe"""
     check = require_db()
@@ -313,7 +525,7 @@ def update_recipe(key):
         return jsonify({'error': str(error) or 'Failed to update recipe'}), 500
 
 
-@app.route('/api/recipes/<key>', methods=['DELETE'])
+@api.route('/api/recipes/<key>', methods=['DELETE'])
 def delete_recipe(key):
     """Delete a recipe"""
     check = require_db()
@@ -332,9 +544,38 @@ def delete_recipe(key):
         return jsonify({'error': str(error) or 'Failed to delete recipe'}), 500
 
 
+@api.route('/api/recipes/<key>/similar', methods=['GET'])
+def get_similar_recipes(key):
+    """Find recipes with a similar per-serving macro profile"""
+    check = require_db() or require_subsystem('recipe index')
+    if check:
+        return check
+    
+    try:
+        limit = request.args.get('limit', default=5, type=int)
+        more = [n.strip() for n in request.args.get('more', '').split(',') if n.strip()]
+        less = [n.strip() for n in request.args.get('less', '').split(',') if n.strip()]
+        
+        unknown = [n for n in more + less if n not in NUTRIENTS]
+        if unknown:
+            return jsonify({'error': f'Unknown nutrient(s): {", ".join(unknown)}'}), 400
+        
+        if limit < 1 or limit > 50:
+            return jsonify({'error': 'limit must be between 1 and 50'}), 400
+        
+        result = recipe_index.similar(key, limit, more, less)
+        if result is None:
+            return jsonify({'error': 'Recipe not found'}), 404
+        
+        return jsonify(result)
+    except Exception as error:
+        print(f'Error finding similar recipes: {error}')
+        return jsonify({'error': 'Failed to find similar recipes'}), 500
+
+
 # ============= MEALS API =============
 
-@app.route('/api/meals', methods=['GET'])
+@api.route('/api/meals', methods=['GET'])
 def get_meals():
     """Get meals by date or date range"""
     check = require_db()
@@ -364,7 +605,7 @@ def get_meals():
         return jsonify({'error': 'Failed to read meals'}), 500
 
 
-@app.route('/api/meals', methods=['POST'])
+@api.route('/api/meals', methods=['POST'])
 def add_meal():
     """Add a new meal"""
     check = require_db()
@@ -412,7 +653,7 @@ def add_meal():
         return jsonify({'error': 'Failed to add meal'}), 500
 
 
-@app.route('/api/meals/<int:meal_id>', methods=['PUT'])
+@api.route('/api/meals/<int:meal_id>', methods=['PUT'])
 def update_meal(meal_id):
     """Update an existing meal"""
     check = require_db()
@@ -446,7 +687,7 @@ def update_meal(meal_id):
         return jsonify({'error': 'Failed to update meal'}), 500
 
 
-@app.route('/api/meals/<int:meal_id>', methods=['DELETE'])
+@api.route('/api/meals/<int:meal_id>', methods=['DELETE'])
 def delete_meal(meal_id):
     """Delete a meal"""
     check = require_db()
@@ -465,7 +706,7 @@ def delete_meal(meal_id):
         return jsonify({'error': 'Failed to delete meal'}), 500
 
 
-@app.route('/api/meals/bulk', methods=['POST'])
+@api.route('/api/meals/bulk', methods=['POST'])
 def bulk_meals():
     """Bulk import or sync meals"""
     check = require_db()
@@ -504,7 +745,7 @@ def bulk_meals():
         return jsonify({'error': 'Bulk operation failed'}), 500
 
 
-@app.route('/api/meals/copy', methods=['POST'])
+@api.route('/api/meals/copy', methods=['POST'])
 def copy_meals():
     """Copy all meals from one date to another"""
     check = require_db()
@@ -553,7 +794,7 @@ def copy_meals():
         return jsonify({'error': 'Failed to copy meals'}), 500
 
 
-@app.route('/api/meals/by-date/<date>', methods=['DELETE'])
+@api.route('/api/meals/by-date/<date>', methods=['DELETE'])
 def delete_meals_by_date(date):
     """Delete all meals for a given date"""
     check = require_db()
@@ -584,9 +825,197 @@ def delete_meals_by_date(date):
         return jsonify({'error': 'Failed to delete meals by date'}), 500
 
 
+@api.route('/api/import-json', methods=['POST'])
+def import_json():
+    """Import meals (and any ingredients and recipes) from an exported JSON document.
+    
+    The body is parsed incrementally as it is read, so large uploads are
+    never held in memory. mergeStrategy comes from the query string, or from
+    the body if it is listed before the data.
+    """
+    check = require_db()
+    if check:
+        return check
+    
+    from importer import MERGE_STRATEGIES, import_stream
+    
+    try:
+        merge_strategy = request.args.get('mergeStrategy')
+        if merge_strategy is not None and merge_strategy not in MERGE_STRATEGIES:
+            return jsonify({'error': f'mergeStrategy must be one of: {", ".join(MERGE_STRATEGIES)}'}), 400
+        
+        report = import_stream(db, request.stream, merge_strategy)
+        return jsonify({'success': True, **report})
+    except ValueError as error:
+        # Batches committed before a malformed part of the body are kept
+        return jsonify({'error': f'Invalid import document: {error}'}), 400
+    except Exception as error:
+        print(f'Error importing JSON: {error}')
+        return jsonify({'error': 'Failed to import JSON'}), 500
+
+
+@api.route('/api/export-excel', methods=['POST', 'HEAD'])
+def export_excel():
+    """Write a month's tracker workbook from the database (HEAD: is Excel export available)"""
+    import excel_export
+    
+    if request.method == 'HEAD':
+        return '', 200 if excel_export.is_available() else 503
+    
+    check = require_db() or require_subsystem('excel export')
+    if check:
+        return check
+    
+    try:
+        if not excel_export.is_available():
+            return jsonify({'error': 'Excel export requires openpyxl (pip install openpyxl)'}), 503
+        
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            data = {}
+        
+        # Meals come from the database; any mealsByDate the client sends is ignored
+        months = excel_export.months_from_request(data)
+        files = [monthly_workbooks.export(month) for month in months]
+        
+        # The first month's file is reported at the top level, as before
+        # ranges were supported; files lists every month
+        if len(files) == 1:
+            action = 'Reused unchanged' if files[0]['cached'] else 'Created'
+            message = f"{action} Excel file for {months[0]}"
+        else:
+            message = f"Exported {len(files)} Excel files for {months[0]} to {months[-1]}"
+        return jsonify({
+            'success': True,
+            'message': message,
+            'appendedData': False,
+            **files[0],
+            'isNewFile': any(result['isNewFile'] for result in files),
+            'files': files
+        })
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    except Exception as error:
+        print(f'Error exporting Excel: {error}')
+        return jsonify({'error': 'Failed to export Excel file'}), 500
+
+
+@api.route('/api/meals/parse', methods=['POST'])
+def parse_meal():
+    """Parse a free-text meal description into ingredient and recipe lines"""
+    check = require_db()
+    if check:
+        return check
+    
+    try:
+        data = request.get_json()
+        text = data.get('text')
+        
+        if not isinstance(text, str) or not text.strip():
+            return jsonify({'error': 'Missing required field: text'}), 400
+        
+        if len(text) > MAX_TEXT_LENGTH:
+            return jsonify({'error': f'Text must be at most {MAX_TEXT_LENGTH} characters'}), 400
+        
+        result = meal_parser.parse(text)
+        return jsonify(result)
+    except Exception as error:
+        print(f'Error parsing meal: {error}')
+        return jsonify({'error': 'Failed to parse meal'}), 500
+
+
+# ============= NUTRITION API =============
+
+@api.route('/api/nutrition/calculate', methods=['POST'])
+def calculate_nutrition():
+    """Calculate nutrition for a batch of ingredient or recipe lines"""
+    check = require_db()
+    if check:
+        return check
+    
+    try:
+        data = request.get_json()
+        lines = data.get('lines')
+        
+        if not isinstance(lines, list):
+            return jsonify({'error': 'lines must be an array'}), 400
+        
+        if len(lines) > MAX_LINES:
+            return jsonify({'error': f'At most {MAX_LINES} lines per request'}), 400
+        
+        result = nutrition_calculator.calculate(lines)
+        return jsonify(result)
+    except Exception as error:
+        print(f'Error calculating nutrition: {error}')
+        return jsonify({'error': 'Failed to calculate nutrition'}), 500
+
+
+# ============= SEARCH API =============
+
+@api.route('/api/search', methods=['GET'])
+def search():
+    """Full-text search across ingredients, recipes and meal history"""
+    check = require_db()
+    if check:
+        return check
+    
+    try:
+        query = request.args.get('q', '').strip()
+        types = [t.strip() for t in request.args.get('type', '').split(',') if t.strip()]
+        limit = request.args.get('limit', default=20, type=int)
+        offset = request.args.get('offset', default=0, type=int)
+        
+        if not query:
+            return jsonify({'error': 'Missing required parameter: q'}), 400
+        
+        unknown = [t for t in types if t not in SEARCH_TYPES]
+        if unknown:
+            return jsonify({'error': f'Unknown type(s): {", ".join(unknown)}'}), 400
+        
+        if limit < 1 or limit > MAX_SEARCH_LIMIT:
+            return jsonify({'error': f'limit must be between 1 and {MAX_SEARCH_LIMIT}'}), 400
+        
+        if offset < 0:
+            return jsonify({'error': 'offset must not be negative'}), 400
+        
+        result = db.search(query, types or None, limit, offset)
+        return jsonify(result)
+    except Exception as error:
+        print(f'Error searching: {error}')
+        return jsonify({'error': 'Failed to search'}), 500
+
+
+@api.route('/api/autocomplete', methods=['GET'])
+def autocomplete():
+    """Suggest ingredients and recipes whose name starts with a prefix"""
+    check = require_db()
+    if check:
+        return check
+    
+    try:
+        prefix = request.args.get('prefix', '')
+        types = [t.strip() for t in request.args.get('type', '').split(',') if t.strip()]
+        limit = request.args.get('limit', default=10, type=int)
+        
+        unknown = [t for t in types if t not in ('ingredient', 'recipe')]
+        if unknown:
+            return jsonify({'error': f'Unknown type(s): {", ".join(unknown)}'}), 400
+        
+        if limit < 1 or limit > MAX_AUTOCOMPLETE_LIMIT:
+            return jsonify({'error': f'limit must be between 1 and {MAX_AUTOCOMPLETE_LIMIT}'}), 400
+        
+        return jsonify({
+            'prefix': prefix,
+            'suggestions': autocomplete_index.complete(prefix, limit, types or None)
+        })
+    except Exception as error:
+        print(f'Error autocompleting: {error}')
+        return jsonify({'error': 'Failed to autocomplete'}), 500
+
+
 # ============= ANALYTICS API =============
 
-@app.route('/api/analytics/daily/<date>', methods=['GET'])
+@api.route('/api/analytics/daily/<date>', methods=['GET'])
 def get_daily_analytics(date):
     """Get daily nutrition summary"""
     check = require_db()
@@ -601,7 +1030,7 @@ def get_daily_analytics(date):
         return jsonify({'error': 'Failed to get daily summary'}), 500
 
 
-@app.route('/api/analytics/weekly', methods=['GET'])
+@api.route('/api/analytics/weekly', methods=['GET'])
 def get_weekly_analytics():
     """Get weekly nutrition summary"""
     check = require_db()
@@ -624,9 +1053,53 @@ def get_weekly_analytics():
 
 # ============= AI ASSISTANT API =============
 
-@app.route('/api/ai/chat', methods=['POST'])
+def stream_chat(prompt, message, cache_key=None):
+    """Server-Sent Events response relaying the model's answer as it is generated"""
+    cached = ai_response_cache.get(cache_key) if cache_key else None
+    chunks = None
+    if cached is None:
+        # Admission happens here, so an overloaded executor still gets a JSON 503
+        chunks = llm_executor.stream(llm_backend.stream, prompt, llm_executor.timeout)
+    
+    def events():
+        if chunks is None:
+            yield format_event('chunk', {'text': cached})
+            yield format_event('done', {'fallback': False, 'cached': True})
+            return
+        
+        parts = []
+        try:
+            for text in chunks:
+                parts.append(text)
+                yield format_event('chunk', {'text': text})
+        except FutureTimeout:
+            print('AI chat stream timed out')
+            yield format_event('error', {
+                'response': "That took longer than expected. Please try again, or use the quick action buttons above!",
+                'fallback': True
+            })
+            return
+        except Exception as error:
+            print(f'Error streaming AI chat: {error}')
+            yield format_event('error', {
+                'response': "I'm having trouble processing your request right now. Please try asking in a different way or use the quick action buttons above!",
+                'fallback': True
+            })
+            return
+        
+        if cache_key:
+            ai_response_cache.store(cache_key, message, ''.join(parts))
+        yield format_event('done', {'fallback': False, 'cached': False})
+    
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api.route('/api/ai/chat', methods=['POST'])
 def ai_chat():
-    """AI Chat endpoint with Gemini"""
+    """AI Chat endpoint using the configured model backend"""
     try:
         data = request.get_json()
         message = data.get('message')
@@ -636,31 +1109,64 @@ def ai_chat():
         if not message:
             return jsonify({'error': 'Message is required'}), 400
         
-        # If Gemini is not available, use fallback
-        if not gemini_model:
+        startup.wait('AI backend', STARTUP_WAIT_SECONDS)
+        startup.wait('database', STARTUP_WAIT_SECONDS)
+        
+        # If no model backend is available, use fallback
+        if not llm_backend:
             return jsonify({
-                'response': "I'm currently unavailable. Please set the GEMINI_API_KEY environment variable to enable AI chat. In the meantime, use the quick action buttons above for nutrition analysis.",
+                'response': "I'm currently unavailable. Please set the GEMINI_API_KEY environment variable (or AI_BACKEND) to enable AI chat. In the meantime, use the quick action buttons above for nutrition analysis.",
                 'fallback': True
             })
         
-        # Build context from user's nutrition data
-        context = 'You are a helpful nutrition assistant. '
+        date = date or datetime.now().strftime('%Y-%m-%d')
+        try:
+            datetime.strptime(date, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+        
+        # Context comes from the database rollups; a client-sent summary is
+        # only used when the database is unavailable
+        if db_connected:
+            context = ai_assistant.get_chat_context(date)
+        else:
+            context = ai_assistant.summary_chat_context(date, nutrition_data.get('summary') if nutrition_data else None)
+        prompt = ai_assistant.build_chat_prompt(message, context)
         
-        if nutrition_data and nutrition_data.get('summary'):
-            s = nutrition_data['summary']
-            context += f"The user has logged {s.get('meal_count', 0)} meals today ({date or 'today'}) with {round(s.get('total_calories', 0))} calories, {round(s.get('total_protein', 0))}g protein, {round(s.get('total_carbs', 0))}g carbs, {round(s.get('total_fat', 0))}g fat, and {round(s.get('total_fiber', 0))}g fiber. "
+        # Repeated questions asked against the same context share one answer
+        cache_key = ai_response_cache.make_key(message, context['sections']) if db_connected else None
         
-        context += 'Provide concise, helpful nutrition advice. Keep responses under 100 words unless detailed analysis is requested. Use a friendly, encouraging tone.'
+        if data.get('stream'):
+            return stream_chat(prompt, message, cache_key)
         
-        prompt = f"{context}\n\nUser question: {message}\n\nResponse:"
+        def generate():
+            return llm_executor.call(llm_backend.generate, prompt, llm_executor.timeout)
         
-        response = gemini_model.generate_content(prompt)
-        text = response.text
+        if cache_key:
+            text, cached = ai_response_cache.get_or_compute(cache_key, message, generate)
+        else:
+            text, cached = generate(), False
         
         return jsonify({
             'response': text,
-            'fallback': False
+            'fallback': False,
+            'cached': cached
+        })
+    except Overloaded:
+        response = jsonify({
+            'response': "I'm getting a lot of questions right now. Please try again in a moment!",
+            'error': True,
+            'fallback': True
         })
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    except FutureTimeout:
+        print('AI chat timed out')
+        return jsonify({
+            'response': "That took longer than expected. Please try again, or use the quick action buttons above!",
+            'error': True,
+            'fallback': True
+        }), 504
     except Exception as error:
         print(f'Error in AI chat: {error}')
         
@@ -672,7 +1178,17 @@ def ai_chat():
         })
 
 
-@app.route('/api/ai/analyze', methods=['POST'])
+@api.route('/api/ai/metrics', methods=['GET'])
+def ai_metrics():
+    """AI model call queue and latency, and response cache hit rate"""
+    return jsonify({
+        'backend': llm_backend.describe() if llm_backend else None,
+        'executor': llm_executor.metrics(),
+        'cache': ai_response_cache.metrics() if db_connected else None
+    })
+
+
+@api.route('/api/ai/analyze', methods=['POST'])
 def ai_analyze():
     """Generate AI nutrition analysis"""
     check = require_db()
@@ -693,7 +1209,82 @@ def ai_analyze():
         return jsonify({'error': 'Failed to generate analysis'}), 500
 
 
-@app.route('/api/ai/weekly-progress', methods=['POST'])
+@api.route('/api/ai/analyze-range', methods=['POST'])
+def ai_analyze_range():
+    """Generate AI nutrition analysis for every date in a range"""
+    check = require_db()
+    if check:
+        return check
+    
+    try:
+        data = request.get_json()
+        start_date = data.get('startDate')
+        end_date = data.get('endDate')
+        
+        if not start_date or not end_date:
+            return jsonify({'error': 'startDate and endDate are required'}), 400
+        
+        try:
+            start = datetime.strptime(start_date, '%Y-%m-%d')
+            end = datetime.strptime(end_date, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+        
+        if end < start:
+            return jsonify({'error': 'endDate must not be before startDate'}), 400
+        
+        if (end - start).days + 1 > MAX_ANALYSIS_RANGE_DAYS:
+            return jsonify({'error': f'Date range cannot exceed {MAX_ANALYSIS_RANGE_DAYS} days'}), 400
+        
+        analysis = ai_assistant.analyze_range(start_date, end_date)
+        return jsonify(analysis)
+    except Exception as error:
+        print(f'Error generating AI range analysis: {error}')
+        return jsonify({'error': 'Failed to generate analysis'}), 500
+
+
+@api.route('/api/ai/plan', methods=['POST'])
+def ai_plan():
+    """Propose recipe servings that close the day's remaining nutrient gaps"""
+    check = require_db()
+    if check:
+        return check
+    
+    try:
+        data = request.get_json()
+        date = data.get('date')
+        targets = data.get('targets')
+        budget_ms = data.get('budgetMs', PLAN_BUDGET_MS)
+        max_items = data.get('maxItems', 4)
+        max_servings = data.get('maxServings', 2)
+        
+        if not date:
+            return jsonify({'error': 'Date is required'}), 400
+        
+        try:
+            datetime.strptime(date, '%Y-%m-%d')
+        except (TypeError, ValueError):
+            return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+        
+        if (isinstance(budget_ms, bool) or not isinstance(budget_ms, (int, float))
+                or budget_ms <= 0 or budget_ms > MAX_PLAN_BUDGET_MS):
+            return jsonify({'error': f'budgetMs must be between 1 and {MAX_PLAN_BUDGET_MS}'}), 400
+        
+        if any(isinstance(value, bool) or not isinstance(value, int) or value < 1
+               for value in (max_items, max_servings)):
+            return jsonify({'error': 'maxItems and maxServings must be positive integers'}), 400
+        
+        plan = meal_planner.plan(date, targets, budget_ms, max_items, max_servings)
+        return jsonify(plan)
+    except ValueError as error:
+        # Malformed targets
+        return jsonify({'error': str(error)}), 400
+    except Exception as error:
+        print(f'Error generating meal plan: {error}')
+        return jsonify({'error': 'Failed to generate meal plan'}), 500
+
+
+@api.route('/api/ai/weekly-progress', methods=['POST'])
 def ai_weekly_progress():
     """Get weekly progress report"""
     check = require_db()
@@ -708,7 +1299,7 @@ def ai_weekly_progress():
         return jsonify({'error': 'Failed to get weekly progress'}), 500
 
 
-@app.route('/api/ai/compare', methods=['POST'])
+@api.route('/api/ai/compare', methods=['POST'])
 def ai_compare():
     """Compare current week with previous week"""
     check = require_db()
@@ -730,7 +1321,7 @@ def ai_compare():
         return jsonify({'error': 'Failed to compare periods'}), 500
 
 
-@app.route('/api/ai/recommendations', methods=['POST'])
+@api.route('/api/ai/recommendations', methods=['POST'])
 def ai_recommendations():
     """Get food recommendations for deficient nutrients"""
     check = require_db()
@@ -741,31 +1332,170 @@ def ai_recommendations():
         data = request.get_json()
         deficient_nutrients = data.get('deficientNutrients')
         
+        gaps = data.get('gaps')
+        limit = data.get('limit', 5)
+        
         if not isinstance(deficient_nutrients, list):
             return jsonify({'error': 'deficientNutrients must be an array'}), 400
         
-        recommendations = ai_assistant.get_food_recommendations(deficient_nutrients)
+        if gaps is not None and (not isinstance(gaps, dict) or any(
+                isinstance(value, bool) or not isinstance(value, (int, float)) for value in gaps.values())):
+            return jsonify({'error': 'gaps must be an object of nutrient amounts'}), 400
+        
+        if not isinstance(limit, int) or limit < 1 or limit > 50:
+            return jsonify({'error': 'limit must be an integer between 1 and 50'}), 400
+        
+        recommendations = ai_assistant.get_food_recommendations(deficient_nutrients, gaps, limit)
         return jsonify(recommendations)
     except Exception as error:
         print(f'Error getting recommendations: {error}')
         return jsonify({'error': 'Failed to get recommendations'}), 500
 
 
+# ============= BATCH API =============
+
+class BatchRollback(Exception):
+    """Raised to roll back a transactional batch after an operation fails"""
+
+
+def dispatch_operation(operation):
+    """Run one batch sub-request through its route handler and return (status, body)"""
+    method = str(operation.get('method', 'GET')).upper()
+    path = operation.get('path')
+    
+    if not isinstance(path, str) or not path.startswith('/api/'):
+        return 400, {'error': 'path must start with /api/'}
+    
+    if path.split('?')[0].rstrip('/') == '/api/batch':
+        return 400, {'error': 'Batches cannot be nested'}
+    
+    with current_app.test_request_context(path, method=method, json=operation.get('body')):
+        if request.routing_exception is not None:
+            error = request.routing_exception
+            return getattr(error, 'code', 404), {'error': getattr(error, 'description', str(error))}
+        
+        response = current_app.make_response(
+            current_app.view_functions[request.url_rule.endpoint](**request.view_args)
+        )
+        if response.is_streamed:
+            return 400, {'error': 'Streaming endpoints are not supported in a batch'}
+        
+        return response.status_code, response.get_json(silent=True)
+
+
+@api.route('/api/batch', methods=['POST'])
+def batch():
+    """Run many API operations in one request, optionally in one transaction"""
+    check = require_db()
+    if check:
+        return check
+    
+    try:
+        data = request.get_json()
+        operations = data.get('operations')
+        atomic = bool(data.get('transaction'))
+        
+        if not isinstance(operations, list) or not operations:
+            return jsonify({'error': 'operations must be a non-empty array'}), 400
+        
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return jsonify({'error': f'At most {MAX_BATCH_OPERATIONS} operations per batch'}), 400
+        
+        if atomic:
+            for index, operation in enumerate(operations):
+                path = operation.get('path') if isinstance(operation, dict) else None
+                if isinstance(path, str) and path.startswith(SLOW_BATCH_PATHS):
+                    return jsonify({'error': f'Operation {index}: {path.split("?")[0]} cannot run in a transaction'}), 400
+        
+        results = []
+        
+        def run_operations():
+            for index, operation in enumerate(operations):
+                if not isinstance(operation, dict):
+                    status, body = 400, {'error': 'Operation must be an object'}
+                else:
+                    try:
+                        status, body = dispatch_operation(operation)
+                    except Exception as error:
+                        print(f'Error in batch operation {index}: {error}')
+                        status, body = 500, {'error': 'Internal server error'}
+                
+                result = {'index': index, 'status': status, 'body': body}
+                if isinstance(operation, dict) and 'id' in operation:
+                    result['id'] = operation['id']
+                results.append(result)
+                
+                # A transactional batch stops at the first failure and rolls back
+                if atomic and status >= 400:
+                    raise BatchRollback()
+        
+        committed = True
+        if atomic:
+            try:
+                with db.transaction():
+                    run_operations()
+            except BatchRollback:
+                committed = False
+        else:
+            run_operations()
+        
+        return jsonify({
+            'results': results,
+            'transaction': atomic,
+            'committed': committed
+        })
+    except Exception as error:
+        print(f'Error running batch: {error}')
+        return jsonify({'error': 'Failed to run batch'}), 500
+
+
+# ============= EVENTS API =============
+
+@api.route('/api/events', methods=['GET'])
+def events():
+    """Server-Sent Events stream of meal, daily summary and catalog changes"""
+    check = require_db()
+    if check:
+        return check
+    
+    # EventSource sends Last-Event-ID on reconnect; ?cursor= lets other clients resume too
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('cursor')
+    try:
+        messages = event_broker.open_stream(cursor)
+    except TooManySubscribers:
+        response = jsonify({'error': 'Too many open event streams, try again later'})
+        response.headers['Retry-After'] = str(RETRY_MS // 1000)
+        return response, 503
+    
+    response = Response(stream_with_context(messages), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
 # ============= HEALTH CHECK =============
 
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Liveness: the process is up and serving, even while subsystems start"""
     return jsonify({
         'status': 'ok',
         'database': 'connected' if db_connected else 'disconnected',
+        'ready': startup.ready,
         'timestamp': datetime.now().isoformat()
     })
 
 
+@api.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness: every subsystem finished starting; 503 until then"""
+    status = startup.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+
 # ============= ERROR HANDLING =============
 
-@app.errorhandler(Exception)
+@api.app_errorhandler(Exception)
 def handle_error(error):
     """Error handling middleware"""
     print(f'Unhandled error: {error}')
@@ -774,19 +1504,48 @@ def handle_error(error):
 
 # ============= SERVER STARTUP =============
 
-# Initialize database on startup (but don't exit on failure in production)
-try:
-    initialize_database()
-except Exception as e:
-    print(f'⚠️  Database initialization error: {e}')
-    print('Server will start but database features may not work')
+def create_app(background: bool = True, db_path: Optional[str] = None) -> Flask:
+    """Create a Flask app with its own services and start them.
+    
+    Heavy initialization (schema check, indexes, the AI SDK, static file
+    compression) runs in a background thread unless background is False,
+    so the server accepts connections immediately; /api/ready reports when
+    it has finished. db_path overrides the default database file.
+    """
+    profile = Startup(imports)
+    with profile.step('create app'):
+        app = Flask(__name__)
+        app.json = FastJSONProvider(app)
+        CORS(app)
+        app.after_request(compress)
+        
+        # Configure max request size
+        app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB
+        
+        app.register_blueprint(api)
+    
+    with profile.step('create services'):
+        services = app.extensions[EXTENSION] = Services(profile, db_path)
+    
+    # A failed subsystem is reported by /api/ready while the server keeps running
+    profile.run(services.subsystems(), background=background)
+    return app
+
+
+def __getattr__(name):
+    # The default app (app:app for gunicorn) is created on first use, so
+    # importing create_app doesn't also start the default app's services
+    if name == 'app':
+        globals()['app'] = create_app()
+        return globals()['app']
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
 
 if __name__ == '__main__':
     # For local development only
     port = int(os.getenv('PORT', 3000))
     
     print(f'\n🚀 Food Tracker Server running on http://localhost:{port}')
-    print(f'📊 Database: {"Connected" if db_connected else "Disconnected"}')
     print(f'🤖 AI Assistant: Ready\n')
     
-    app.run(host='0.0.0.0', port=port, debug=False)
+    create_app().run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,175 @@
+"""
+Autocomplete Index for Food Tracker
+In-memory prefix index over ingredient and recipe names for typing-speed suggestions
+"""
+
+import re
+import threading
+from bisect import bisect_left, insort
+from itertools import groupby
+from typing import Dict, List, Optional
+
+from db_service import DatabaseService
+
+
+# Tiers searched in order: whole name, key, then any later word of the name
+NAME, KEY, WORD = range(3)
+
+ENTITY_TYPES = ('ingredient', 'recipe')
+
+
+def normalize(text: str) -> str:
+    """Lowercase words separated by single spaces ("Soy_milk Coffee" -> "soy milk coffee")"""
+    return ' '.join(re.findall(r'[a-z0-9]+', (text or '').lower()))
+
+
+class AutocompleteIndex:
+    """Sorted term arrays searched with bisect, updated incrementally on catalog changes.
+    
+    Terms are kept in one sorted array per (tier, type, name length), so a
+    query only reads the types it asks for and meets matches in rank order:
+    shortest names first, then alphabetically.
+    """
+    
+    def __init__(self, db_service: DatabaseService):
+        self.db = db_service
+        self._lock = threading.Lock()
+        self._built = False
+        self._terms = {}
+        self._entries = {}
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    # ============= BUILDING =============
+    
+    def build(self):
+        """Load every ingredient and recipe name from the catalog"""
+        self.load_rows(self.db.get_catalog_name_rows())
+    
+    def load_rows(self, rows: List[Dict]):
+        """Build the sorted term arrays from catalog name rows"""
+        arrays = {}
+        entries = {}
+        
+        for row in rows:
+            entity, entry = self._entry(row)
+            entries[entity] = entry
+            for tier, term in entry['terms']:
+                arrays.setdefault(self._array_key(tier, entity, entry), []).append((term, entity))
+        
+        for terms in arrays.values():
+            terms.sort()
+        
+        with self._lock:
+            self._terms = arrays
+            self._entries = entries
+            self._built = True
+    
+    def handle_change(self, event: Dict):
+        """Replace the terms of one added, updated or deleted ingredient or recipe"""
+        if not self._built or event.get('entity') not in ('ingredient', 'recipe'):
+            return
+        
+        rows = self.db.get_catalog_name_rows(event['entity'], event['key'], event.get('category'))
+        
+        with self._lock:
+            if event['entity'] == 'ingredient':
+                entity = ('ingredient', event['category'], event['key'])
+            else:
+                entity = ('recipe', '', event['key'])
+            
+            old = self._entries.pop(entity, None)
+            if old:
+                for tier, term in old['terms']:
+                    key = self._array_key(tier, entity, old)
+                    terms = self._terms.get(key, [])
+                    i = bisect_left(terms, (term, entity))
+                    if i < len(terms) and terms[i] == (term, entity):
+                        del terms[i]
+                    if not terms:
+                        self._terms.pop(key, None)
+            
+            if rows:
+                entity, entry = self._entry(rows[0])
+                self._entries[entity] = entry
+                for tier, term in entry['terms']:
+                    insort(self._terms.setdefault(self._array_key(tier, entity, entry), []), (term, entity))
+    
+    @staticmethod
+    def _array_key(tier: int, entity, entry: Dict):
+        """Term array holding one of an entry's terms: (tier, type, name length)"""
+        return tier, entity[0], len(entry['name'])
+    
+    @staticmethod
+    def _entry(row: Dict):
+        """Entity id and indexed terms of one catalog row"""
+        category = (row['category'] or '') if row['type'] == 'ingredient' else ''
+        entity = (row['type'], category, row['key'])
+        name = normalize(row['name'])
+        words = name.split(' ')
+        
+        terms = {(NAME, name), (KEY, normalize(row['key'].replace('_', ' ')))}
+        terms.update((WORD, ' '.join(words[i:])) for i in range(1, len(words)))
+        terms = {(tier, term) for tier, term in terms if term}
+        
+        return entity, {
+            'type': row['type'],
+            'key': row['key'],
+            'name': row['name'],
+            'category': row['category'],
+            'terms': sorted(terms)
+        }
+    
+    # ============= QUERIES =============
+    
+    def complete(self, prefix: str, limit: int = 10, types: Optional[List[str]] = None) -> List[Dict]:
+        """Suggest catalog entries whose name, key or a later word starts with prefix.
+        
+        Whole-name matches come first, then key matches, then matches on a later
+        word ("samb" finds "Lauki Sambar"); within a tier shorter names win,
+        then alphabetical order. Ranking covers every match of the requested
+        types, yet reads at most limit matches from each term array.
+        """
+        if not self._built:
+            self.build()
+        
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        types = set(types or ENTITY_TYPES)
+        
+        seen = set()
+        results = []
+        
+        with self._lock:
+            for tier in (NAME, KEY, WORD):
+                keys = sorted((key for key in self._terms if key[0] == tier and key[1] in types),
+                              key=lambda key: key[2])
+                # Arrays of the same name length are merged; lengths are taken shortest first
+                for _, same_length in groupby(keys, key=lambda key: key[2]):
+                    wanted = limit - len(results)
+                    matches = []
+                    for key in same_length:
+                        terms = self._terms[key]
+                        i = bisect_left(terms, (prefix,))
+                        found = 0
+                        while i < len(terms) and found < wanted and terms[i][0].startswith(prefix):
+                            term, entity = terms[i]
+                            i += 1
+                            if entity not in seen:
+                                seen.add(entity)
+                                matches.append((term, entity))
+                                found += 1
+                    
+                    matches.sort()
+                    results.extend(self._entries[entity] for _, entity in matches[:wanted])
+                    if len(results) >= limit:
+                        break
+                if len(results) >= limit:
+                    break
+        
+        return [
+            {'type': e['type'], 'key': e['key'], 'name': e['name'], 'category': e['category']}
+            for e in results
+        ]
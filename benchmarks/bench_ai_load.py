@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+AI load benchmark
+Saturates /api/ai/chat on a running server and times /api/meals alongside it
+
+Start the server with the offline template backend, e.g.
+    AI_BACKEND=template AI_TEMPLATE_LATENCY_MS=2000 AI_TEMPLATE_WORD_MS=30 gunicorn --worker-class gthread --threads 64 app:app
+then run: python benchmarks/bench_ai_load.py --url http://localhost:8000 [--stream]
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+
+
+def request(url: str, body=None):
+    """Status code, elapsed milliseconds and milliseconds to the first streamed chunk"""
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    first_chunk = None
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            for line in response:
+                if first_chunk is None and line.startswith(b'event: chunk'):
+                    first_chunk = (time.perf_counter() - start) * 1000
+            status = response.status
+    except urllib.error.HTTPError as error:
+        status = error.code
+    return status, (time.perf_counter() - start) * 1000, first_chunk
+
+
+def percentile(timings, fraction):
+    return sorted(timings)[int(len(timings) * fraction) - 1]
+
+
+def time_meals(base_url: str, count: int):
+    return [request(f'{base_url}/api/meals?date=2025-01-01')[1] for _ in range(count)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='AI saturation benchmark')
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--clients', type=int, default=32, help='concurrent AI chat clients')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--samples', type=int, default=200, help='/api/meals requests per phase')
+    parser.add_argument('--stream', action='store_true', help='request streamed chat answers')
+    args = parser.parse_args()
+    
+    idle = time_meals(args.url, args.samples)
+    
+    statuses = Counter()
+    chat_timings = []
+    first_chunk_timings = []
+    statuses_lock = threading.Lock()
+    stop = time.monotonic() + args.seconds
+    
+    def chat_client():
+        while time.monotonic() < stop:
+            # A fresh question each time so the response cache can't answer it
+            message = f'Is dal a good protein source? ({random.random()})'
+            status, elapsed, first_chunk = request(f'{args.url}/api/ai/chat',
+                                                   {'message': message, 'stream': args.stream})
+            with statuses_lock:
+                statuses[status] += 1
+                if status == 200:
+                    chat_timings.append(elapsed)
+                if first_chunk is not None:
+                    first_chunk_timings.append(first_chunk)
+    
+    clients = [threading.Thread(target=chat_client, daemon=True) for _ in range(args.clients)]
+    for client in clients:
+        client.start()
+    time.sleep(0.5)
+    saturated = time_meals(args.url, args.samples)
+    for client in clients:
+        client.join()
+    
+    phases = [('/api/meals idle', idle), ('/api/meals AI saturated', saturated),
+              ('/api/ai/chat total', chat_timings), ('/api/ai/chat first chunk', first_chunk_timings)]
+    for name, timings in phases:
+        if timings:
+            print(f'{name:<25} p50 {percentile(timings, 0.5):8.2f} ms | '
+                  f'p99 {percentile(timings, 0.99):8.2f} ms')
+    print(f'/api/ai/chat statuses: {dict(statuses)}')
+    
+    with urllib.request.urlopen(f'{args.url}/api/ai/metrics') as response:
+        print(f'AI executor: {json.loads(response.read())}')
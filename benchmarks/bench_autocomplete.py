@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Autocomplete benchmark
+Times complete() on a synthetic 50k-entry catalog with 1-6 character prefixes
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from autocomplete import AutocompleteIndex
+
+
+WORDS = ['paneer', 'masala', 'dal', 'rice', 'aloo', 'gobi', 'palak', 'chana', 'methi', 'jeera',
+         'tikka', 'bhindi', 'rajma', 'sambar', 'rasam', 'upma', 'poha', 'idli', 'khichdi', 'kadhi',
+         'oat', 'milk', 'coffee', 'soy', 'curd', 'roti', 'dosa', 'chutney', 'salad', 'sabji']
+
+
+def synthetic_names(count: int, seed: int = 3):
+    """Ingredient and recipe name rows built from two to four random words"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        name = ' '.join(rng.sample(WORDS, rng.randint(2, 4))).title() + f' {i}'
+        kind = 'ingredient' if i % 2 else 'recipe'
+        rows.append({
+            'type': kind,
+            'key': name.lower().replace(' ', '_'),
+            'name': name,
+            'category': rng.choice(['grains', 'vegetables', 'other']) if kind == 'ingredient' else 'Main'
+        })
+    return rows
+
+
+def percentile(timings, fraction):
+    return sorted(timings)[int(len(timings) * fraction) - 1]
+
+
+def run(count: int, queries: int = 5000):
+    rows = synthetic_names(count)
+    index = AutocompleteIndex(None)
+    
+    start = time.perf_counter()
+    index.load_rows(rows)
+    build_ms = (time.perf_counter() - start) * 1000
+    
+    rng = random.Random(9)
+    timings = []
+    for _ in range(queries):
+        word = rng.choice(WORDS)
+        prefix = word[:rng.randint(1, min(6, len(word)))]
+        
+        start = time.perf_counter()
+        index.complete(prefix, limit=10)
+        timings.append((time.perf_counter() - start) * 1000)
+    
+    print(f'{count:>7} entries | build {build_ms:7.1f} ms | '
+          f'p50 {percentile(timings, 0.5):.3f} ms | p99 {percentile(timings, 0.99):.3f} ms | '
+          f'max {max(timings):.3f} ms')
+
+
+if __name__ == '__main__':
+    for size in (10_000, 50_000):
+        run(size)
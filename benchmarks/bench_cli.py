@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+CLI latency benchmark
+Times invocation-to-output for `cli.py summary` and the same command in `cli.py shell`
+
+Runs against a temporary copy of the database so nothing is modified.
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def time_run(command, cwd, stdin=None):
+    start = time.perf_counter()
+    subprocess.run(command, cwd=cwd, input=stdin, stdout=subprocess.DEVNULL, check=True, text=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    print(f'{name:<28} min {timings[0]:7.1f} ms | median {statistics.median(timings):7.1f} ms | '
+          f'p90 {timings[int(len(timings) * 0.9) - 1]:7.1f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='CLI latency benchmark')
+    parser.add_argument('--db', default=os.path.join(ROOT, 'database', 'food_tracker.db'))
+    parser.add_argument('--date', default='2025-12-31')
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        os.makedirs(os.path.join(workdir, 'database'))
+        shutil.copy(args.db, os.path.join(workdir, 'database', 'food_tracker.db'))
+        cli = [sys.executable, os.path.join(ROOT, 'cli.py')]
+        summary = ['summary', '--date', args.date]
+        
+        # The first run applies the schema to the copy if it is out of date
+        time_run(cli + summary, workdir)
+        
+        report('python -c pass', [time_run([sys.executable, '-c', 'pass'], workdir) for _ in range(args.runs)])
+        report('cli.py summary', [time_run(cli + summary, workdir) for _ in range(args.runs)])
+        
+        commands = '\n'.join([' '.join(summary)] * args.runs) + '\nexit\n'
+        empty = time_run(cli + ['shell'], workdir, 'exit\n')
+        total = time_run(cli + ['shell'], workdir, commands)
+        print(f'{"cli.py shell (per command)":<28} {(total - empty) / args.runs:7.2f} ms '
+              f'over {args.runs} commands (shell start-up {empty:.1f} ms)')
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+JSON codec benchmark
+Compares stdlib json with json_codec on catalog and meal-range payloads
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import json_codec
+
+
+def nutrition(rng):
+    return {n: round(rng.uniform(0, 300), 1) for n in ('calories', 'protein', 'carbs', 'fat', 'fiber')}
+
+
+def ingredient_catalog(count: int, seed: int = 1):
+    """Shape of GET /api/ingredients"""
+    rng = random.Random(seed)
+    catalog = {'basic_ingredients': {}}
+    for i in range(count):
+        category = catalog['basic_ingredients'].setdefault(f'category_{i % 8}', {})
+        category[f'ingredient_{i}'] = {
+            'name': f'Ingredient {i}',
+            'measurements': {m: nutrition(rng) for m in ('1_cup', '1_tbsp', '100g')}
+        }
+    return catalog
+
+
+def recipe_catalog(count: int, seed: int = 2):
+    """Shape of GET /api/recipes"""
+    rng = random.Random(seed)
+    return {'dishes': {
+        f'recipe_{i}': {
+            'name': f'Recipe {i}',
+            'category': 'Main',
+            'servings': rng.randint(1, 6),
+            'total_per_serving': nutrition(rng),
+            'ingredients': [
+                {'key': f'category_0.ingredient_{j}', 'name': f'Ingredient {j}',
+                 'amount': f'{rng.randint(1, 3)}x 1 cup', 'nutrition': nutrition(rng)}
+                for j in range(rng.randint(3, 8))
+            ]
+        }
+        for i in range(count)
+    }}
+
+
+def meal_range(days: int, seed: int = 3):
+    """Shape of GET /api/meals?startDate=&endDate="""
+    rng = random.Random(seed)
+    return {
+        f'2025-{d // 28 % 12 + 1:02d}-{d % 28 + 1:02d}': [
+            {'id': d * 10 + m, 'description': f'Meal {m}', 'mealType': 'lunch',
+             'timestamp': '2025-01-01T12:00:00', 'source': 'web', 'nutrition': nutrition(rng),
+             'ingredient_data': [{'ingredientKey': 'category_0.ingredient_1', 'quantity': 1}]}
+            for m in range(4)
+        ]
+        for d in range(days)
+    }
+
+
+def best_ms(fn, repeats: int = 7):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+if __name__ == '__main__':
+    payloads = {
+        'ingredients (5k)': ingredient_catalog(5_000),
+        'recipes (2k)': recipe_catalog(2_000),
+        'meals (365 days)': meal_range(365)
+    }
+    
+    print(f'json_codec backend: {json_codec.BACKEND}\n')
+    for name, payload in payloads.items():
+        encoded = json.dumps(payload, sort_keys=True)
+        stdlib_dump = best_ms(lambda: json.dumps(payload, sort_keys=True))
+        codec_dump = best_ms(lambda: json_codec.dumps_bytes(payload, sort_keys=True))
+        stdlib_load = best_ms(lambda: json.loads(encoded))
+        codec_load = best_ms(lambda: json_codec.loads(encoded))
+        print(f'{name:<18} {len(encoded) / 1024:7.0f} KB | '
+              f'dumps {stdlib_dump:7.2f} -> {codec_dump:6.2f} ms ({stdlib_dump / codec_dump:4.1f}x) | '
+              f'loads {stdlib_load:7.2f} -> {codec_load:6.2f} ms ({stdlib_load / codec_load:4.1f}x)')
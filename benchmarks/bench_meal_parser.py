@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Meal parser benchmark
+Times automaton builds and parse() throughput on long free-text inputs
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from db_service import DatabaseService
+from meal_parser import MealParser, tokenize
+from nutrition_calculator import NutritionCalculator
+
+
+WORDS = ['paneer', 'masala', 'dal', 'rice', 'aloo', 'gobi', 'palak', 'chana', 'methi', 'jeera',
+         'tikka', 'bhindi', 'rajma', 'sambar', 'rasam', 'upma', 'poha', 'idli', 'khichdi', 'kadhi',
+         'baingan', 'matar', 'lauki', 'moong', 'toor', 'kala', 'pulao', 'biryani', 'paratha', 'chutney']
+UNITS = ['1_cup', '1_bowl', '1_piece', '1_tbsp', '1_serving', '100g']
+
+
+def seed_catalog(db: DatabaseService, count: int, seed: int = 7):
+    """Add `count` synthetic ingredients with two-to-three word names"""
+    rng = random.Random(seed)
+    names = []
+    with db.transaction():
+        for i in range(count):
+            name = ' '.join(rng.sample(WORDS, rng.randint(2, 3))) + f' {i}'
+            names.append(name)
+            db.add_ingredient('other', f'item_{i}', {
+                'name': name,
+                'measurements': {
+                    unit: {'calories': rng.uniform(20, 400), 'protein': rng.uniform(0, 20),
+                           'carbs': rng.uniform(0, 60), 'fat': rng.uniform(0, 20), 'fiber': rng.uniform(0, 8)}
+                    for unit in rng.sample(UNITS, 2)
+                }
+            })
+    return names
+
+
+def long_text(names, length: int, seed: int = 11) -> str:
+    """Comma-separated meal description of roughly `length` characters"""
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    while size < length:
+        part = f'{rng.randint(1, 3)} {rng.choice(["cups", "bowls", "pieces"])} of {rng.choice(names)}'
+        if rng.random() < 0.2:
+            part = 'some ' + ' '.join(rng.sample(WORDS, 2))
+        parts.append(part)
+        size += len(part) + 2
+    return ', '.join(parts)
+
+
+def run(count: int, lengths=(1_000, 10_000, 100_000), repeats: int = 5):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseService(os.path.join(tmp, 'bench.db'))
+        db.connect()
+        names = seed_catalog(db, count)
+        
+        parser = MealParser(db, NutritionCalculator(db))
+        start = time.perf_counter()
+        parser.build()
+        build_ms = (time.perf_counter() - start) * 1000
+        
+        for length in lengths:
+            text = long_text(names, length)
+            tokens = len(tokenize(text))
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                result = parser.parse(text)
+                timings.append(time.perf_counter() - start)
+            best = min(timings)
+            print(f'{count:>6} foods | build {build_ms:7.1f} ms | {len(text):>7} chars ({tokens:>6} tokens) | '
+                  f'parse {best * 1000:7.2f} ms | {len(text) / best / 1e6:5.2f} MB/s | '
+                  f'{len(result["lines"]):>5} lines')
+        db.close()
+
+
+if __name__ == '__main__':
+    for size in (1_000, 10_000):
+        run(size)
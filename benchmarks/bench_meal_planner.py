@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Meal planner benchmark
+Times plan() against synthetic recipe catalogs within the default latency budget
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_recipe_similarity import synthetic_recipes
+from db_service import DatabaseService
+from meal_planner import MealPlanner
+
+
+def run(db: DatabaseService, count: int, plans: int = 50):
+    planner = MealPlanner(db)
+    
+    start = time.perf_counter()
+    planner.load_rows(synthetic_recipes(count))
+    build_ms = (time.perf_counter() - start) * 1000
+    
+    timings = []
+    incomplete = 0
+    for i in range(plans):
+        result = planner.plan(f'2026-01-{i % 3 + 1:02d}', budget_ms=50)
+        timings.append(result['elapsedMs'])
+        incomplete += not result['complete']
+    
+    timings.sort()
+    print(f'{count:>7} recipes | pool build {build_ms:7.1f} ms | '
+          f'plan p50 {statistics.median(timings):6.2f} ms | max {timings[-1]:6.2f} ms | '
+          f'hit budget {incomplete}/{plans}')
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseService(os.path.join(tmp, 'bench.db'))
+        db.connect()
+        db.add_meal({'id': 1, 'description': 'Breakfast', 'mealType': 'breakfast', 'date': '2026-01-01',
+                     'nutrition': {'calories': 450, 'protein': 15, 'carbs': 60, 'fat': 14, 'fiber': 6}})
+        db.add_meal({'id': 2, 'description': 'Lunch', 'mealType': 'lunch', 'date': '2026-01-02',
+                     'nutrition': {'calories': 900, 'protein': 30, 'carbs': 110, 'fat': 32, 'fiber': 9}})
+        
+        for size in (1_000, 10_000, 100_000):
+            run(db, size)
+        db.close()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Recipe similarity benchmark
+Times index builds and /similar queries on synthetic catalogs of 10k and 100k recipes
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from recipe_similarity import RecipeVectorIndex, np
+
+
+def synthetic_recipes(count: int, seed: int = 42):
+    """Generate recipe nutrition rows with plausible per-serving values"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        protein = rng.uniform(2, 40)
+        carbs = rng.uniform(5, 90)
+        fat = rng.uniform(1, 35)
+        rows.append({
+            'key': f'recipe_{i}',
+            'name': f'Recipe {i}',
+            'category': rng.choice(['Breakfast', 'Main', 'Snack', 'Dessert']),
+            'servings': rng.randint(1, 6),
+            'calories': protein * 4 + carbs * 4 + fat * 9,
+            'protein': protein,
+            'carbs': carbs,
+            'fat': fat,
+            'fiber': rng.uniform(0, 15)
+        })
+    return rows
+
+
+def run(count: int, queries: int = 200):
+    rows = synthetic_recipes(count)
+    index = RecipeVectorIndex(None)
+    
+    start = time.perf_counter()
+    index.load_rows(rows)
+    build_ms = (time.perf_counter() - start) * 1000
+    
+    rng = random.Random(7)
+    timings = {'plain': [], 'more=fiber': []}
+    for _ in range(queries):
+        key = f'recipe_{rng.randrange(count)}'
+        
+        start = time.perf_counter()
+        index.similar(key, limit=10)
+        timings['plain'].append((time.perf_counter() - start) * 1000)
+        
+        start = time.perf_counter()
+        index.similar(key, limit=10, more=['fiber'])
+        timings['more=fiber'].append((time.perf_counter() - start) * 1000)
+    
+    print(f'{count:>7} recipes | build {build_ms:8.1f} ms')
+    for label, samples in timings.items():
+        samples.sort()
+        p99 = samples[int(len(samples) * 0.99) - 1]
+        print(f'        {label:<11} p50 {statistics.median(samples):7.2f} ms | p99 {p99:7.2f} ms')
+
+
+if __name__ == '__main__':
+    print(f'Backend: {"numpy" if np is not None else "pure Python fallback"}\n')
+    for size in (10_000, 100_000):
+        run(size)
@@ -6,22 +6,51 @@ Command-line interface for managing food intake, nutrition, and recipes
 
 import sys
 import argparse
-import json
+import shlex
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 import os
 
-from db_service import DatabaseService
-from ai_assistant import AIAssistantService
+from db_service import DatabaseService, SEARCH_TYPES
+
+# ai_assistant, nutrition_calculator and meal_parser are imported by the
+# commands that use them, so the common commands start without loading them
+
+# Commands that never write; these open the database read-only and skip the
+# schema check, unless the database is missing or needs migrating
+READ_ONLY_COMMANDS = {'list-meals', 'summary', 'weekly', 'analyze', 'recommend',
+                      'list-ingredients', 'list-recipes', 'search', 'export'}
 
 
 class FoodTrackerCLI:
     """Command-line interface for food tracker"""
     
-    def __init__(self):
+    def __init__(self, read_only: bool = False):
         self.db = DatabaseService()
-        self.db.connect()
-        self.ai = AIAssistantService(self.db)
+        self.db.connect(read_only=read_only)
+        self._ai = None
+        self._parser = None
+    
+    @property
+    def ai(self):
+        """AI assistant, created on first use"""
+        if self._ai is None:
+            from ai_assistant import AIAssistantService
+            self._ai = AIAssistantService(self.db)
+        return self._ai
+    
+    @property
+    def parser(self):
+        """Meal parser, created on first use and kept in sync with catalog changes"""
+        if self._parser is None:
+            from nutrition_calculator import NutritionCalculator
+            from meal_parser import MealParser
+            calculator = NutritionCalculator(self.db)
+            self.db.add_change_listener(calculator.handle_change)
+            self._parser = MealParser(self.db, calculator)
+            self.db.add_change_listener(self._parser.handle_change)
+        return self._parser
     
     def __del__(self):
         """Cleanup database connection"""
@@ -32,11 +61,35 @@ class FoodTrackerCLI:
     
     def add_meal(self, description: str, meal_type: str, date: Optional[str] = None,
                  calories: float = 0, protein: float = 0, carbs: float = 0,
-                 fat: float = 0, fiber: float = 0):
-        """Add a new meal"""
+                 fat: float = 0, fiber: float = 0, parse: bool = False):
+        """Add a new meal, optionally parsing its nutrition from the description"""
         if not date:
             date = datetime.now().strftime('%Y-%m-%d')
         
+        ingredient_data = None
+        if parse:
+            from meal_parser import meal_ingredient_data
+            result = self.parser.parse(description)
+            
+            if not result['lines']:
+                print(f"❌ No ingredients or recipes recognized in '{description}'")
+                sys.exit(1)
+            
+            print(f"\n🔍 Parsed '{description}':")
+            for line in result['lines']:
+                if 'error' in line:
+                    print(f"   ⚠️  {line['name']}: {line['error']}")
+                    continue
+                unit = 'serving(s)' if line['type'] == 'recipe' else f"x {line['measurement']}"
+                print(f"   • {line['name']} - {line['quantity']:g} {unit}: {line['nutrition']['calories']:.0f} kcal")
+            for text in result['unmatched']:
+                print(f"   ❓ Not recognized: {text}")
+            
+            totals = result['totals']
+            calories, protein, carbs = totals['calories'], totals['protein'], totals['carbs']
+            fat, fiber = totals['fat'], totals['fiber']
+            ingredient_data = meal_ingredient_data(result['lines'])
+        
         meal_data = {
             'id': int(datetime.now().timestamp() * 1000),
             'description': description,
@@ -50,7 +103,8 @@ class FoodTrackerCLI:
                 'carbs': carbs,
                 'fat': fat,
                 'fiber': fiber
-            }
+            },
+            'ingredient_data': ingredient_data
         }
         
         try:
@@ -270,8 +324,12 @@ class FoodTrackerCLI:
             
             for nutrient, foods in recommendations.items():
                 print(f"\n📌 {nutrient.upper()}:")
+                if not foods:
+                    print("  No matching foods in the catalog yet.")
                 for food in foods:
-                    print(f"  • {food}")
+                    n = food['nutrition']
+                    print(f"  • {food['name']} ({food['measurement']}) - "
+                          f"{n['calories']:.0f} kcal, {n['protein']:.1f}g protein, {n['fiber']:.1f}g fiber")
             
             print(f"\n{'='*70}\n")
         except Exception as e:
@@ -351,78 +409,149 @@ class FoodTrackerCLI:
             print(f"❌ Error listing recipes: {e}")
             sys.exit(1)
     
-    # ============= EXPORT/IMPORT COMMANDS =============
+    def recompute_recipes(self, ingredient_refs: Optional[list] = None, dry_run: bool = False):
+        """Recompute stored recipe nutrition from current ingredient measurements"""
+        try:
+            ingredients = None
+            if ingredient_refs:
+                ingredients = []
+                for ref in ingredient_refs:
+                    if '.' not in ref:
+                        print(f"❌ Ingredient must be given as CATEGORY.KEY, got '{ref}'")
+                        sys.exit(1)
+                    ingredients.append(tuple(ref.split('.', 1)))
+            
+            report = self.db.recompute_recipes(ingredients, dry_run=dry_run)
+            
+            title = 'Recipe recompute (dry run)' if dry_run else 'Recipe recompute'
+            print(f"\n🔁 {title}\n")
+            
+            if not report['recipes']:
+                print("All recipes are up to date.")
+            
+            for recipe in report['recipes']:
+                b, a = recipe['before'], recipe['after']
+                print(f"📖 {recipe['name']} ({recipe['key']})")
+                print(f"   Per serving: {b['calories']:.0f} → {a['calories']:.0f} kcal, "
+                      f"{b['protein']:.1f} → {a['protein']:.1f}g protein, "
+                      f"{b['carbs']:.1f} → {a['carbs']:.1f}g carbs, "
+                      f"{b['fat']:.1f} → {a['fat']:.1f}g fat, "
+                      f"{b['fiber']:.1f} → {a['fiber']:.1f}g fiber")
+                for ing in recipe['ingredients']:
+                    print(f"     • {ing['name']} - {ing['amount']}: "
+                          f"{ing['before']['calories']:.0f} → {ing['after']['calories']:.0f} kcal")
+            
+            for item in report['unresolved']:
+                print(f"⚠️  Could not resolve '{item['amount']}' of {item['ingredient']} in {item['recipe']}")
+            
+            verb = 'would change' if dry_run else 'updated'
+            print(f"\n{len(report['recipes'])} recipe(s) {verb}\n")
+        except Exception as e:
+            print(f"❌ Error recomputing recipes: {e}")
+            sys.exit(1)
     
-    def export_data(self, output_file: str, data_type: str = 'all'):
-        """Export data to JSON file"""
+    # ============= SEARCH COMMANDS =============
+    
+    def search(self, query: str, types: Optional[list] = None, limit: int = 20, offset: int = 0):
+        """Search ingredients, recipes and meal history"""
         try:
-            data = {}
+            result = self.db.search(query, types, limit, offset)
             
-            if data_type in ['all', 'ingredients']:
-                data['ingredients'] = self.db.get_all_ingredients()
+            print(f"\n🔎 Results for '{query}'\n")
             
-            if data_type in ['all', 'recipes']:
-                data['recipes'] = self.db.get_all_recipes()
+            if not result['results']:
+                print("No matches found.")
             
-            if data_type in ['all', 'meals']:
-                # Export last 90 days of meals
-                end = datetime.now()
-                start = end - timedelta(days=90)
-                data['meals'] = self.db.get_meals_by_date_range(
-                    start.strftime('%Y-%m-%d'),
-                    end.strftime('%Y-%m-%d')
-                )
+            for item in result['results']:
+                if item['type'] == 'meal':
+                    print(f"🍽️  {item['date']} [{item['category']}] {item['name']} (ID: {item['id']})")
+                elif item['type'] == 'ingredient':
+                    print(f"🥕 {item['name']} ({item['category']}.{item['key']})")
+                else:
+                    print(f"📖 {item['name']} ({item['key']})")
             
-            with open(output_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            if result['hasMore']:
+                print(f"\n... more results, use --offset {offset + limit}")
+            print()
+        except Exception as e:
+            print(f"❌ Error searching: {e}")
+            sys.exit(1)
+    
+    # ============= EXPORT/IMPORT COMMANDS =============
+    
+    def export_data(self, output_file: str, data_type: str = 'all', fmt: Optional[str] = None,
+                    since: Optional[str] = None, until: Optional[str] = None, compress: Optional[bool] = None):
+        """Export data to a JSON, NDJSON or CSV file, streaming the full meal history"""
+        from exporter import export_data
+        
+        try:
+            start = time.perf_counter()
+            counts = export_data(self.db, output_file, fmt, data_type, since, until, compress)
+            elapsed = time.perf_counter() - start
             
-            print(f"✅ Data exported to {output_file}")
+            exported = ', '.join(f"{count} {name}" for name, count in counts.items())
+            print(f"✅ Data exported to {output_file} ({exported}, {os.path.getsize(output_file):,} bytes in {elapsed:.2f}s)")
         except Exception as e:
             print(f"❌ Error exporting data: {e}")
             sys.exit(1)
     
-    def import_data(self, input_file: str):
-        """Import data from JSON file"""
+    def import_data(self, input_file: str, merge_strategy: str = 'merge',
+                    batch_size: Optional[int] = None, restart: bool = False):
+        """Import data from a JSON or NDJSON export in batched, resumable transactions"""
+        from importer import import_file, IMPORT_BATCH_SIZE
+        
         try:
-            with open(input_file, 'r') as f:
-                data = json.load(f)
-            
-            # Import ingredients
-            if 'ingredients' in data and 'basic_ingredients' in data['ingredients']:
-                for category, items in data['ingredients']['basic_ingredients'].items():
-                    for key, item_data in items.items():
-                        try:
-                            self.db.add_ingredient(category, key, item_data)
-                            print(f"✅ Imported ingredient: {item_data['name']}")
-                        except Exception as e:
-                            print(f"⚠️  Skipped ingredient {item_data.get('name', key)}: {e}")
-            
-            # Import recipes
-            if 'recipes' in data and 'dishes' in data['recipes']:
-                for key, recipe_data in data['recipes']['dishes'].items():
-                    try:
-                        self.db.add_recipe(key, recipe_data)
-                        print(f"✅ Imported recipe: {recipe_data['name']}")
-                    except Exception as e:
-                        print(f"⚠️  Skipped recipe {recipe_data.get('name', key)}: {e}")
-            
-            # Import meals
-            if 'meals' in data:
-                for date, meals in data['meals'].items():
-                    for meal in meals:
-                        try:
-                            self.db.add_meal(meal)
-                        except Exception as e:
-                            pass  # Skip duplicates silently
-            
-            print(f"✅ Data import completed from {input_file}")
+            report = import_file(self.db, input_file, merge_strategy, batch_size or IMPORT_BATCH_SIZE, restart)
+            
+            if report['resumedFrom']:
+                print(f"↩️  Resumed after {report['resumedFrom']:,} records imported earlier")
+            for entity, counts in report['counts'].items():
+                if any(counts.values()):
+                    print(f"📦 {entity.capitalize()}: {counts['inserted']} inserted, {counts['updated']} updated, "
+                          f"{counts['skipped']} skipped, {counts['failed']} failed")
+            for error in report['errors']:
+                print(f"⚠️  Failed {error['entity'][:-1]} {error['key']}: {error['error']}")
+            
+            print(f"✅ Data import completed from {input_file} "
+                  f"({report['records']:,} records in {report['elapsedSeconds']:.2f}s)")
         except Exception as e:
             print(f"❌ Error importing data: {e}")
+            print("   Run the same command again to resume from the last committed batch.")
+            sys.exit(1)
+    
+    def import_trackers(self, paths, merge_strategy: str = 'merge', batch_size: Optional[int] = None,
+                        workers: Optional[int] = None, restart: bool = False):
+        """Import meals from monthly tracker workbooks and CSVs, parsing files in parallel"""
+        from tracker_import import import_trackers
+        from importer import IMPORT_BATCH_SIZE
+        
+        try:
+            report = import_trackers(self.db, paths, merge_strategy, batch_size or IMPORT_BATCH_SIZE, workers, restart)
+            if not report['files']:
+                print("❌ No tracker files (.xlsx or .csv) found")
+                sys.exit(1)
+            
+            for file in report['files']:
+                counts = file['counts']
+                resumed = f", resumed after {file['resumedFrom']:,}" if file['resumedFrom'] else ''
+                print(f"📄 {file['path']}: {file['rows']:,} rows, {counts['inserted']} inserted, "
+                      f"{counts['updated']} updated, {counts['skipped']} skipped, "
+                      f"{counts['failed'] + file['invalidRows']} failed{resumed}")
+                for error in file['errors']:
+                    label = f"row {error['key']}" if error['entity'] == 'rows' else f"meal {error['key']}"
+                    print(f"   ⚠️  {label}: {error['error']}")
+            
+            print(f"✅ Imported {report['importedCount']:,} meals from {len(report['files'])} file(s): "
+                  f"{report['rows']:,} rows in {report['elapsedSeconds']:.2f}s "
+                  f"({report['rowsPerSecond']:,} rows/s, {report['workers']} worker(s))")
+        except Exception as e:
+            print(f"❌ Error importing trackers: {e}")
+            print("   Run the same command again to resume from the last committed batch.")
             sys.exit(1)
 
 
-def main():
-    """Main CLI entry point"""
+def build_parser() -> argparse.ArgumentParser:
+    """Argument parser for all CLI commands"""
     parser = argparse.ArgumentParser(
         description='Food Tracker CLI - Manage your food intake and nutrition',
         formatter_class=argparse.RawDescriptionHelpFormatter
@@ -440,6 +569,8 @@ def main():
     add_meal_parser.add_argument('--carbs', type=float, default=0, help='Carbohydrates (g)')
     add_meal_parser.add_argument('--fat', type=float, default=0, help='Fat (g)')
     add_meal_parser.add_argument('--fiber', type=float, default=0, help='Fiber (g)')
+    add_meal_parser.add_argument('--parse', action='store_true',
+                                help='Calculate nutrition by parsing the description against the catalog')
     
     list_meals_parser = subparsers.add_parser('list-meals', help='List meals')
     list_meals_parser.add_argument('--date', help='Date (YYYY-MM-DD, default: today)')
@@ -482,28 +613,65 @@ def main():
     # Recipe commands
     subparsers.add_parser('list-recipes', help='List all recipes')
     
+    recompute_parser = subparsers.add_parser('recompute-recipes',
+                                             help='Recompute recipe nutrition from current ingredient measurements')
+    recompute_parser.add_argument('--ingredient', action='append', metavar='CATEGORY.KEY',
+                                  help='Only recipes using this ingredient (repeatable, default: all recipes)')
+    recompute_parser.add_argument('--dry-run', action='store_true', help='Show what would change without writing')
+    
+    # Search commands
+    search_parser = subparsers.add_parser('search', help='Search ingredients, recipes and meal history')
+    search_parser.add_argument('query', help='Search words (each matches as a prefix)')
+    search_parser.add_argument('--type', action='append', choices=list(SEARCH_TYPES),
+                               help='Only this result type (repeatable, default: all)')
+    search_parser.add_argument('--limit', type=int, default=20, help='Results per page')
+    search_parser.add_argument('--offset', type=int, default=0, help='Results to skip')
+    
     # Export/Import commands
-    export_parser = subparsers.add_parser('export', help='Export data to JSON')
-    export_parser.add_argument('output_file', help='Output file path')
+    export_parser = subparsers.add_parser('export', help='Export data to JSON, NDJSON or CSV')
+    export_parser.add_argument('output_file', help='Output file path (.json, .ndjson or .csv, optionally .gz)')
     export_parser.add_argument('--type', default='all', choices=['all', 'ingredients', 'recipes', 'meals'],
                               help='Data type to export')
-    
-    import_parser = subparsers.add_parser('import', help='Import data from JSON')
-    import_parser.add_argument('input_file', help='Input file path')
-    
-    args = parser.parse_args()
-    
-    if not args.command:
-        parser.print_help()
-        sys.exit(0)
-    
-    # Initialize CLI
-    cli = FoodTrackerCLI()
-    
-    # Execute command
+    export_parser.add_argument('--format', choices=['json', 'ndjson', 'csv'],
+                               help='Output format (default: from the file extension; ndjson and csv hold meals only)')
+    export_parser.add_argument('--since', help='First meal date to export (YYYY-MM-DD, default: full history)')
+    export_parser.add_argument('--until', help='Last meal date to export (YYYY-MM-DD)')
+    export_parser.add_argument('--gzip', action='store_true', default=None,
+                               help='Compress the output (default: when the file name ends in .gz)')
+    
+    import_parser = subparsers.add_parser('import', help='Import data from JSON or NDJSON')
+    import_parser.add_argument('input_file', help='Input file path (.json or .ndjson, optionally .gz)')
+    import_parser.add_argument('--merge-strategy', default='merge', choices=['merge', 'merge-duplicates', 'replace'],
+                               help='Existing records: keep (merge), overwrite (merge-duplicates), '
+                                    'or delete all meals first (replace)')
+    import_parser.add_argument('--batch-size', type=int, help='Records per transaction (default: 500)')
+    import_parser.add_argument('--restart', action='store_true',
+                               help='Start over instead of resuming an interrupted import of this file')
+    
+    import_tracker_parser = subparsers.add_parser('import-tracker', help='Import meals from tracker workbooks or CSVs')
+    import_tracker_parser.add_argument('paths', nargs='+',
+                                       help='Tracker files (.xlsx, one sheet per day, or .csv) or directories of them')
+    import_tracker_parser.add_argument('--merge-strategy', default='merge',
+                                       choices=['merge', 'merge-duplicates', 'replace'],
+                                       help='Meals already logged: keep (merge), overwrite (merge-duplicates), '
+                                            'or delete all meals first (replace)')
+    import_tracker_parser.add_argument('--batch-size', type=int, help='Meals per transaction (default: 500)')
+    import_tracker_parser.add_argument('--workers', type=int,
+                                       help='Processes parsing files in parallel (default: one per CPU)')
+    import_tracker_parser.add_argument('--restart', action='store_true',
+                                       help='Start over instead of resuming an interrupted import of these files')
+    
+    # Interactive mode
+    subparsers.add_parser('shell', help='Run commands interactively with one open database')
+    
+    return parser
+
+
+def run_command(cli: FoodTrackerCLI, args: argparse.Namespace):
+    """Execute a parsed command"""
     if args.command == 'add-meal':
         cli.add_meal(args.description, args.meal_type, args.date,
-                    args.calories, args.protein, args.carbs, args.fat, args.fiber)
+                    args.calories, args.protein, args.carbs, args.fat, args.fiber, args.parse)
     elif args.command == 'list-meals':
         cli.list_meals(args.date, args.days)
     elif args.command == 'delete-meal':
@@ -525,10 +693,79 @@ def main():
                           args.calories, args.protein, args.carbs, args.fat, args.fiber)
     elif args.command == 'list-recipes':
         cli.list_recipes()
+    elif args.command == 'recompute-recipes':
+        cli.recompute_recipes(args.ingredient, args.dry_run)
+    elif args.command == 'search':
+        cli.search(args.query, args.type, args.limit, args.offset)
     elif args.command == 'export':
-        cli.export_data(args.output_file, args.type)
+        cli.export_data(args.output_file, args.type, args.format, args.since, args.until, args.gzip)
     elif args.command == 'import':
-        cli.import_data(args.input_file)
+        cli.import_data(args.input_file, args.merge_strategy, args.batch_size, args.restart)
+    elif args.command == 'import-tracker':
+        cli.import_trackers(args.paths, args.merge_strategy, args.batch_size, args.workers, args.restart)
+
+
+def run_shell(parser: argparse.ArgumentParser):
+    """Read and run commands until exit, keeping the connection and caches warm"""
+    try:
+        import readline  # noqa: F401 - line editing and history for input()
+    except ImportError:
+        pass
+    
+    cli = FoodTrackerCLI()
+    print("🍽️  Food Tracker shell - type a command without 'cli.py', 'help' for commands, 'exit' to quit")
+    
+    while True:
+        try:
+            line = input('food> ').strip()
+        except EOFError:
+            print()
+            break
+        except KeyboardInterrupt:
+            print()
+            continue
+        
+        if not line:
+            continue
+        if line in ('exit', 'quit'):
+            break
+        if line == 'help':
+            parser.print_help()
+            continue
+        
+        try:
+            args = parser.parse_args(shlex.split(line))
+        except ValueError as e:
+            print(f"❌ {e}")
+            continue
+        except SystemExit:
+            continue  # argparse has already printed the usage error
+        
+        if not args.command or args.command == 'shell':
+            continue
+        
+        # Commands exit on errors; in the shell that only ends the command
+        try:
+            run_command(cli, args)
+        except SystemExit:
+            pass
+
+
+def main():
+    """Main CLI entry point"""
+    parser = build_parser()
+    args = parser.parse_args()
+    
+    if not args.command:
+        parser.print_help()
+        sys.exit(0)
+    
+    if args.command == 'shell':
+        run_shell(parser)
+        return
+    
+    cli = FoodTrackerCLI(read_only=args.command in READ_ONLY_COMMANDS)
+    run_command(cli, args)
 
 
 if __name__ == '__main__':
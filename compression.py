@@ -0,0 +1,170 @@
+"""
+Response Compression for Food Tracker
+Content-encoding negotiation for dynamic responses and precompressed static assets
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is listed in requirements.txt
+    brotli = None
+
+
+# Dynamic responses smaller than this aren't worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/html', 'text/css', 'text/plain',
+                      'text/javascript', 'application/javascript', 'image/svg+xml')
+
+# Static files, relative to the root, that get precompressed .gz/.br
+# siblings at start-up; any other file is served as it is, so requests can't
+# make the server write files elsewhere in the tree
+PRECOMPRESSED_FILES = ('food_tracker.html',)
+
+# Browser cache lifetime for static assets other than HTML pages, which are
+# always revalidated so a deploy is picked up on the next load
+STATIC_MAX_AGE = 7 * 24 * 3600
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported encoding from an Accept-Encoding header, or None for identity"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+    
+    for coding in ('br', 'gzip'):
+        if coding == 'br' and brotli is None:
+            continue
+        if accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return None
+
+
+def compress(data: bytes, encoding: str, static: bool = False) -> bytes:
+    """Compress bytes; static assets use the slowest, smallest settings"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if static else 5)
+    return gzip.compress(data, compresslevel=9 if static else 6, mtime=0)
+
+
+def compress_response(response):
+    """after_request hook compressing large dynamic responses the client accepts"""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+    data = response.get_data()
+    if not encoding or len(data) < MIN_COMPRESS_SIZE:
+        return response
+    
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+class StaticAssets:
+    """Precompressed, content-hashed static files served with cache validators"""
+    
+    def __init__(self, root: str, files: Tuple[str, ...] = PRECOMPRESSED_FILES):
+        self.root = root
+        self.files = files
+        self._assets = {}
+        self._lock = threading.Lock()
+    
+    def precompress_all(self):
+        """Write .gz/.br siblings for each of the precompressed files"""
+        for filename in self.files:
+            self.prepare(filename)
+        print(f'✅ Precompressed {len(self._assets)} static file(s)')
+    
+    def prepare(self, filename: str) -> Optional[Dict]:
+        """Hash one of the precompressed files and (re)write its compressed siblings when it changed"""
+        if filename not in self.files:
+            return None
+        # Start-up precompression runs alongside the first requests
+        with self._lock:
+            return self._prepare(filename)
+    
+    def _prepare(self, filename: str) -> Optional[Dict]:
+        path = safe_join(self.root, filename)
+        try:
+            mtime = os.path.getmtime(path)
+        except (OSError, TypeError):
+            return None
+        
+        asset = self._assets.get(filename)
+        if asset and asset['mtime'] == mtime:
+            return asset
+        
+        with open(path, 'rb') as f:
+            data = f.read()
+        
+        asset = {
+            'mtime': mtime,
+            'etag': hashlib.sha256(data).hexdigest()[:20],
+            'mimetype': mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+            'variants': {}
+        }
+        
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if encoding == 'br' and brotli is None:
+                continue
+            sibling = path + suffix
+            try:
+                if not os.path.exists(sibling) or os.path.getmtime(sibling) < mtime:
+                    with open(sibling, 'wb') as f:
+                        f.write(compress(data, encoding, static=True))
+                asset['variants'][encoding] = filename + suffix
+            except OSError as error:
+                print(f'⚠️  Could not write {sibling}: {error}')
+        
+        self._assets[filename] = asset
+        return asset
+    
+    def send(self, filename: str):
+        """Serve a static file, preferring a precompressed variant the client accepts"""
+        asset = self.prepare(filename)
+        if asset is None:
+            return send_from_directory(self.root, filename)
+        
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+        variant = asset['variants'].get(encoding)
+        if variant is None:
+            encoding = None
+            variant = filename
+        
+        # Each encoding is a separate representation with its own validator
+        etag = f'{asset["etag"]}-{encoding}' if encoding else asset['etag']
+        html = asset['mimetype'] == 'text/html'
+        
+        response = send_from_directory(
+            self.root, variant, mimetype=asset['mimetype'], etag=etag,
+            max_age=0 if html else STATIC_MAX_AGE, conditional=True
+        )
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        if html:
+            response.cache_control.no_cache = True
+        return response
@@ -108,6 +108,221 @@ CREATE INDEX IF NOT EXISTS idx_meals_date ON meals(date);
 CREATE INDEX IF NOT EXISTS idx_meals_meal_type ON meals(meal_type);
 CREATE INDEX IF NOT EXISTS idx_daily_summary_date ON daily_summary(date);
 CREATE INDEX IF NOT EXISTS idx_recipe_ingredients_recipe ON recipe_ingredients(recipe_id);
+CREATE INDEX IF NOT EXISTS idx_recipe_ingredients_key ON recipe_ingredients(ingredient_key);
+
+-- Catalog version, bumped on every ingredient or recipe write so clients can
+-- tell whether their cached catalog is still current
+CREATE TABLE IF NOT EXISTS catalog_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_ingredients_insert AFTER INSERT ON ingredients
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_ingredients_update AFTER UPDATE ON ingredients
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_ingredients_delete AFTER DELETE ON ingredients
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_ingredient_measurements_insert AFTER INSERT ON ingredient_measurements
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_ingredient_measurements_update AFTER UPDATE ON ingredient_measurements
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_ingredient_measurements_delete AFTER DELETE ON ingredient_measurements
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_recipes_insert AFTER INSERT ON recipes
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_recipes_update AFTER UPDATE ON recipes
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_recipes_delete AFTER DELETE ON recipes
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_recipe_nutrition_insert AFTER INSERT ON recipe_nutrition
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_recipe_nutrition_update AFTER UPDATE ON recipe_nutrition
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_recipe_nutrition_delete AFTER DELETE ON recipe_nutrition
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_recipe_ingredients_insert AFTER INSERT ON recipe_ingredients
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_recipe_ingredients_update AFTER UPDATE ON recipe_ingredients
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_recipe_ingredients_delete AFTER DELETE ON recipe_ingredients
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+-- Meal change log, written by triggers so changes from any process (web
+-- server workers, CLI) can be pushed to connected clients
+CREATE TABLE IF NOT EXISTS change_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    entity TEXT NOT NULL,
+    action TEXT NOT NULL,
+    entity_id INTEGER,
+    date TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TRIGGER IF NOT EXISTS change_log_meals_insert AFTER INSERT ON meals
+BEGIN
+    INSERT INTO change_log (entity, action, entity_id, date) VALUES ('meal', 'add', NEW.id, NEW.date);
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_meals_update AFTER UPDATE ON meals
+BEGIN
+    INSERT INTO change_log (entity, action, entity_id, date)
+    SELECT 'meal', 'delete', OLD.id, OLD.date WHERE OLD.date != NEW.date;
+    INSERT INTO change_log (entity, action, entity_id, date) VALUES ('meal', 'update', NEW.id, NEW.date);
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_meals_delete AFTER DELETE ON meals
+BEGIN
+    INSERT INTO change_log (entity, action, entity_id, date) VALUES ('meal', 'delete', OLD.id, OLD.date);
+END;
+
+-- Cached AI chat responses, keyed on the normalized question and bucketed
+-- nutrition context; evicted by age and least recent use
+CREATE TABLE IF NOT EXISTS ai_response_cache (
+    cache_key TEXT PRIMARY KEY,
+    message TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    hits INTEGER DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_ai_response_cache_last_used ON ai_response_cache(last_used_at);
+
+-- Progress of interrupted imports: records committed so far from a source
+-- file and the running counts, saved in the same transaction as each batch
+CREATE TABLE IF NOT EXISTS import_progress (
+    source TEXT PRIMARY KEY,
+    records INTEGER NOT NULL,
+    counts TEXT NOT NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Full-text search indexes (external content tables kept in sync by the triggers below)
+CREATE VIRTUAL TABLE IF NOT EXISTS ingredients_fts USING fts5(
+    name, content='ingredients', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5(
+    name, category, content='recipes', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS recipe_ingredients_fts USING fts5(
+    ingredient_name, content='recipe_ingredients', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS meals_fts USING fts5(
+    description, content='meals', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS ingredients_fts_insert AFTER INSERT ON ingredients
+BEGIN
+    INSERT INTO ingredients_fts (rowid, name) VALUES (NEW.id, NEW.name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS ingredients_fts_delete AFTER DELETE ON ingredients
+BEGIN
+    INSERT INTO ingredients_fts (ingredients_fts, rowid, name) VALUES ('delete', OLD.id, OLD.name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS ingredients_fts_update AFTER UPDATE OF name ON ingredients
+BEGIN
+    INSERT INTO ingredients_fts (ingredients_fts, rowid, name) VALUES ('delete', OLD.id, OLD.name);
+    INSERT INTO ingredients_fts (rowid, name) VALUES (NEW.id, NEW.name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS recipes_fts_insert AFTER INSERT ON recipes
+BEGIN
+    INSERT INTO recipes_fts (rowid, name, category) VALUES (NEW.id, NEW.name, NEW.category);
+END;
+
+CREATE TRIGGER IF NOT EXISTS recipes_fts_delete AFTER DELETE ON recipes
+BEGIN
+    INSERT INTO recipes_fts (recipes_fts, rowid, name, category) VALUES ('delete', OLD.id, OLD.name, OLD.category);
+END;
+
+CREATE TRIGGER IF NOT EXISTS recipes_fts_update AFTER UPDATE OF name, category ON recipes
+BEGIN
+    INSERT INTO recipes_fts (recipes_fts, rowid, name, category) VALUES ('delete', OLD.id, OLD.name, OLD.category);
+    INSERT INTO recipes_fts (rowid, name, category) VALUES (NEW.id, NEW.name, NEW.category);
+END;
+
+CREATE TRIGGER IF NOT EXISTS recipe_ingredients_fts_insert AFTER INSERT ON recipe_ingredients
+BEGIN
+    INSERT INTO recipe_ingredients_fts (rowid, ingredient_name) VALUES (NEW.id, NEW.ingredient_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS recipe_ingredients_fts_delete AFTER DELETE ON recipe_ingredients
+BEGIN
+    INSERT INTO recipe_ingredients_fts (recipe_ingredients_fts, rowid, ingredient_name)
+    VALUES ('delete', OLD.id, OLD.ingredient_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS recipe_ingredients_fts_update AFTER UPDATE OF ingredient_name ON recipe_ingredients
+BEGIN
+    INSERT INTO recipe_ingredients_fts (recipe_ingredients_fts, rowid, ingredient_name)
+    VALUES ('delete', OLD.id, OLD.ingredient_name);
+    INSERT INTO recipe_ingredients_fts (rowid, ingredient_name) VALUES (NEW.id, NEW.ingredient_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS meals_fts_insert AFTER INSERT ON meals
+BEGIN
+    INSERT INTO meals_fts (rowid, description) VALUES (NEW.id, NEW.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS meals_fts_delete AFTER DELETE ON meals
+BEGIN
+    INSERT INTO meals_fts (meals_fts, rowid, description) VALUES ('delete', OLD.id, OLD.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS meals_fts_update AFTER UPDATE OF description ON meals
+BEGIN
+    INSERT INTO meals_fts (meals_fts, rowid, description) VALUES ('delete', OLD.id, OLD.description);
+    INSERT INTO meals_fts (rowid, description) VALUES (NEW.id, NEW.description);
+END;
 
 -- Triggers to update daily summary
 CREATE TRIGGER IF NOT EXISTS update_daily_summary_on_insert
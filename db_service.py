@@ -4,10 +4,25 @@ SQLite database operations for ingredients, recipes, meals, and analytics
 """
 
 import sqlite3
-import json
 import os
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+import re
+import threading
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Any, Tuple
+
+import json_codec
+from amount_parser import measurement_slug, parse_amount, per_serving, scale_nutrition
+
+
+NUTRIENTS = ('calories', 'protein', 'carbs', 'fat', 'fiber')
+
+# Full-text search tables defined in schema.sql
+FTS_TABLES = ('ingredients_fts', 'recipes_fts', 'recipe_ingredients_fts', 'meals_fts')
+
+# Result types accepted by search()
+SEARCH_TYPES = ('ingredient', 'recipe', 'meal')
 
 
 class DatabaseService:
@@ -16,10 +31,24 @@ class DatabaseService:
     def __init__(self, db_path='./database/food_tracker.db'):
         self.db_path = db_path
         self.conn = None
+        self.change_listeners = []
+        # Serializes all use of the shared connection: writes, transactions
+        # and reads, so no thread reads another's uncommitted writes
+        self._write_lock = threading.RLock()
+        self._transaction_depth = 0
+        self._pending_events = []
     
-    def connect(self):
-        """Initialize database connection and create tables if needed"""
+    def connect(self, read_only: bool = False):
+        """Initialize database connection and create tables if needed.
+        
+        With read_only, an existing database whose schema is up to date is
+        opened without write access and no DDL runs; otherwise it is opened
+        read-write and migrated as usual.
+        """
         try:
+            if read_only and self._connect_read_only():
+                return
+            
             # Create database directory if it doesn't exist
             db_dir = os.path.dirname(self.db_path)
             if db_dir and not os.path.exists(db_dir):
@@ -36,21 +65,69 @@ class DatabaseService:
             print(f'Error connecting to database: {e}')
             raise
     
+    def _connect_read_only(self) -> bool:
+        """Open the database read-only if it exists and needs no migration"""
+        schema_path = self._schema_path()
+        if not os.path.exists(self.db_path) or not os.path.exists(schema_path):
+            return False
+        
+        # Escape the characters SQLite treats specially in URI filenames
+        path = os.path.abspath(self.db_path).replace('%', '%25').replace('?', '%3f').replace('#', '%23')
+        uri = f'file:{path}?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        with open(schema_path, 'r') as f:
+            current = conn.execute('PRAGMA user_version').fetchone()[0] == self.schema_version(f.read())
+        if not current:
+            conn.close()
+            return False
+        
+        self.conn = conn
+        self.conn.row_factory = sqlite3.Row
+        print(f'Connected to SQLite database at {self.db_path} (read-only)')
+        return True
+    
+    @staticmethod
+    def _schema_path() -> str:
+        schema_path = os.path.join(os.path.dirname(__file__), 'database', 'schema.sql')
+        
+        # Try alternate locations for schema.sql
+        if not os.path.exists(schema_path):
+            schema_path = './database/schema.sql'
+        if not os.path.exists(schema_path):
+            schema_path = 'database/schema.sql'
+        return schema_path
+    
+    @staticmethod
+    def schema_version(schema: str) -> int:
+        """Checksum of a schema script, stored in PRAGMA user_version once applied"""
+        return zlib.crc32(schema.encode('utf-8')) & 0x7fffffff
+    
     def _create_tables(self):
         """Create database tables from schema.sql"""
         try:
-            schema_path = os.path.join(os.path.dirname(__file__), 'database', 'schema.sql')
-            
-            # Try alternate locations for schema.sql
-            if not os.path.exists(schema_path):
-                schema_path = './database/schema.sql'
-            if not os.path.exists(schema_path):
-                schema_path = 'database/schema.sql'
+            schema_path = self._schema_path()
             
             if os.path.exists(schema_path):
                 with open(schema_path, 'r') as f:
                     schema = f.read()
+                
+                # Skip the script when this exact schema was already applied
+                schema_version = self.schema_version(schema)
+                if self.conn.execute('PRAGMA user_version').fetchone()[0] == schema_version:
+                    print(f'✅ Database schema up to date ({schema_path})')
+                    return
+                
+                existing = {
+                    row['name'] for row in
+                    self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+                }
                 self.conn.executescript(schema)
+                
+                # Index rows written before the search tables existed
+                for table in FTS_TABLES:
+                    if table not in existing:
+                        self.conn.execute(f"INSERT INTO {table} ({table}) VALUES ('rebuild')")
+                self.conn.execute(f'PRAGMA user_version = {schema_version}')
                 self.conn.commit()
                 print(f'✅ Database tables created/verified from {schema_path}')
             else:
@@ -163,25 +240,127 @@ class DatabaseService:
     
     def execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
         """Execute a SQL statement and return cursor"""
-        cursor = self.conn.cursor()
-        cursor.execute(sql, params)
-        self.conn.commit()
-        return cursor
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute(sql, params)
+            if not self._transaction_depth:
+                self.conn.commit()
+            return cursor
+    
+    @contextmanager
+    def transaction(self):
+        """Group writes into one atomic transaction.
+        
+        execute() skips its per-statement commit while a transaction is open, and
+        change events are held back until the outermost transaction commits.
+        Transactions nest; only the outermost one commits or rolls back.
+        """
+        with self._write_lock:
+            self._transaction_depth += 1
+            try:
+                yield self
+            except Exception:
+                self._transaction_depth -= 1
+                if not self._transaction_depth:
+                    self.conn.rollback()
+                    self._pending_events = []
+                raise
+            
+            self._transaction_depth -= 1
+            if self._transaction_depth:
+                return
+            
+            self.conn.commit()
+            events, self._pending_events = self._pending_events, []
+        
+        for event in events:
+            self._dispatch_change(event)
+    
+    @contextmanager
+    def savepoint(self):
+        """Undo only this block's writes if it raises, leaving the open transaction intact.
+        
+        Meant for use inside transaction(), so one bad record in a batch
+        doesn't roll back the rest.
+        """
+        with self._write_lock:
+            if not self.conn.in_transaction:
+                self.conn.execute('BEGIN')
+            pending = len(self._pending_events)
+            self.conn.execute('SAVEPOINT record')
+            try:
+                yield self
+            except Exception:
+                self.conn.execute('ROLLBACK TO record')
+                self.conn.execute('RELEASE record')
+                del self._pending_events[pending:]
+                raise
+            self.conn.execute('RELEASE record')
+    
+    @contextmanager
+    def read_snapshot(self):
+        """Run several reads against one consistent view of the database.
+        
+        Holds the write lock and an open read transaction, so neither this
+        process nor another one can commit between the reads.
+        """
+        with self._write_lock:
+            if self._transaction_depth or self.conn.in_transaction:
+                yield self
+                return
+            
+            self.conn.execute('BEGIN')
+            try:
+                yield self
+            finally:
+                self.conn.commit()
     
     def fetch_one(self, sql: str, params: tuple = ()) -> Optional[Dict]:
-        """Fetch one row as dictionary"""
-        cursor = self.conn.cursor()
-        cursor.execute(sql, params)
-        row = cursor.fetchone()
+        """Fetch one row as dictionary.
+        
+        Waits for a transaction open on another thread to finish, so only
+        committed rows are seen.
+        """
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
         return dict(row) if row else None
     
     def fetch_all(self, sql: str, params: tuple = ()) -> List[Dict]:
-        """Fetch all rows as list of dictionaries"""
-        cursor = self.conn.cursor()
-        cursor.execute(sql, params)
-        rows = cursor.fetchall()
+        """Fetch all rows as list of dictionaries, waiting like fetch_one"""
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
         return [dict(row) for row in rows]
     
+    # ============= CHANGE NOTIFICATIONS =============
+    
+    def add_change_listener(self, callback):
+        """Register a callback invoked with an event dict after each catalog write"""
+        self.change_listeners.append(callback)
+    
+    def _notify_change(self, entity: str, action: str, **fields):
+        """Send a change event to all listeners, or queue it until the open transaction commits"""
+        event = {'entity': entity, 'action': action, **fields}
+        
+        with self._write_lock:
+            if self._transaction_depth:
+                self._pending_events.append(event)
+                return
+        
+        self._dispatch_change(event)
+    
+    def _dispatch_change(self, event: Dict):
+        """Invoke every change listener with one event"""
+        entity, action = event['entity'], event['action']
+        for callback in self.change_listeners:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f'Error in change listener for {entity} {action}: {e}')
+    
     # ============= INGREDIENTS METHODS =============
     
     def get_all_ingredients(self) -> Dict:
@@ -276,6 +455,7 @@ class DatabaseService:
                         raise Exception('Measurement key already exists for this ingredient')
                     raise
         
+        self._notify_change('ingredient', 'add', category=category, key=ingredient_key)
         return {'success': True, 'ingredientId': ingredient_id}
     
     def update_ingredient(self, category: str, ingredient_key: str, ingredient_data: Dict):
@@ -294,34 +474,40 @@ class DatabaseService:
         if not ingredient:
             raise Exception('Ingredient not found')
         
-        # Update ingredient name
-        self.execute(
-            'UPDATE ingredients SET name = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
-            (ingredient_data['name'], ingredient['id'])
-        )
-        
-        # Delete old measurements
-        self.execute('DELETE FROM ingredient_measurements WHERE ingredient_id = ?', (ingredient['id'],))
-        
-        # Insert new measurements
-        if 'measurements' in ingredient_data:
-            for measure_key, nutrition in ingredient_data['measurements'].items():
-                self.execute(
-                    """INSERT INTO ingredient_measurements 
-                    (ingredient_id, measurement_key, calories, protein, carbs, fat, fiber) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                    (
-                        ingredient['id'],
-                        measure_key,
-                        nutrition.get('calories', 0),
-                        nutrition.get('protein', 0),
-                        nutrition.get('carbs', 0),
-                        nutrition.get('fat', 0),
-                        nutrition.get('fiber', 0)
+        with self.transaction():
+            # Update ingredient name
+            self.execute(
+                'UPDATE ingredients SET name = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                (ingredient_data['name'], ingredient['id'])
+            )
+            
+            # Delete old measurements
+            self.execute('DELETE FROM ingredient_measurements WHERE ingredient_id = ?', (ingredient['id'],))
+            
+            # Insert new measurements
+            if 'measurements' in ingredient_data:
+                for measure_key, nutrition in ingredient_data['measurements'].items():
+                    self.execute(
+                        """INSERT INTO ingredient_measurements 
+                        (ingredient_id, measurement_key, calories, protein, carbs, fat, fiber) 
+                        VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                        (
+                            ingredient['id'],
+                            measure_key,
+                            nutrition.get('calories', 0),
+                            nutrition.get('protein', 0),
+                            nutrition.get('carbs', 0),
+                            nutrition.get('fat', 0),
+                            nutrition.get('fiber', 0)
+                        )
                     )
-                )
+            
+            self._notify_change('ingredient', 'update', category=category, key=ingredient_key)
+            
+            # Recipes copy ingredient nutrition at save time; refresh the ones using it
+            report = self.recompute_recipes([(category, ingredient_key)])
         
-        return {'success': True}
+        return {'success': True, 'recipesUpdated': len(report['recipes'])}
     
     def delete_ingredient(self, category: str, ingredient_key: str) -> Dict:
         """Delete an ingredient"""
@@ -338,6 +524,7 @@ class DatabaseService:
             raise Exception('Ingredient not found')
         
         self.execute('DELETE FROM ingredients WHERE id = ?', (ingredient['id'],))
+        self._notify_change('ingredient', 'delete', category=category, key=ingredient_key)
         
         return {'success': True, 'name': ingredient['name']}
     
@@ -378,6 +565,45 @@ class DatabaseService:
             'measurements': measurements_obj
         }
     
+    def get_measurement_rows(self, category: Optional[str] = None,
+                             ingredient_key: Optional[str] = None) -> List[Dict]:
+        """Get flat ingredient/measurement nutrition rows, optionally for one ingredient"""
+        query = """
+            SELECT 
+                c.name as category,
+                i.key as ingredient_key,
+                i.name as ingredient_name,
+                m.measurement_key,
+                m.calories, m.protein, m.carbs, m.fat, m.fiber
+            FROM ingredient_measurements m
+            JOIN ingredients i ON m.ingredient_id = i.id
+            JOIN categories c ON i.category_id = c.id
+        """
+        params = ()
+        
+        if category is not None:
+            query += ' WHERE c.name = ? AND i.key = ?'
+            params = (category, ingredient_key)
+        
+        return self.fetch_all(query, params)
+    
+    def get_catalog_name_rows(self, entity: Optional[str] = None, key: Optional[str] = None,
+                              category: Optional[str] = None) -> List[Dict]:
+        """Get type, key, name and category of ingredients and recipes, optionally for one entity"""
+        ingredients = """
+            SELECT 'ingredient' AS type, i.key, i.name, c.name AS category
+            FROM ingredients i
+            JOIN categories c ON i.category_id = c.id
+        """
+        recipes = "SELECT 'recipe' AS type, key, name, category FROM recipes"
+        
+        if entity == 'ingredient':
+            return self.fetch_all(ingredients + ' WHERE c.name = ? AND i.key = ?', (category, key))
+        if entity == 'recipe':
+            return self.fetch_all(recipes + ' WHERE key = ?', (key,))
+        
+        return self.fetch_all(ingredients + ' UNION ALL ' + recipes)
+    
     def get_categories(self) -> List[str]:
         """Get all categories"""
         rows = self.fetch_all('SELECT name FROM categories ORDER BY name')
@@ -437,6 +663,22 @@ class DatabaseService:
         
         return result
     
+    def get_recipe_nutrition_rows(self, recipe_key: Optional[str] = None) -> List[Dict]:
+        """Get flat per-serving recipe nutrition rows, optionally for one recipe"""
+        query = """
+            SELECT r.key, r.name, r.category, r.servings,
+                   rn.calories, rn.protein, rn.carbs, rn.fat, rn.fiber
+            FROM recipes r
+            JOIN recipe_nutrition rn ON r.id = rn.recipe_id
+        """
+        params = ()
+        
+        if recipe_key is not None:
+            query += ' WHERE r.key = ?'
+            params = (recipe_key,)
+        
+        return self.fetch_all(query, params)
+    
     def add_recipe(self, recipe_key: str, recipe_data: Dict):
         """Add a new recipe"""
         cursor = self.execute(
@@ -485,6 +727,7 @@ class DatabaseService:
                     )
                 )
         
+        self._notify_change('recipe', 'add', key=recipe_key)
         return {'success': True, 'recipeId': recipe_id}
     
     def update_recipe(self, recipe_key: str, recipe_data: Dict):
@@ -541,8 +784,13 @@ class DatabaseService:
                     )
                 )
         
+        self._notify_change('recipe', 'update', key=recipe_key)
         return {'success': True}
     
+    def recipe_exists(self, recipe_key: str) -> bool:
+        """Whether a recipe with this key exists"""
+        return self.fetch_one('SELECT id FROM recipes WHERE key = ?', (recipe_key,)) is not None
+    
     def delete_recipe(self, recipe_key: str) -> Dict:
         """Delete a recipe"""
         recipe = self.fetch_one('SELECT id, name FROM recipes WHERE key = ?', (recipe_key,))
@@ -551,9 +799,161 @@ class DatabaseService:
             raise Exception('Recipe not found')
         
         self.execute('DELETE FROM recipes WHERE id = ?', (recipe['id'],))
+        self._notify_change('recipe', 'delete', key=recipe_key)
         
         return {'success': True, 'name': recipe['name']}
     
+    # ============= RECIPE RECOMPUTE =============
+    
+    def recompute_recipes(self, ingredients: Optional[List[Tuple[str, str]]] = None,
+                          dry_run: bool = False) -> Dict:
+        """Recompute stored recipe nutrition from current ingredient measurements.
+        
+        Only recipes that use one of the given (category, ingredient_key) pairs are
+        touched; with no pairs, every recipe is checked. Each recipe ingredient
+        amount ("1.5x 1 cup") is re-resolved against the ingredient's current
+        measurements, and the per-serving totals are rebuilt from the rows. All
+        writes happen in one transaction. With dry_run, nothing is written and
+        the returned report lists what would change.
+        """
+        # recipe_ingredients.ingredient_key is "<category>.<key>" (bare keys in older data)
+        if ingredients is not None:
+            refs = {f'{category}.{key}' for category, key in ingredients}
+            refs.update(key for _, key in ingredients)
+            if not refs:
+                return {'recipes': [], 'unresolved': []}
+            placeholders = ', '.join('?' for _ in refs)
+            recipe_ids = [
+                row['recipe_id'] for row in self.fetch_all(
+                    f'SELECT DISTINCT recipe_id FROM recipe_ingredients WHERE ingredient_key IN ({placeholders})',
+                    tuple(refs)
+                )
+            ]
+        else:
+            refs = None
+            recipe_ids = [row['id'] for row in self.fetch_all('SELECT id FROM recipes')]
+        
+        if not recipe_ids:
+            return {'recipes': [], 'unresolved': []}
+        
+        # Measurement lookup keyed by ingredient reference and measurement slug
+        lookup = {}
+        bare_keys = {}
+        for row in self.get_measurement_rows():
+            nutrition = {n: row[n] or 0 for n in NUTRIENTS}
+            ref = f'{row["category"]}.{row["ingredient_key"]}'
+            lookup.setdefault(ref, {})[measurement_slug(row['measurement_key'])] = nutrition
+            bare_keys.setdefault(row['ingredient_key'], set()).add(ref)
+        
+        placeholders = ', '.join('?' for _ in recipe_ids)
+        recipes = {
+            row['id']: row for row in self.fetch_all(
+                f"""SELECT r.id, r.key, r.name, r.servings,
+                           rn.calories, rn.protein, rn.carbs, rn.fat, rn.fiber
+                    FROM recipes r
+                    LEFT JOIN recipe_nutrition rn ON r.id = rn.recipe_id
+                    WHERE r.id IN ({placeholders})""",
+                tuple(recipe_ids)
+            )
+        }
+        rows = self.fetch_all(
+            f"""SELECT id, recipe_id, ingredient_key, ingredient_name, amount,
+                       calories, protein, carbs, fat, fiber
+                FROM recipe_ingredients
+                WHERE recipe_id IN ({placeholders})
+                ORDER BY recipe_id, id""",
+            tuple(recipe_ids)
+        )
+        
+        report = {'recipes': [], 'unresolved': []}
+        changed_rows = []
+        changed_recipes = []
+        rows_by_recipe = {}
+        for row in rows:
+            # Foreign keys aren't enforced, so skip rows left behind by deleted recipes
+            if row['recipe_id'] in recipes:
+                rows_by_recipe.setdefault(row['recipe_id'], []).append(row)
+        
+        for recipe_id, recipe_rows in rows_by_recipe.items():
+            recipe = recipes[recipe_id]
+            totals = dict.fromkeys(NUTRIENTS, 0)
+            ingredient_diffs = []
+            
+            for row in recipe_rows:
+                stored = {n: row[n] or 0 for n in NUTRIENTS}
+                nutrition = stored
+                ref = row['ingredient_key']
+                
+                if refs is None or ref in refs:
+                    if ref not in lookup and len(bare_keys.get(ref, ())) == 1:
+                        ref = next(iter(bare_keys[ref]))
+                    parsed = parse_amount(row['amount'])
+                    measurement = lookup.get(ref, {}).get(parsed[1]) if parsed else None
+                    
+                    if measurement is None:
+                        report['unresolved'].append({
+                            'recipe': recipe['key'],
+                            'ingredient': row['ingredient_key'],
+                            'amount': row['amount']
+                        })
+                    else:
+                        nutrition = scale_nutrition(measurement, parsed[0])
+                        if any(abs(nutrition[n] - stored[n]) > 1e-6 for n in NUTRIENTS):
+                            changed_rows.append((row['id'], nutrition))
+                            ingredient_diffs.append({
+                                'name': row['ingredient_name'],
+                                'amount': row['amount'],
+                                'before': stored,
+                                'after': {n: round(nutrition[n], 2) for n in NUTRIENTS}
+                            })
+                
+                for n in NUTRIENTS:
+                    totals[n] += nutrition[n]
+            
+            before = {n: recipe[n] or 0 for n in NUTRIENTS}
+            after = per_serving(totals, recipe['servings'])
+            if ingredient_diffs or any(abs(after[n] - before[n]) > 1e-6 for n in NUTRIENTS):
+                changed_recipes.append((recipe_id, recipe['key'], after, recipe['calories'] is None))
+                report['recipes'].append({
+                    'key': recipe['key'],
+                    'name': recipe['name'],
+                    'before': before,
+                    'after': after,
+                    'ingredients': ingredient_diffs
+                })
+        
+        if dry_run or not changed_recipes:
+            return report
+        
+        with self.transaction():
+            for row_id, nutrition in changed_rows:
+                self.execute(
+                    """UPDATE recipe_ingredients
+                       SET calories = ?, protein = ?, carbs = ?, fat = ?, fiber = ?
+                       WHERE id = ?""",
+                    tuple(nutrition[n] for n in NUTRIENTS) + (row_id,)
+                )
+            
+            for recipe_id, recipe_key, after, missing in changed_recipes:
+                if missing:
+                    self.execute(
+                        """INSERT INTO recipe_nutrition 
+                        (recipe_id, calories, protein, carbs, fat, fiber) 
+                        VALUES (?, ?, ?, ?, ?, ?)""",
+                        (recipe_id,) + tuple(after[n] for n in NUTRIENTS)
+                    )
+                else:
+                    self.execute(
+                        """UPDATE recipe_nutrition
+                           SET calories = ?, protein = ?, carbs = ?, fat = ?, fiber = ?
+                           WHERE recipe_id = ?""",
+                        tuple(after[n] for n in NUTRIENTS) + (recipe_id,)
+                    )
+                self.execute('UPDATE recipes SET updated_at = CURRENT_TIMESTAMP WHERE id = ?', (recipe_id,))
+                self._notify_change('recipe', 'update', key=recipe_key)
+        
+        return report
+    
     # ============= MEALS METHODS =============
     
     def get_meals_by_date(self, date: str) -> List[Dict]:
@@ -567,25 +967,7 @@ class DatabaseService:
             (date,)
         )
         
-        return [
-            {
-                'id': meal['id'],
-                'description': meal['description'],
-                'mealType': meal['meal_type'],
-                'date': meal['date'],
-                'timestamp': meal['timestamp'],
-                'source': meal['source'],
-                'nutrition': {
-                    'calories': meal['calories'],
-                    'protein': meal['protein'],
-                    'carbs': meal['carbs'],
-                    'fat': meal['fat'],
-                    'fiber': meal['fiber']
-                },
-                'ingredient_data': json.loads(meal['ingredient_data']) if meal['ingredient_data'] else None
-            }
-            for meal in meals
-        ]
+        return [self.meal_from_row(meal) for meal in meals]
     
     def get_meals_by_date_range(self, start_date: str, end_date: str) -> Dict:
         """Get all meals within a date range"""
@@ -598,32 +980,94 @@ class DatabaseService:
         
         result = {}
         for meal in meals:
-            date = meal['date']
-            if date not in result:
-                result[date] = []
-            
-            result[date].append({
-                'id': meal['id'],
-                'description': meal['description'],
-                'mealType': meal['meal_type'],
-                'date': meal['date'],
-                'timestamp': meal['timestamp'],
-                'source': meal['source'],
-                'nutrition': {
-                    'calories': meal['calories'],
-                    'protein': meal['protein'],
-                    'carbs': meal['carbs'],
-                    'fat': meal['fat'],
-                    'fiber': meal['fiber']
-                },
-                'ingredient_data': json.loads(meal['ingredient_data']) if meal['ingredient_data'] else None
-            })
+            result.setdefault(meal['date'], []).append(self.meal_from_row(meal))
         
         return result
     
+    def iter_meals(self, since: Optional[str] = None, until: Optional[str] = None,
+                   chunk_size: int = 1000, snapshot: bool = True) -> Iterator[List[Dict]]:
+        """Meals ordered by date and time, in lists of up to chunk_size.
+        
+        Rows are fetched from one cursor a chunk at a time inside a read
+        snapshot, so memory stays flat however long the history is and the
+        export sees one consistent view. since and until are inclusive dates;
+        either may be omitted.
+        
+        The snapshot holds the connection lock until iteration ends. With
+        snapshot=False each chunk is a separate query that takes the lock
+        only while it runs, so slow consumers don't block writers; callers
+        then check for concurrent changes themselves.
+        """
+        conditions, params = [], []
+        if since:
+            conditions.append('date >= ?')
+            params.append(since)
+        if until:
+            conditions.append('date <= ?')
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        if not snapshot:
+            after = []
+            while True:
+                page = conditions + ['(date, timestamp, id) > (?, ?, ?)'] if after else conditions
+                page_where = f"WHERE {' AND '.join(page)}" if page else ''
+                rows = self.fetch_all(f'SELECT * FROM meals {page_where} ORDER BY date, timestamp, id LIMIT ?',
+                                      tuple(params + after + [chunk_size]))
+                if not rows:
+                    return
+                yield [self.meal_from_row(row) for row in rows]
+                after = [rows[-1]['date'], rows[-1]['timestamp'], rows[-1]['id']]
+        
+        with self.read_snapshot():
+            cursor = self.conn.execute(f'SELECT * FROM meals {where} ORDER BY date, timestamp, id', params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield [self.meal_from_row(row) for row in rows]
+    
+    @staticmethod
+    def meal_from_row(meal) -> Dict:
+        """Meal in API shape from a meals table row"""
+        return {
+            'id': meal['id'],
+            'description': meal['description'],
+            'mealType': meal['meal_type'],
+            'date': meal['date'],
+            'timestamp': meal['timestamp'],
+            'source': meal['source'],
+            'nutrition': {
+                'calories': meal['calories'],
+                'protein': meal['protein'],
+                'carbs': meal['carbs'],
+                'fat': meal['fat'],
+                'fiber': meal['fiber']
+            },
+            'ingredient_data': json_codec.loads(meal['ingredient_data']) if meal['ingredient_data'] else None
+        }
+    
+    def get_existing_meal_ids(self, meal_ids: List[int]) -> set:
+        """The subset of meal_ids already in the meals table"""
+        existing = set()
+        # Stay under SQLite's bound parameter limit
+        for i in range(0, len(meal_ids), 500):
+            chunk = meal_ids[i:i + 500]
+            rows = self.fetch_all(
+                f"SELECT id FROM meals WHERE id IN ({', '.join('?' * len(chunk))})", tuple(chunk)
+            )
+            existing.update(row['id'] for row in rows)
+        return existing
+    
+    def delete_all_meals(self) -> int:
+        """Delete every meal, returning how many were deleted"""
+        deleted = self.execute('DELETE FROM meals').rowcount
+        self._notify_change('meal', 'clear')
+        return deleted
+    
     def add_meal(self, meal_data: Dict):
         """Add a new meal"""
-        ingredient_data = json.dumps(meal_data.get('ingredient_data')) if meal_data.get('ingredient_data') else None
+        ingredient_data = json_codec.dumps(meal_data.get('ingredient_data')) if meal_data.get('ingredient_data') else None
         nutrition = meal_data.get('nutrition', {})
         
         cursor = self.execute(
@@ -647,12 +1091,14 @@ class DatabaseService:
             )
         )
         
+        self._notify_change('meal', 'add', id=cursor.lastrowid, date=meal_data.get('date', ''))
         return {'success': True, 'mealId': cursor.lastrowid}
     
     def update_meal(self, meal_id: int, meal_data: Dict):
         """Update an existing meal"""
-        ingredient_data = json.dumps(meal_data.get('ingredient_data')) if meal_data.get('ingredient_data') else None
+        ingredient_data = json_codec.dumps(meal_data.get('ingredient_data')) if meal_data.get('ingredient_data') else None
         nutrition = meal_data.get('nutrition', {})
+        previous = self.fetch_one('SELECT date FROM meals WHERE id = ?', (meal_id,))
         
         self.execute(
             """UPDATE meals 
@@ -675,27 +1121,82 @@ class DatabaseService:
             )
         )
         
+        if previous:
+            self._notify_change('meal', 'update', id=meal_id, date=meal_data.get('date', ''),
+                                previous_date=previous['date'])
         return {'success': True}
     
     def delete_meal(self, meal_id: int):
         """Delete a meal"""
+        previous = self.fetch_one('SELECT date FROM meals WHERE id = ?', (meal_id,))
         self.execute('DELETE FROM meals WHERE id = ?', (meal_id,))
+        if previous:
+            self._notify_change('meal', 'delete', id=meal_id, date=previous['date'])
         return {'success': True}
     
+    def get_change_log(self, after_id: int = 0, limit: int = 1000) -> List[Dict]:
+        """Get meal change log rows newer than after_id, oldest first"""
+        return self.fetch_all(
+            'SELECT id, entity, action, entity_id, date FROM change_log WHERE id > ? ORDER BY id LIMIT ?',
+            (after_id, limit)
+        )
+    
+    def get_change_log_head(self) -> int:
+        """Id of the newest change log row"""
+        row = self.fetch_one('SELECT MAX(id) AS id FROM change_log')
+        return row['id'] or 0
+    
+    def get_meal_data_version(self, start_date: str, end_date: str) -> str:
+        """Version of the meals in a date range, which changes whenever one is added, updated or deleted"""
+        change = self.fetch_one(
+            "SELECT MAX(id) AS id FROM change_log WHERE entity = 'meal' AND date >= ? AND date <= ?",
+            (start_date, end_date)
+        )
+        # The meal count covers meals logged before the change log existed or after it was pruned
+        meals = self.fetch_one(
+            'SELECT COUNT(*) AS count FROM meals WHERE date >= ? AND date <= ?', (start_date, end_date)
+        )
+        return f"{change['id'] or 0}.{meals['count']}"
+    
+    def prune_change_log(self, keep: int):
+        """Delete all but the newest `keep` change log rows"""
+        self.execute('DELETE FROM change_log WHERE id <= (SELECT MAX(id) FROM change_log) - ?', (keep,))
+    
+    def get_meal_types_by_date_range(self, start_date: str, end_date: str) -> Dict[str, List[str]]:
+        """Get the distinct meal types logged on each date within a range"""
+        rows = self.fetch_all(
+            """SELECT date, meal_type FROM meals
+               WHERE date >= ? AND date <= ?
+               GROUP BY date, meal_type
+               ORDER BY date, MIN(timestamp)""",
+            (start_date, end_date)
+        )
+        
+        result = {}
+        for row in rows:
+            result.setdefault(row['date'], []).append(row['meal_type'])
+        
+        return result
+    
+    @staticmethod
+    def empty_daily_summary(date: str) -> Dict:
+        """Summary returned for a date with no logged meals"""
+        return {
+            'date': date,
+            'total_calories': 0,
+            'total_protein': 0,
+            'total_carbs': 0,
+            'total_fat': 0,
+            'total_fiber': 0,
+            'meal_count': 0
+        }
+    
     def get_daily_summary(self, date: str) -> Dict:
         """Get daily nutrition summary"""
         summary = self.fetch_one('SELECT * FROM daily_summary WHERE date = ?', (date,))
         
         if not summary:
-            return {
-                'date': date,
-                'total_calories': 0,
-                'total_protein': 0,
-                'total_carbs': 0,
-                'total_fat': 0,
-                'total_fiber': 0,
-                'meal_count': 0
-            }
+            return self.empty_daily_summary(date)
         
         return dict(summary)
     
@@ -710,6 +1211,212 @@ class DatabaseService:
         
         return summaries
     
+    def get_average_summary(self, start_date: str, end_date: str) -> Dict:
+        """Average daily totals over the days with logged meals in a range"""
+        return self.fetch_one(
+            """SELECT COUNT(*) AS days,
+                      AVG(total_calories) AS calories, AVG(total_protein) AS protein,
+                      AVG(total_carbs) AS carbs, AVG(total_fat) AS fat, AVG(total_fiber) AS fiber
+               FROM daily_summary
+               WHERE date >= ? AND date <= ? AND meal_count > 0""",
+            (start_date, end_date)
+        )
+    
+    def get_meal_description_counts(self, start_date: str, end_date: str) -> List[Dict]:
+        """How often each meal description was logged in a range, most frequent first"""
+        return self.fetch_all(
+            """SELECT description, COUNT(*) AS count FROM meals
+               WHERE date >= ? AND date <= ?
+               GROUP BY description
+               ORDER BY count DESC""",
+            (start_date, end_date)
+        )
+    
+    # ============= BOOTSTRAP =============
+    
+    def get_catalog_version(self) -> int:
+        """Counter bumped by triggers on every ingredient or recipe write"""
+        row = self.fetch_one('SELECT version FROM catalog_version WHERE id = 1')
+        return row['version'] if row else 0
+    
+    def get_bootstrap(self, date: str, known_catalog_version: Optional[int] = None) -> Dict:
+        """Everything the web UI loads on startup, read from one snapshot.
+        
+        The ingredient and recipe catalogs are left out (None) when the client
+        already has the current catalog version.
+        """
+        week_start = (datetime.strptime(date, '%Y-%m-%d') - timedelta(days=6)).strftime('%Y-%m-%d')
+        
+        with self.read_snapshot():
+            version = self.get_catalog_version()
+            catalog_current = known_catalog_version == version
+            
+            return {
+                'date': date,
+                'catalogVersion': version,
+                'catalogChanged': not catalog_current,
+                'ingredients': None if catalog_current else self.get_all_ingredients(),
+                'recipes': None if catalog_current else self.get_all_recipes(),
+                'meals': self.get_meals_by_date(date),
+                'dailySummary': self.get_daily_summary(date),
+                'weeklySummary': self.get_weekly_summary(week_start, date)
+            }
+    
+    # ============= SEARCH METHODS =============
+    
+    @staticmethod
+    def fts_query(text: str) -> Optional[str]:
+        """FTS5 query matching every word of the text as a prefix, or None if it has no words"""
+        words = re.findall(r'\w+', (text or '').lower())
+        if not words:
+            return None
+        return ' '.join(f'"{word}"*' for word in words)
+    
+    def search(self, text: str, types: Optional[List[str]] = None,
+               limit: int = 20, offset: int = 0) -> Dict:
+        """Full-text search across ingredients, recipes and meal history.
+        
+        Every word matches as a prefix. Results from all types are ranked together
+        by bm25; recipes also match through their ingredient names, ranked below
+        direct name matches.
+        """
+        query = self.fts_query(text)
+        types = [t for t in (types or SEARCH_TYPES) if t in SEARCH_TYPES]
+        if not query or not types:
+            return {'query': text, 'results': [], 'limit': limit, 'offset': offset, 'hasMore': False}
+        
+        parts = []
+        params = []
+        
+        if 'ingredient' in types:
+            parts.append(
+                """SELECT 'ingredient' AS type, i.key AS key, NULL AS id, i.name AS name,
+                          c.name AS category, NULL AS date, f.rank AS rank
+                   FROM ingredients_fts f
+                   JOIN ingredients i ON i.id = f.rowid
+                   JOIN categories c ON c.id = i.category_id
+                   WHERE ingredients_fts MATCH ?"""
+            )
+            params.append(query)
+        
+        if 'recipe' in types:
+            parts.append(
+                """SELECT 'recipe' AS type, r.key AS key, NULL AS id, r.name AS name,
+                          r.category AS category, NULL AS date, MIN(hits.rank) AS rank
+                   FROM (
+                       SELECT rowid AS recipe_id, rank FROM recipes_fts WHERE recipes_fts MATCH ?
+                       UNION ALL
+                       SELECT ri.recipe_id, f.rank / 2 FROM recipe_ingredients_fts f
+                       JOIN recipe_ingredients ri ON ri.id = f.rowid
+                       WHERE recipe_ingredients_fts MATCH ?
+                   ) hits
+                   JOIN recipes r ON r.id = hits.recipe_id
+                   GROUP BY r.id"""
+            )
+            params.extend([query, query])
+        
+        if 'meal' in types:
+            parts.append(
+                """SELECT 'meal' AS type, NULL AS key, m.id AS id, m.description AS name,
+                          m.meal_type AS category, m.date AS date, f.rank AS rank
+                   FROM meals_fts f
+                   JOIN meals m ON m.id = f.rowid
+                   WHERE meals_fts MATCH ?"""
+            )
+            params.append(query)
+        
+        # Fetch one extra row to know whether another page exists
+        rows = self.fetch_all(
+            ' UNION ALL '.join(parts) + ' ORDER BY rank, name LIMIT ? OFFSET ?',
+            tuple(params) + (limit + 1, offset)
+        )
+        
+        results = []
+        for row in rows[:limit]:
+            result = {'type': row['type'], 'name': row['name'], 'category': row['category'],
+                      'score': round(-row['rank'], 4)}
+            if row['type'] == 'meal':
+                result.update({'id': row['id'], 'date': row['date']})
+            else:
+                result['key'] = row['key']
+            results.append(result)
+        
+        return {
+            'query': text,
+            'results': results,
+            'limit': limit,
+            'offset': offset,
+            'hasMore': len(rows) > limit
+        }
+    
+    # ============= AI RESPONSE CACHE =============
+    
+    def get_ai_cached_response(self, cache_key: str, min_created_at: float) -> Optional[str]:
+        """Cached AI response created after min_created_at"""
+        row = self.fetch_one(
+            'SELECT response FROM ai_response_cache WHERE cache_key = ? AND created_at >= ?',
+            (cache_key, min_created_at)
+        )
+        return row['response'] if row else None
+    
+    def record_ai_cache_hits(self, hits: Dict[str, Tuple[float, int]]):
+        """Add hit counts and last-used times, {cache_key: (last_used_at, hits)}, in one transaction"""
+        with self.transaction():
+            for cache_key, (last_used_at, count) in hits.items():
+                self.execute(
+                    'UPDATE ai_response_cache SET last_used_at = MAX(last_used_at, ?), hits = hits + ? WHERE cache_key = ?',
+                    (last_used_at, count, cache_key)
+                )
+    
+    def put_ai_cached_response(self, cache_key: str, message: str, response: str, now: float):
+        """Store (or replace) a cached AI response"""
+        self.execute(
+            """INSERT OR REPLACE INTO ai_response_cache
+               (cache_key, message, response, created_at, last_used_at, hits)
+               VALUES (?, ?, ?, ?, ?, 0)""",
+            (cache_key, message, response, now, now)
+        )
+    
+    def evict_ai_cached_responses(self, min_created_at: float, max_entries: int) -> int:
+        """Delete expired responses and all but the max_entries most recently used"""
+        with self.transaction():
+            expired = self.execute(
+                'DELETE FROM ai_response_cache WHERE created_at < ?', (min_created_at,)
+            ).rowcount
+            overflow = self.execute(
+                """DELETE FROM ai_response_cache WHERE cache_key IN (
+                       SELECT cache_key FROM ai_response_cache
+                       ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                   )""",
+                (max_entries,)
+            ).rowcount
+        return expired + overflow
+    
+    def count_ai_cached_responses(self) -> int:
+        """Number of cached AI responses"""
+        return self.fetch_one('SELECT COUNT(*) AS count FROM ai_response_cache')['count']
+    
+    # ============= IMPORT PROGRESS =============
+    
+    def get_import_progress(self, source: str) -> Optional[Dict]:
+        """Records committed and counts so far for an interrupted import of source"""
+        row = self.fetch_one('SELECT records, counts FROM import_progress WHERE source = ?', (source,))
+        if not row:
+            return None
+        return {'records': row['records'], 'counts': json_codec.loads(row['counts'])}
+    
+    def save_import_progress(self, source: str, records: int, counts: Dict):
+        """Record import progress; call inside the transaction that writes the batch"""
+        self.execute(
+            """INSERT OR REPLACE INTO import_progress (source, records, counts, updated_at)
+               VALUES (?, ?, ?, CURRENT_TIMESTAMP)""",
+            (source, records, json_codec.dumps(counts))
+        )
+    
+    def delete_import_progress(self, source: str):
+        """Forget the progress of a finished or restarted import"""
+        self.execute('DELETE FROM import_progress WHERE source = ?', (source,))
+    
     def close(self):
         """Close database connection"""
         if self.conn:
@@ -0,0 +1,227 @@
+"""
+Event Broker for Food Tracker
+Fans out committed data changes to Server-Sent Events subscribers
+"""
+
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+
+import json_codec
+from db_service import DatabaseService, NUTRIENTS
+
+
+# Recent events kept in memory for clients resuming with a cursor
+HISTORY_SIZE = 1000
+
+# Idle streams get a comment line this often so proxies keep them open
+KEEPALIVE_SECONDS = 15
+
+# How often the change log is polled for writes made by other processes;
+# writes through this process's DatabaseService wake the poller immediately
+POLL_INTERVAL_SECONDS = 1.0
+
+# Change log rows kept in the database
+CHANGE_LOG_KEEP = 10000
+
+# Client reconnect delay sent in the stream's retry field
+RETRY_MS = 3000
+
+# Open streams allowed at once. Each one holds a server request thread
+# (gunicorn --threads) for as long as it stays connected, so the cap keeps
+# threads free for the rest of the API.
+MAX_SUBSCRIBERS = int(os.getenv('SSE_MAX_SUBSCRIBERS', 16))
+
+
+class TooManySubscribers(Exception):
+    """Raised when a stream is opened while MAX_SUBSCRIBERS are already connected"""
+
+
+def format_event(event_type: str, data, event_id: Optional[str] = None) -> str:
+    """One Server-Sent Events message with a JSON data line"""
+    message = f'id: {event_id}\n' if event_id is not None else ''
+    return f'{message}event: {event_type}\ndata: {json_codec.dumps(data)}\n\n'
+
+
+class EventStream:
+    """An open subscriber stream whose slot close() frees, even if it was never read"""
+    
+    def __init__(self, first: str, messages: Iterator[str]):
+        self._first = first
+        self._messages = messages
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self) -> str:
+        if self._first is not None:
+            first, self._first = self._first, None
+            return first
+        return next(self._messages)
+    
+    def close(self):
+        self._messages.close()
+
+
+class EventBroker:
+    """Single poller thread publishing change notifications to every subscriber.
+    
+    Events are formatted once and appended to a bounded history; each
+    subscriber waits on a shared condition and streams what it hasn't seen.
+    Event ids are "<epoch>:<sequence>", so a client reconnecting with
+    Last-Event-ID resumes where it left off, or gets a `reset` event telling
+    it to reload when the history (or this process) no longer covers it.
+    """
+    
+    def __init__(self, db_service: DatabaseService, poll_interval: float = POLL_INTERVAL_SECONDS,
+                 max_subscribers: int = MAX_SUBSCRIBERS):
+        self.db = db_service
+        self.poll_interval = poll_interval
+        self.max_subscribers = max_subscribers
+        self.epoch = str(int(time.time() * 1000))
+        self._condition = threading.Condition()
+        self._history = deque(maxlen=HISTORY_SIZE)
+        self._sequence = 0
+        self._log_id = None
+        self._pruned_at = 0
+        self._catalog_version = None
+        self._wake = threading.Event()
+        self._thread = None
+        self.subscribers = 0
+    
+    # ============= PUBLISHING =============
+    
+    def start(self):
+        """Start the poller thread from the current database state"""
+        if self._thread is not None:
+            return
+        
+        with self.db.read_snapshot():
+            self._log_id = self.db.get_change_log_head()
+            self._pruned_at = self._log_id
+            self._catalog_version = self.db.get_catalog_version()
+        
+        self._thread = threading.Thread(target=self._run, name='event-broker', daemon=True)
+        self._thread.start()
+    
+    def handle_change(self, event: Dict):
+        """DatabaseService listener: poll right after a local commit"""
+        self._wake.set()
+    
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self.poll()
+            except Exception as e:
+                print(f'Error polling for data changes: {e}')
+    
+    def poll(self):
+        """Publish meal, summary and catalog events committed since the last poll"""
+        with self.db.read_snapshot():
+            rows = self.db.get_change_log(self._log_id)
+            version = self.db.get_catalog_version()
+            dates = list(dict.fromkeys(row['date'] for row in rows))
+            summaries = [self.db.get_daily_summary(date) for date in dates]
+        
+        events = [
+            ('meal', {'action': row['action'], 'mealId': row['entity_id'], 'date': row['date']})
+            for row in rows
+        ]
+        events.extend(
+            ('summary', {
+                'date': summary['date'],
+                'mealCount': summary['meal_count'],
+                **{n: summary[f'total_{n}'] for n in NUTRIENTS}
+            })
+            for summary in summaries
+        )
+        if version != self._catalog_version:
+            events.append(('catalog', {'version': version}))
+        
+        if rows:
+            self._log_id = rows[-1]['id']
+            if self._log_id - self._pruned_at >= CHANGE_LOG_KEEP:
+                self.db.prune_change_log(CHANGE_LOG_KEEP)
+                self._pruned_at = self._log_id
+        self._catalog_version = version
+        
+        if events:
+            self.publish(events)
+    
+    def publish(self, events: List[tuple]):
+        """Format (type, data) events once and wake every subscriber"""
+        with self._condition:
+            for event_type, data in events:
+                self._sequence += 1
+                message = format_event(event_type, data, f'{self.epoch}:{self._sequence}')
+                self._history.append((self._sequence, message))
+            self._condition.notify_all()
+    
+    # ============= SUBSCRIBING =============
+    
+    def _resume_from(self, cursor: Optional[str]) -> Optional[int]:
+        """Sequence to resume after, or None if the cursor can't be served from history"""
+        if not cursor:
+            return self._sequence
+        
+        epoch, _, sequence = cursor.partition(':')
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        
+        sequence = int(sequence)
+        oldest = self._history[0][0] if self._history else self._sequence + 1
+        if sequence > self._sequence or sequence < oldest - 1:
+            return None
+        return sequence
+    
+    def _reset_message(self) -> str:
+        return format_event('reset', {'catalogVersion': self._catalog_version}, f'{self.epoch}:{self._sequence}')
+    
+    def open_stream(self, cursor: Optional[str] = None) -> Iterator[str]:
+        """stream() with its subscriber slot taken right away.
+        
+        Raises TooManySubscribers now, while the request can still be
+        answered with an error, rather than once the response has started.
+        """
+        messages = self.stream(cursor)
+        return EventStream(next(messages), messages)
+    
+    def stream(self, cursor: Optional[str] = None) -> Iterator[str]:
+        """Server-Sent Events for one subscriber, resuming after cursor if given"""
+        with self._condition:
+            if self.subscribers >= self.max_subscribers:
+                raise TooManySubscribers(f'{self.subscribers} event streams already open')
+            last = self._resume_from(cursor)
+            first = [f'retry: {RETRY_MS}\n\n']
+            if last is None:
+                first.append(self._reset_message())
+                last = self._sequence
+            self.subscribers += 1
+        
+        try:
+            yield ''.join(first)
+            
+            while True:
+                with self._condition:
+                    if self._sequence == last:
+                        self._condition.wait(KEEPALIVE_SECONDS)
+                    
+                    if self._sequence == last:
+                        pending = None
+                    elif self._history and self._history[0][0] > last + 1:
+                        # Fell further behind than the history reaches
+                        pending = [self._reset_message()]
+                    else:
+                        skip = len(self._history) - (self._sequence - last)
+                        pending = [message for _, message in itertools.islice(self._history, skip, None)]
+                    last = self._sequence
+                
+                yield ''.join(pending) if pending else ': keepalive\n\n'
+        finally:
+            with self._condition:
+                self.subscribers -= 1
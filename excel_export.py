@@ -0,0 +1,268 @@
+"""
+Excel Export for Food Tracker
+Monthly tracker workbooks streamed from the database with a write-only workbook
+"""
+
+import os
+import re
+import threading
+from calendar import monthrange
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from db_service import DatabaseService, NUTRIENTS
+
+
+# Where generated monthly workbooks (YYYY-MM.xlsx) are written. Kept apart
+# from the tracker workbooks in trackers/, which are source data for
+# `cli.py import-tracker` and must not be overwritten.
+EXPORT_DIR = os.getenv('EXCEL_EXPORT_DIR',
+                       os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trackers', 'generated'))
+
+# Bump when the workbook layout changes so cached files are regenerated
+LAYOUT_VERSION = 1
+
+# Meals read from the database per chunk
+EXCEL_CHUNK_SIZE = 500
+
+# Builds tried before a workbook is returned even though the month changed
+# while it was written
+BUILD_ATTEMPTS = 2
+
+# Column headings and widths, matching the trackers written by the web app
+EXCEL_COLUMNS = [
+    ('Time', 10), ('Meal Type', 15), ('Meal Description', 40), ('Calories', 10),
+    ('Protein (g)', 12), ('Carbs (g)', 12), ('Fat (g)', 10), ('Fiber (g)', 10),
+    ('Source', 15), ('Ingredients', 50)
+]
+
+SOURCE_LABELS = {'database': 'Database', 'enhanced_ingredient': 'Manual Entry', 'custom': 'Custom'}
+
+MONTH_PATTERN = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')
+
+# Most monthly workbooks one startDate..endDate request writes
+MAX_EXPORT_MONTHS = 24
+
+
+def is_available() -> bool:
+    """Whether openpyxl, which writes the workbooks, is installed"""
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def meal_time(timestamp: str) -> str:
+    """HH:MM in server local time for an ISO timestamp"""
+    try:
+        moment = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return ''
+    if moment.tzinfo:
+        moment = moment.astimezone()
+    return moment.strftime('%H:%M')
+
+
+def ingredients_text(ingredient_data) -> str:
+    """Ingredient names for a meal's ingredient_data: one item (the web UI's
+    {category, key, measurement, quantity}) or a list of them (parsed meals)"""
+    if isinstance(ingredient_data, dict):
+        ingredient_data = [ingredient_data]
+    if not isinstance(ingredient_data, list):
+        return ''
+    return ', '.join(str(item.get('name') or item.get('key', '')) for item in ingredient_data if isinstance(item, dict))
+
+
+def months_from_request(data: Dict) -> List[str]:
+    """Months an /api/export-excel body asks for: month, every month from
+    startDate to endDate, or a YYYY-MM filename, defaulting to the current
+    month. Raises ValueError for malformed values."""
+    if data.get('month') is not None:
+        if not isinstance(data['month'], str) or not MONTH_PATTERN.match(data['month']):
+            raise ValueError('month must be a YYYY-MM string')
+        return [data['month']]
+    
+    if data.get('startDate') or data.get('endDate'):
+        start = _request_date(data.get('startDate') or data.get('endDate'), 'startDate')
+        end = _request_date(data.get('endDate') or data.get('startDate'), 'endDate')
+        if end < start:
+            raise ValueError('endDate must not be before startDate')
+        
+        first, last = start.year * 12 + start.month - 1, end.year * 12 + end.month - 1
+        if last - first >= MAX_EXPORT_MONTHS:
+            raise ValueError(f'At most {MAX_EXPORT_MONTHS} months can be exported at once')
+        return [f'{index // 12:04d}-{index % 12 + 1:02d}' for index in range(first, last + 1)]
+    
+    filename = data.get('filename')
+    stem = os.path.splitext(os.path.basename(filename))[0] if isinstance(filename, str) else ''
+    return [stem if MONTH_PATTERN.match(stem) else datetime.now().strftime('%Y-%m')]
+
+
+def _request_date(value, field: str) -> datetime:
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise ValueError(f'{field} must be a YYYY-MM-DD string')
+
+
+def date_title(date: str) -> str:
+    day = datetime.strptime(date, '%Y-%m-%d')
+    return f"📅 {day.strftime('%A, %B')} {day.day}, {day.year}"
+
+
+def add_styles(workbook):
+    """Register the named cell styles the tracker sheets use.
+    
+    Named styles are registered once per workbook, so each cell only
+    references one instead of hashing its font, fill and border again.
+    """
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+    
+    thin = Side(style='thin')
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    blue = PatternFill('solid', fgColor='4472C4')
+    for style in (
+        NamedStyle('Tracker Header', font=Font(bold=True, color='FFFFFF'), fill=blue, border=border,
+                   alignment=Alignment(horizontal='center', vertical='center')),
+        NamedStyle('Tracker Title', font=Font(bold=True, size=14), fill=PatternFill('solid', fgColor='F2F2F2'),
+                   border=border),
+        NamedStyle('Tracker Meal', border=border, alignment=Alignment(vertical='top', wrap_text=True)),
+        NamedStyle('Tracker Total', font=Font(bold=True, color='FFFFFF'), fill=blue, border=border)
+    ):
+        workbook.add_named_style(style)
+
+
+def write_month_workbook(db: DatabaseService, path: str, start_date: str, end_date: str) -> Dict:
+    """Write one sheet per logged day between the dates and return counts.
+    
+    Uses openpyxl's write-only workbook, which streams rows to disk, and
+    reads meals a chunk at a time, so memory stays flat for large months.
+    Each chunk is its own short query, so writers aren't blocked while the
+    workbook is built. Daily totals are summed from the meals as they are
+    written.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    
+    workbook = Workbook(write_only=True)
+    add_styles(workbook)
+    counts = {'days': 0, 'meals': 0}
+    
+    def row(sheet, values, style):
+        cells = []
+        for value in values:
+            cell = WriteOnlyCell(sheet, value=value)
+            cell.style = style
+            cells.append(cell)
+        sheet.append(cells)
+    
+    def finish_day(sheet, meals, totals):
+        sheet.append([])
+        row(sheet, ['', '', f'📊 Daily Total ({meals} meals)'] + [round(total, 1) for total in totals]
+            + ['SUMMARY', ''], 'Tracker Total')
+    
+    sheet, current_date, day_meals, totals = None, None, 0, None
+    for chunk in db.iter_meals(start_date, end_date, EXCEL_CHUNK_SIZE, snapshot=False):
+        for meal in chunk:
+            if meal['date'] != current_date:
+                if sheet is not None:
+                    finish_day(sheet, day_meals, totals)
+                current_date, day_meals, totals = meal['date'], 0, [0.0] * len(NUTRIENTS)
+                sheet = workbook.create_sheet(current_date)
+                for index, (_, width) in enumerate(EXCEL_COLUMNS):
+                    sheet.column_dimensions[chr(ord('A') + index)].width = width
+                sheet.freeze_panes = 'A2'
+                row(sheet, [heading for heading, _ in EXCEL_COLUMNS], 'Tracker Header')
+                row(sheet, ['', '', date_title(current_date)] + [''] * (len(EXCEL_COLUMNS) - 3), 'Tracker Title')
+                sheet.append([])
+                counts['days'] += 1
+            
+            nutrition = [meal['nutrition'][nutrient] or 0 for nutrient in NUTRIENTS]
+            row(sheet, [meal_time(meal['timestamp']), meal['mealType'], meal['description']] + nutrition
+                + [SOURCE_LABELS.get(meal['source'], meal['source'] or ''), ingredients_text(meal['ingredient_data'])],
+                'Tracker Meal')
+            totals = [total + value for total, value in zip(totals, nutrition)]
+            day_meals += 1
+            counts['meals'] += 1
+    
+    if sheet is not None:
+        finish_day(sheet, day_meals, totals)
+    else:
+        # A workbook needs at least one sheet
+        sheet = workbook.create_sheet('No meals')
+        row(sheet, [heading for heading, _ in EXCEL_COLUMNS], 'Tracker Header')
+    
+    workbook.save(path)
+    return counts
+
+
+class MonthlyWorkbooks:
+    """Monthly tracker workbooks, regenerated only when the month's meals change.
+    
+    Each workbook is saved with a sidecar file holding the data version it
+    was built from (see DatabaseService.get_meal_data_version); an export of
+    an unchanged month returns the existing file.
+    """
+    
+    def __init__(self, db: DatabaseService, directory: str = EXPORT_DIR):
+        self.db = db
+        self.directory = directory
+        self._lock = threading.Lock()
+    
+    def _version(self, start_date: str, end_date: str) -> str:
+        with self.db.read_snapshot():
+            return f'{LAYOUT_VERSION}:{self.db.get_meal_data_version(start_date, end_date)}'
+    
+    @staticmethod
+    def month_range(month: str):
+        year, number = map(int, month.split('-'))
+        return f'{month}-01', f'{month}-{monthrange(year, number)[1]:02d}'
+    
+    def export(self, month: str) -> Dict:
+        """Workbook for a YYYY-MM month, generating it if the month's meals changed"""
+        if not MONTH_PATTERN.match(month or ''):
+            raise ValueError('month must be YYYY-MM')
+        
+        start_date, end_date = self.month_range(month)
+        path = os.path.join(self.directory, f'{month}.xlsx')
+        version_path = os.path.join(self.directory, f'.{month}.version')
+        
+        with self._lock:
+            cached = self._read_version(version_path) == self._version(start_date, end_date) and os.path.exists(path)
+            if cached:
+                return {'filePath': path, 'fileSize': os.path.getsize(path), 'month': month,
+                        'cached': True, 'isNewFile': False}
+            
+            is_new = not os.path.exists(path)
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f'{path}.{os.getpid()}.tmp'
+            try:
+                # Meals are read without holding the database lock for the
+                # whole build, so the build is repeated if the month changed
+                # meanwhile. A change during the last attempt leaves the
+                # version read before it, which no longer matches, so the
+                # next export rebuilds.
+                for _ in range(BUILD_ATTEMPTS):
+                    version = self._version(start_date, end_date)
+                    counts = write_month_workbook(self.db, temp_path, start_date, end_date)
+                    if self._version(start_date, end_date) == version:
+                        break
+                os.replace(temp_path, path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            
+            with open(version_path, 'w') as f:
+                f.write(version)
+        
+        return {'filePath': path, 'fileSize': os.path.getsize(path), 'month': month,
+                'cached': False, 'isNewFile': is_new, **counts}
+    
+    @staticmethod
+    def _read_version(version_path: str) -> Optional[str]:
+        try:
+            with open(version_path) as f:
+                return f.read().strip()
+        except OSError:
+            return None
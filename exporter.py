@@ -0,0 +1,130 @@
+"""
+Data Export for Food Tracker
+Streams meal history to JSON, NDJSON or CSV files, optionally gzip-compressed
+"""
+
+import csv
+import gzip
+import io
+from typing import Dict, Optional
+
+import json_codec
+from db_service import DatabaseService, NUTRIENTS
+
+
+EXPORT_FORMATS = ('json', 'ndjson', 'csv')
+
+# Meals read from the database per chunk; memory use is bounded by this
+EXPORT_CHUNK_SIZE = 1000
+
+CSV_COLUMNS = ('id', 'date', 'timestamp', 'mealType', 'description', 'source') + NUTRIENTS + ('ingredient_data',)
+
+
+def format_for_path(path: str) -> str:
+    """Export format implied by a file name, ignoring a trailing .gz"""
+    name = path.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if name.endswith('.csv'):
+        return 'csv'
+    return 'json'
+
+
+def open_output(path: str, compress: bool):
+    """Binary file for writing, gzip-compressed if asked"""
+    return gzip.open(path, 'wb', compresslevel=6) if compress else open(path, 'wb')
+
+
+def csv_row(meal: Dict) -> list:
+    """Flat CSV row for a meal, ingredient data as a JSON string"""
+    nutrition = meal['nutrition']
+    ingredient_data = json_codec.dumps(meal['ingredient_data']) if meal['ingredient_data'] else ''
+    return ([meal['id'], meal['date'], meal['timestamp'], meal['mealType'], meal['description'], meal['source']]
+            + [nutrition[nutrient] for nutrient in NUTRIENTS] + [ingredient_data])
+
+
+def export_data(db: DatabaseService, path: str, fmt: Optional[str] = None, data_type: str = 'all',
+                since: Optional[str] = None, until: Optional[str] = None,
+                compress: Optional[bool] = None, chunk_size: int = EXPORT_CHUNK_SIZE) -> Dict:
+    """Write data to path and return counts.
+    
+    fmt defaults to the file extension and compress to whether the name ends
+    in .gz. json writes the ingredients and recipes catalog and meals grouped
+    by date, in the layout import reads; ndjson (one meal per line) and csv
+    hold meals only. Meals are streamed a chunk at a time, so memory stays
+    flat for any length of history. since and until limit meals to an
+    inclusive date range.
+    """
+    fmt = fmt or format_for_path(path)
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown export format: {fmt}')
+    if fmt != 'json' and data_type not in ('all', 'meals'):
+        raise ValueError(f'{fmt} export holds meals only')
+    if compress is None:
+        compress = path.lower().endswith('.gz')
+    
+    counts = {}
+    with open_output(path, compress) as output:
+        if fmt == 'json':
+            write_json(db, output, data_type, since, until, chunk_size, counts)
+        elif fmt == 'ndjson':
+            counts['meals'] = 0
+            for chunk in db.iter_meals(since, until, chunk_size):
+                output.write(b''.join(json_codec.dumps_bytes(meal) + b'\n' for meal in chunk))
+                counts['meals'] += len(chunk)
+        else:
+            text = io.TextIOWrapper(output, encoding='utf-8', newline='')
+            writer = csv.writer(text)
+            writer.writerow(CSV_COLUMNS)
+            counts['meals'] = 0
+            for chunk in db.iter_meals(since, until, chunk_size):
+                writer.writerows(csv_row(meal) for meal in chunk)
+                counts['meals'] += len(chunk)
+            text.detach()
+    
+    return counts
+
+
+def write_json(db: DatabaseService, output, data_type: str, since: Optional[str],
+               until: Optional[str], chunk_size: int, counts: Dict):
+    """Write the JSON export object, streaming meals grouped by date.
+    
+    The catalog and the meals are read in one snapshot, so they match even
+    when other writes land during the export.
+    """
+    with db.read_snapshot():
+        sections = []
+        if data_type in ('all', 'ingredients'):
+            ingredients = db.get_all_ingredients()
+            counts['ingredients'] = sum(len(items) for items in ingredients['basic_ingredients'].values())
+            sections.append(b'"ingredients": ' + json_codec.dumps_bytes(ingredients))
+        if data_type in ('all', 'recipes'):
+            recipes = db.get_all_recipes()
+            counts['recipes'] = len(recipes['dishes'])
+            sections.append(b'"recipes": ' + json_codec.dumps_bytes(recipes))
+        
+        output.write(b'{' + b', '.join(sections))
+        if data_type in ('all', 'meals'):
+            output.write(b', "meals": {' if sections else b'"meals": {')
+            counts['meals'] = 0
+            
+            # Meals arrive ordered by date, so each date's array is opened when
+            # its first meal is seen and closed when the next date starts
+            current_date = None
+            for chunk in db.iter_meals(since, until, chunk_size):
+                parts = []
+                for meal in chunk:
+                    if meal['date'] != current_date:
+                        if current_date is not None:
+                            parts.append(b'], ')
+                        parts.append(json_codec.dumps_bytes(meal['date']) + b': [')
+                        current_date = meal['date']
+                    else:
+                        parts.append(b', ')
+                    parts.append(json_codec.dumps_bytes(meal))
+                output.write(b''.join(parts))
+                counts['meals'] += len(chunk)
+            output.write(b']}' if current_date is not None else b'}')
+        output.write(b'}\n')
@@ -0,0 +1,373 @@
+"""
+Data Import for Food Tracker
+Incremental JSON/NDJSON parsing and batched, resumable imports of
+ingredients, recipes and meals
+"""
+
+import codecs
+import gzip
+import itertools
+import json
+import os
+import re
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+import json_codec
+from db_service import DatabaseService
+from exporter import format_for_path
+
+
+# How existing records are treated: 'merge' keeps them and skips the
+# imported copy, 'merge-duplicates' overwrites them, and 'replace' deletes
+# all meals before importing (catalog entries are overwritten)
+MERGE_STRATEGIES = ('merge', 'merge-duplicates', 'replace')
+
+# Records written per transaction; progress is checkpointed after each one
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 500))
+
+# Input read per chunk by the incremental JSON parser
+READ_CHUNK_SIZE = 64 * 1024
+
+# Most failed-record messages kept in an import report
+MAX_REPORTED_ERRORS = 20
+
+ENTITIES = ('ingredients', 'recipes', 'meals')
+
+WHITESPACE = re.compile(r'\s*')
+
+# (entity, key, data): ('ingredients', (category, key), ingredient),
+# ('recipes', key, recipe) or ('meals', id, meal)
+Record = Tuple[str, object, Dict]
+
+
+class JSONStreamReader:
+    """Incremental JSON parser over a binary stream.
+    
+    Walks the containers a document is made of with object_keys() and
+    array_items(), and decodes one value at a time with value(), so only the
+    value being parsed has to fit in memory.
+    """
+    
+    def __init__(self, stream, chunk_size: int = READ_CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+    
+    def _fill(self) -> bool:
+        """Read the next chunk into the buffer; False once the stream is exhausted"""
+        if self.eof:
+            return False
+        data = self.stream.read(self.chunk_size)
+        self.eof = not data
+        text = self._text.decode(data or b'', final=self.eof)
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+        return True
+    
+    def peek(self) -> str:
+        """Next non-whitespace character, or '' at the end of the input"""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+    
+    def _expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Invalid JSON: expected {' or '.join(repr(c) for c in chars)}, got {char!r}")
+        self.pos += 1
+        return char
+    
+    def value(self):
+        """Decode the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+                # A value ending at the buffer edge may continue (a number cut in two)
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+    
+    def object_keys(self) -> Iterator[str]:
+        """Keys of the next object; the caller reads each key's value before continuing"""
+        self._expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(':')
+            yield key
+            if self._expect(',}') == '}':
+                return
+    
+    def array_items(self) -> Iterator[None]:
+        """Yields once per element of the next array; the caller reads each element"""
+        self._expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield None
+            if self._expect(',]') == ']':
+                return
+
+
+def open_input(path: str):
+    """Binary file for reading, decompressed if it is gzip"""
+    stream = open(path, 'rb')
+    if stream.peek(2)[:2] == b'\x1f\x8b':
+        return gzip.GzipFile(fileobj=stream)
+    return stream
+
+
+def iter_json_records(stream, options: Optional[Dict] = None) -> Iterator[Record]:
+    """Records from an export document, parsed incrementally.
+    
+    Accepts the layout exporter.py writes ({"ingredients", "recipes",
+    "meals": {date: [meal, ...]}}), meals as a plain list, or a bare list of
+    meals. Meals grouped by date take the date they are listed under. Other
+    top-level keys (such as mergeStrategy) are stored in options as they are
+    reached.
+    """
+    reader = JSONStreamReader(stream)
+    if reader.peek() == '[':
+        yield from _iter_meal_records(reader)
+        return
+    
+    for key in reader.object_keys():
+        if key == 'meals':
+            yield from _iter_meal_records(reader)
+        elif key == 'ingredients':
+            ingredients = _section(reader.value(), 'ingredients')
+            for category, items in _section(ingredients.get('basic_ingredients'), 'basic_ingredients').items():
+                for ingredient_key, ingredient in _section(items, f'basic_ingredients.{category}').items():
+                    yield 'ingredients', (category, ingredient_key), ingredient
+        elif key == 'recipes':
+            recipes = _section(reader.value(), 'recipes')
+            for recipe_key, recipe in _section(recipes.get('dishes'), 'dishes').items():
+                yield 'recipes', recipe_key, recipe
+        elif options is not None:
+            options[key] = reader.value()
+        else:
+            reader.value()
+
+
+def _section(value, name: str) -> Dict:
+    """An object section of the document; missing or null reads as empty"""
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ValueError(f'Invalid {name}: expected an object, got {type(value).__name__}')
+    return value
+
+
+def _meal_record(meal, date: Optional[str] = None) -> Record:
+    # A meal that is not an object is passed on as is, for the Importer to count as failed
+    if not isinstance(meal, dict):
+        return 'meals', None, meal
+    return 'meals', meal.get('id'), {**meal, 'date': date} if date else meal
+
+
+def _iter_meal_records(reader: JSONStreamReader) -> Iterator[Record]:
+    if reader.peek() == '{':
+        for date in reader.object_keys():
+            for _ in reader.array_items():
+                yield _meal_record(reader.value(), date)
+    elif reader.peek() == '[':
+        for _ in reader.array_items():
+            yield _meal_record(reader.value())
+    else:
+        reader.value()
+
+
+def iter_ndjson_records(stream) -> Iterator[Record]:
+    """Meal records from NDJSON, one meal object per line"""
+    for line in stream:
+        if line.strip():
+            yield _meal_record(json_codec.loads(line))
+
+
+class Importer:
+    """Writes import records in batched transactions.
+    
+    Each batch is one transaction, and each record in it a savepoint, so a
+    bad record is counted as failed without undoing the others. With a
+    source name, progress is saved in the same transaction as each batch;
+    running the same import again after an interruption skips the records
+    already committed and carries on with the saved counts.
+    """
+    
+    def __init__(self, db: DatabaseService, merge_strategy: str = 'merge',
+                 batch_size: int = IMPORT_BATCH_SIZE, source: Optional[str] = None):
+        if merge_strategy not in MERGE_STRATEGIES:
+            raise ValueError(f'Unknown merge strategy: {merge_strategy}')
+        self.db = db
+        self.merge_strategy = merge_strategy
+        self.batch_size = max(1, batch_size)
+        self.source = source
+        self.counts = {entity: {'inserted': 0, 'updated': 0, 'skipped': 0, 'failed': 0} for entity in ENTITIES}
+        self.errors = []
+        self.records = 0
+        self.resumed_from = 0
+        self.batches = 0
+        self.started_at = None
+    
+    def run(self, records: Iterator[Record]) -> Dict:
+        """Import all records and return the report"""
+        self.started_at = time.perf_counter()
+        if self.source:
+            progress = self.db.get_import_progress(self.source)
+            if progress:
+                self.resumed_from = progress['records']
+                self.counts = progress['counts']
+        
+        # 'replace' clears meals in the first batch, which a resumed import has already committed
+        clear_meals = self.merge_strategy == 'replace' and not self.resumed_from
+        batch = []
+        position = 0
+        for record in records:
+            position += 1
+            if position <= self.resumed_from:
+                continue
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                self._write_batch(batch, position, clear_meals)
+                batch, clear_meals = [], False
+        
+        if batch or clear_meals:
+            self._write_batch(batch, position, clear_meals)
+        if self.source:
+            self.db.delete_import_progress(self.source)
+        return self.report()
+    
+    def _write_batch(self, batch, position: int, clear_meals: bool):
+        with self.db.transaction():
+            if clear_meals:
+                self.db.delete_all_meals()
+            
+            meal_ids = [key for entity, key, _ in batch if entity == 'meals' and key is not None]
+            existing_meals = self.db.get_existing_meal_ids(meal_ids) if meal_ids else set()
+            
+            for entity, key, data in batch:
+                try:
+                    with self.db.savepoint():
+                        outcome = self._write_record(entity, key, data, existing_meals)
+                except Exception as error:
+                    outcome = 'failed'
+                    if len(self.errors) < MAX_REPORTED_ERRORS:
+                        self.errors.append({'entity': entity, 'key': str(key), 'error': str(error)})
+                self.counts[entity][outcome] += 1
+            
+            self.records = position
+            self.batches += 1
+            if self.source:
+                self.db.save_import_progress(self.source, position, self.counts)
+    
+    def _write_record(self, entity: str, key, data: Dict, existing_meals: set) -> str:
+        """Write one record and return its outcome"""
+        if not isinstance(data, dict):
+            raise ValueError(f'Invalid {entity}: expected an object, got {type(data).__name__}')
+        overwrite = self.merge_strategy != 'merge'
+        
+        if entity == 'meals':
+            if key is None:
+                # Let SQLite assign the id, so id-less meals never collide
+                self.db.add_meal({**data, 'id': None})
+                return 'inserted'
+            if key in existing_meals:
+                if not overwrite:
+                    return 'skipped'
+                self.db.update_meal(key, data)
+                return 'updated'
+            self.db.add_meal(data)
+            existing_meals.add(key)
+            return 'inserted'
+        
+        if entity == 'ingredients':
+            category, ingredient_key = key
+            exists = self.db.get_ingredient(category, ingredient_key) is not None
+            if exists and not overwrite:
+                return 'skipped'
+            if exists:
+                self.db.update_ingredient(category, ingredient_key, data)
+                return 'updated'
+            self.db.add_ingredient(category, ingredient_key, data)
+            return 'inserted'
+        
+        exists = self.db.recipe_exists(key)
+        if exists and not overwrite:
+            return 'skipped'
+        if exists:
+            self.db.update_recipe(key, data)
+            return 'updated'
+        self.db.add_recipe(key, data)
+        return 'inserted'
+    
+    def report(self) -> Dict:
+        """Counts per entity type, failed-record errors and progress"""
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0
+        meals = self.counts['meals']
+        return {
+            'counts': self.counts,
+            'importedCount': meals['inserted'] + meals['updated'],
+            'errors': self.errors,
+            'records': self.records,
+            'resumedFrom': self.resumed_from,
+            'batches': self.batches,
+            'elapsedSeconds': round(elapsed, 3)
+        }
+
+
+def import_stream(db: DatabaseService, stream, merge_strategy: Optional[str] = None,
+                  batch_size: int = IMPORT_BATCH_SIZE) -> Dict:
+    """Import a JSON export document read incrementally from a binary stream,
+    such as an HTTP request body, so the document is never held in memory.
+    
+    merge_strategy defaults to the document's own top-level mergeStrategy,
+    which is only seen if it comes before the data sections, then 'merge'.
+    """
+    options = {}
+    records = iter_json_records(stream, options)
+    # Reading up to the first record picks up any options listed before the data
+    first = next(records, None)
+    merge_strategy = merge_strategy or options.get('mergeStrategy') or 'merge'
+    if merge_strategy not in MERGE_STRATEGIES:
+        raise ValueError(f'mergeStrategy must be one of: {", ".join(MERGE_STRATEGIES)}')
+    
+    importer = Importer(db, merge_strategy, batch_size)
+    report = importer.run(itertools.chain([first] if first is not None else [], records))
+    return {'mergeStrategy': merge_strategy, **report}
+
+
+def import_file(db: DatabaseService, path: str, merge_strategy: str = 'merge',
+                batch_size: int = IMPORT_BATCH_SIZE, restart: bool = False) -> Dict:
+    """Import a JSON or NDJSON export (optionally gzip-compressed).
+    
+    The file is parsed incrementally and written in batches. An interrupted
+    import of the same unchanged file resumes where it stopped unless
+    restart is set.
+    """
+    stat = os.stat(path)
+    source = f'{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}'
+    if restart:
+        db.delete_import_progress(source)
+    
+    with open_input(path) as stream:
+        if format_for_path(path) == 'ndjson':
+            records = iter_ndjson_records(stream)
+        else:
+            records = iter_json_records(stream)
+        return Importer(db, merge_strategy, batch_size, source).run(records)
@@ -0,0 +1,54 @@
+"""
+JSON Codec for Food Tracker
+Fast JSON encoding/decoding with orjson when installed, stdlib json otherwise
+"""
+
+import json
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is listed in requirements.txt
+    orjson = None
+
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def dumps_bytes(obj: Any, indent: Optional[int] = None, sort_keys: bool = False,
+                default: Optional[Callable] = None) -> bytes:
+    """Encode obj as UTF-8 JSON bytes"""
+    if orjson is not None and indent in (None, 2):
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if default is not None:
+            # Let the caller format dates, as the stdlib path would
+            option |= orjson.OPT_PASSTHROUGH_DATETIME
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except TypeError:
+            # Integers beyond 64 bits and other values orjson rejects
+            pass
+    
+    return json.dumps(obj, indent=indent, sort_keys=sort_keys, default=default,
+                      ensure_ascii=False).encode('utf-8')
+
+
+def dumps(obj: Any, indent: Optional[int] = None, sort_keys: bool = False,
+          default: Optional[Callable] = None) -> str:
+    """Encode obj as a JSON string"""
+    return dumps_bytes(obj, indent, sort_keys, default).decode('utf-8')
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """Decode a JSON document from str or bytes"""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # Let the stdlib accept what orjson is stricter about (NaN, Infinity)
+            pass
+    return json.loads(data)
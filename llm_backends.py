@@ -0,0 +1,335 @@
+"""
+LLM Backends for Food Tracker
+Interchangeable text generation backends: Gemini, a local OpenAI-compatible
+HTTP server and an offline deterministic template, plus prompt micro-batching
+"""
+
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, Iterator, List, Optional
+
+import json_codec
+
+
+# Default time window for collecting concurrent prompts into one batch call
+BATCH_WINDOW_MS = float(os.getenv('AI_BATCH_WINDOW_MS', 10))
+
+# Most prompts sent in one batch call. Chat prompts reach the backend through
+# LLMExecutor, which runs at most AI_MAX_CONCURRENCY (default 4) calls at once,
+# so a batch never holds more prompts than that, whatever this is set to.
+MAX_BATCH_SIZE = int(os.getenv('AI_MAX_BATCH_SIZE', 16))
+
+# Batch calls running at once
+BATCH_WORKERS = 4
+
+
+class LLMBackend(ABC):
+    """Text generation backend.
+    
+    Subclasses implement generate(); stream() and generate_batch() fall back
+    to it. Backends that can answer several prompts in one call set
+    supports_batch and override generate_batch().
+    """
+    
+    name = 'base'
+    supports_batch = False
+    
+    @abstractmethod
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Complete text for a prompt"""
+    
+    def stream(self, prompt: str, timeout: Optional[float] = None) -> Iterator[str]:
+        """Completion text in chunks as they are produced"""
+        yield self.generate(prompt, timeout)
+    
+    def generate_batch(self, prompts: List[str], timeout: Optional[float] = None) -> List[str]:
+        """Completions for several prompts, in order"""
+        return [self.generate(prompt, timeout) for prompt in prompts]
+    
+    def count_tokens(self, text: str) -> int:
+        """Approximate token count (about four characters per token)"""
+        return (len(text) + 3) // 4
+    
+    def describe(self) -> Dict:
+        return {'name': self.name, 'supportsBatch': self.supports_batch}
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini through google-generativeai"""
+    
+    name = 'gemini'
+    
+    def __init__(self, api_key: str, model_name: str = 'gemini-pro'):
+        import google.generativeai as genai
+        
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+    
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        response = self.model.generate_content(prompt, request_options=self._options(timeout))
+        return response.text
+    
+    def stream(self, prompt: str, timeout: Optional[float] = None) -> Iterator[str]:
+        for chunk in self.model.generate_content(prompt, stream=True, request_options=self._options(timeout)):
+            yield chunk.text
+    
+    @staticmethod
+    def _options(timeout: Optional[float]) -> Dict:
+        return {'timeout': timeout} if timeout else {}
+    
+    def describe(self) -> Dict:
+        return {**super().describe(), 'model': self.model_name}
+
+
+class HTTPBackend(LLMBackend):
+    """Local model server speaking the OpenAI-compatible /v1/completions API.
+    
+    llama.cpp, vLLM and LocalAI serve this API; a list of prompts is
+    answered in one request, so this backend supports batching.
+    """
+    
+    name = 'http'
+    supports_batch = True
+    
+    def __init__(self, base_url: str, model_name: str = 'local', max_tokens: int = 256):
+        self.base_url = base_url.rstrip('/')
+        self.model_name = model_name
+        self.max_tokens = max_tokens
+    
+    def _post(self, body: Dict, timeout: Optional[float]):
+        # Imported here: urllib.request pulls in http.client and email, which
+        # the other backends never need
+        import urllib.request
+        
+        request = urllib.request.Request(
+            f'{self.base_url}/v1/completions', data=json_codec.dumps_bytes(body),
+            headers={'Content-Type': 'application/json'}
+        )
+        return urllib.request.urlopen(request, timeout=timeout)
+    
+    def _body(self, prompt, stream: bool = False) -> Dict:
+        return {'model': self.model_name, 'prompt': prompt, 'max_tokens': self.max_tokens, 'stream': stream}
+    
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        return self.generate_batch([prompt], timeout)[0]
+    
+    def generate_batch(self, prompts: List[str], timeout: Optional[float] = None) -> List[str]:
+        with self._post(self._body(prompts), timeout) as response:
+            choices = json_codec.loads(response.read())['choices']
+        texts = [None] * len(prompts)
+        for position, choice in enumerate(choices):
+            index = choice.get('index', position)
+            if isinstance(index, int) and 0 <= index < len(texts):
+                texts[index] = choice['text']
+        
+        missing = texts.count(None)
+        if missing:
+            raise ValueError(f'Model server returned no completion for {missing} of {len(prompts)} prompts')
+        return texts
+    
+    def stream(self, prompt: str, timeout: Optional[float] = None) -> Iterator[str]:
+        with self._post(self._body(prompt, stream=True), timeout) as response:
+            for line in response:
+                line = line.strip()
+                if not line.startswith(b'data:'):
+                    continue
+                data = line[5:].strip()
+                if data == b'[DONE]':
+                    return
+                text = json_codec.loads(data)['choices'][0].get('text')
+                if text:
+                    yield text
+    
+    def describe(self) -> Dict:
+        return {**super().describe(), 'model': self.model_name, 'url': self.base_url}
+
+
+# Advice used by TemplateBackend, matched against words in the question
+TEMPLATE_TIPS = [
+    (('protein',), 'Lentils, chickpeas, paneer, tofu, eggs and Greek yogurt are easy ways to add protein.'),
+    (('fiber', 'fibre', 'digestion'), 'Vegetables, fruit, whole grains and legumes all raise fiber; add one to each meal.'),
+    (('carb', 'carbs', 'sugar'), 'Favour whole grains and legumes over refined carbs for steadier energy.'),
+    (('fat', 'fats', 'oil'), 'Nuts, seeds and a little oil give healthy fats; watch fried and processed foods.'),
+    (('calorie', 'calories', 'weight', 'lose', 'gain'), 'Portion sizes matter most for calories; build meals around vegetables and protein.'),
+    (('breakfast', 'lunch', 'dinner', 'snack', 'meal'), 'Balanced meals pair a protein, a whole grain and a vegetable.')
+]
+
+TEMPLATE_DEFAULT_TIP = 'A varied plate of vegetables, protein and whole grains covers most needs.'
+
+
+class TemplateBackend(LLMBackend):
+    """Deterministic offline backend answering from templates.
+    
+    Needs no network access, so the AI endpoints work in development and
+    tests. latency_ms and word_ms add delays before the first and between
+    streamed words, for load testing.
+    """
+    
+    name = 'template'
+    supports_batch = True
+    
+    def __init__(self, latency_ms: float = 0, word_ms: float = 0):
+        self.latency_ms = latency_ms
+        self.word_ms = word_ms
+    
+    def answer(self, prompt: str) -> str:
+        """Reply built from the question and the day's totals in the prompt"""
+        question = prompt.rsplit('User question:', 1)[-1].split('\n\nResponse:')[0].strip()
+        words = set(re.findall(r'[a-z]+', question.lower()))
+        tips = [tip for keywords, tip in TEMPLATE_TIPS if words.intersection(keywords)]
+        
+        totals = re.search(r'with (\d+) calories, (\d+)g protein', prompt)
+        intro = (f'So far today you have {totals.group(1)} calories and {totals.group(2)}g protein. '
+                 if totals else '')
+        return intro + ' '.join(tips[:2] or [TEMPLATE_DEFAULT_TIP])
+    
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        time.sleep(self.latency_ms / 1000)
+        return self.answer(prompt)
+    
+    def generate_batch(self, prompts: List[str], timeout: Optional[float] = None) -> List[str]:
+        time.sleep(self.latency_ms / 1000)
+        return [self.answer(prompt) for prompt in prompts]
+    
+    def stream(self, prompt: str, timeout: Optional[float] = None) -> Iterator[str]:
+        time.sleep(self.latency_ms / 1000)
+        words = self.answer(prompt).split(' ')
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.word_ms / 1000)
+            yield word if i == len(words) - 1 else word + ' '
+
+
+class BatchingBackend(LLMBackend):
+    """Groups concurrent generate() calls into batch calls on the wrapped backend.
+    
+    The first prompt to arrive opens a window of window_ms; prompts arriving
+    within it (up to max_batch_size) are sent together with one
+    generate_batch() call. Streaming bypasses batching.
+    
+    Each waiting generate() call holds an LLMExecutor slot, so batches are
+    bounded by AI_MAX_CONCURRENCY (4 by default) as well as max_batch_size.
+    """
+    
+    supports_batch = True
+    
+    def __init__(self, backend: LLMBackend, window_ms: float = BATCH_WINDOW_MS,
+                 max_batch_size: int = MAX_BATCH_SIZE):
+        self.backend = backend
+        self.name = backend.name
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self._condition = threading.Condition()
+        self._pending = []
+        self._pool = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='llm-batch')
+        self._batches = 0
+        self._prompts = 0
+        threading.Thread(target=self._dispatch, name='llm-batcher', daemon=True).start()
+    
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        future = Future()
+        with self._condition:
+            self._pending.append((prompt, timeout, future))
+            self._condition.notify()
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            # A prompt still waiting for its batch is left out of it
+            future.cancel()
+            raise
+    
+    def stream(self, prompt: str, timeout: Optional[float] = None) -> Iterator[str]:
+        return self.backend.stream(prompt, timeout)
+    
+    def generate_batch(self, prompts: List[str], timeout: Optional[float] = None) -> List[str]:
+        return self.backend.generate_batch(prompts, timeout)
+    
+    def count_tokens(self, text: str) -> int:
+        return self.backend.count_tokens(text)
+    
+    def _dispatch(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                
+                # Hold the window open for more prompts unless the batch is already full
+                deadline = time.monotonic() + self.window_ms / 1000
+                while len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                
+                batch = [item for item in self._pending[:self.max_batch_size]
+                         if item[2].set_running_or_notify_cancel()]
+                del self._pending[:self.max_batch_size]
+                if not batch:
+                    continue
+                self._batches += 1
+                self._prompts += len(batch)
+            
+            self._pool.submit(self._run_batch, batch)
+    
+    def _run_batch(self, batch):
+        timeouts = [timeout for _, timeout, _ in batch if timeout]
+        try:
+            texts = self.backend.generate_batch([prompt for prompt, _, _ in batch],
+                                                max(timeouts) if timeouts else None)
+        except Exception as error:
+            for _, _, future in batch:
+                future.set_exception(error)
+            return
+        
+        for (_, _, future), text in zip(batch, texts):
+            future.set_result(text)
+    
+    def describe(self) -> Dict:
+        with self._condition:
+            batches, prompts = self._batches, self._prompts
+        return {
+            **self.backend.describe(),
+            'batching': {
+                'windowMs': self.window_ms,
+                'maxBatchSize': self.max_batch_size,
+                'batches': batches,
+                'prompts': prompts,
+                'averageBatchSize': round(prompts / batches, 2) if batches else None
+            }
+        }
+
+
+def create_backend() -> Optional[LLMBackend]:
+    """Backend chosen by the AI_BACKEND environment variable, or None if unavailable.
+    
+    AI_BACKEND is 'gemini' (the default), 'http' (AI_HTTP_URL, AI_HTTP_MODEL)
+    or 'template' (AI_TEMPLATE_LATENCY_MS, AI_TEMPLATE_WORD_MS). Backends that
+    support batching are wrapped in a BatchingBackend unless
+    AI_BATCH_WINDOW_MS is 0.
+    """
+    kind = os.getenv('AI_BACKEND', 'gemini').lower()
+    
+    if kind == 'template':
+        backend = TemplateBackend(float(os.getenv('AI_TEMPLATE_LATENCY_MS', 0)),
+                                  float(os.getenv('AI_TEMPLATE_WORD_MS', 0)))
+    elif kind == 'http':
+        backend = HTTPBackend(os.getenv('AI_HTTP_URL', 'http://localhost:8080'),
+                              os.getenv('AI_HTTP_MODEL', 'local'))
+    elif kind == 'gemini':
+        api_key = os.getenv('GEMINI_API_KEY', 'YOUR_API_KEY_HERE')
+        if not api_key or api_key == 'YOUR_API_KEY_HERE':
+            print('⚠️  Gemini API key not set. AI chat will use fallback responses.')
+            print('   Set GEMINI_API_KEY environment variable to enable AI chat.')
+            return None
+        backend = GeminiBackend(api_key, os.getenv('GEMINI_MODEL', 'gemini-pro'))
+    else:
+        raise ValueError(f'Unknown AI_BACKEND: {kind}')
+    
+    if backend.supports_batch and BATCH_WINDOW_MS > 0:
+        backend = BatchingBackend(backend)
+    return backend
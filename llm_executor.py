@@ -0,0 +1,194 @@
+"""
+LLM Executor for Food Tracker
+Runs model calls on a bounded thread pool with timeouts and admission control
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, Iterator
+
+
+# Model calls running at once; calls beyond this wait in the queue
+MAX_CONCURRENCY = int(os.getenv('AI_MAX_CONCURRENCY', 4))
+
+# Calls allowed to wait for a free slot before new ones are rejected
+MAX_QUEUE = int(os.getenv('AI_MAX_QUEUE', 8))
+
+# Longest a request waits for its model call, queueing included; for
+# streamed calls, the longest wait for each chunk
+TIMEOUT_SECONDS = float(os.getenv('AI_TIMEOUT_SECONDS', 20))
+
+# Latency samples kept for the percentile metrics
+LATENCY_WINDOW = 1000
+
+
+class Overloaded(Exception):
+    """Raised when the executor's slots and queue are all taken"""
+
+
+class LLMExecutor:
+    """Bounded executor for slow model calls.
+    
+    At most max_concurrency calls run at once and max_queue more may wait;
+    anything beyond that is rejected immediately, so AI traffic can only
+    tie up a fixed number of server threads and never starves the rest of
+    the API.
+    """
+    
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, max_queue: int = MAX_QUEUE,
+                 timeout: float = TIMEOUT_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='llm')
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._running = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._first_chunk_latencies = deque(maxlen=LATENCY_WINDOW)
+        self._counts = {'completed': 0, 'failed': 0, 'rejected': 0, 'timedOut': 0, 'cancelled': 0}
+    
+    def _admit(self):
+        with self._lock:
+            if self._admitted >= self.max_concurrency + self.max_queue:
+                self._counts['rejected'] += 1
+                raise Overloaded('AI request queue is full')
+            self._admitted += 1
+    
+    def call(self, fn: Callable, *args, timeout: float = None, **kwargs):
+        """Run fn on the pool and wait for its result.
+        
+        Raises Overloaded when no capacity is left and
+        concurrent.futures.TimeoutError when the call takes too long.
+        """
+        self._admit()
+        
+        start = time.perf_counter()
+        future = self._pool.submit(self._run, fn, args, kwargs)
+        future.add_done_callback(self._release)
+        try:
+            result = future.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeout:
+            # A call that hasn't started yet gives its slot back right away
+            future.cancel()
+            with self._lock:
+                self._counts['timedOut'] += 1
+            raise
+        except Exception:
+            with self._lock:
+                self._counts['failed'] += 1
+            raise
+        
+        with self._lock:
+            self._counts['completed'] += 1
+            self._latencies.append((time.perf_counter() - start) * 1000)
+        return result
+    
+    def stream(self, fn: Callable[..., Iterator], *args, timeout: float = None, **kwargs) -> Iterator:
+        """Run the generator function fn on the pool and relay its chunks.
+        
+        Admission happens here, so Overloaded is raised before anything is
+        streamed. Iterating raises concurrent.futures.TimeoutError when a
+        chunk takes longer than the timeout; closing the iterator early
+        stops the model call at its next chunk.
+        """
+        self._admit()
+        
+        chunks = queue.Queue()
+        cancelled = threading.Event()
+        start = time.perf_counter()
+        future = self._pool.submit(self._run, self._produce, (fn, args, kwargs, chunks, cancelled), {})
+        future.add_done_callback(self._release)
+        return self._relay(chunks, cancelled, future, start, self.timeout if timeout is None else timeout)
+    
+    @staticmethod
+    def _produce(fn, args, kwargs, chunks, cancelled):
+        try:
+            for chunk in fn(*args, **kwargs):
+                if cancelled.is_set():
+                    break
+                chunks.put((True, chunk))
+        except Exception as error:
+            chunks.put((False, error))
+        else:
+            chunks.put((False, None))
+    
+    def _relay(self, chunks, cancelled, future, start, timeout):
+        first = True
+        outcome = 'failed'
+        try:
+            while True:
+                try:
+                    is_chunk, value = chunks.get(timeout=timeout)
+                except queue.Empty:
+                    outcome = 'timedOut'
+                    raise FutureTimeout()
+                
+                if not is_chunk:
+                    if value is not None:
+                        raise value
+                    outcome = 'completed'
+                    return
+                
+                if first:
+                    first = False
+                    with self._lock:
+                        self._first_chunk_latencies.append((time.perf_counter() - start) * 1000)
+                try:
+                    yield value
+                except GeneratorExit:
+                    outcome = 'cancelled'
+                    raise
+        finally:
+            cancelled.set()
+            future.cancel()
+            with self._lock:
+                if outcome == 'completed':
+                    self._latencies.append((time.perf_counter() - start) * 1000)
+                self._counts[outcome] += 1
+    
+    def _run(self, fn, args, kwargs):
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+    
+    def _release(self, future):
+        with self._lock:
+            self._admitted -= 1
+    
+    def metrics(self) -> Dict:
+        """Queue depth, outcome counters and latency percentiles"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            first_chunk_latencies = sorted(self._first_chunk_latencies)
+            running = self._running
+            admitted = self._admitted
+            counts = dict(self._counts)
+        
+        def percentiles(samples):
+            if not samples:
+                return {'p50': None, 'p95': None, 'p99': None}
+            return {
+                f'p{round(fraction * 100)}': round(samples[min(len(samples) - 1, int(len(samples) * fraction))], 1)
+                for fraction in (0.5, 0.95, 0.99)
+            }
+        
+        return {
+            'maxConcurrency': self.max_concurrency,
+            'maxQueue': self.max_queue,
+            'timeoutSeconds': self.timeout,
+            'running': running,
+            'queued': admitted - running,
+            **counts,
+            'latencyMs': percentiles(latencies),
+            'firstChunkMs': percentiles(first_chunk_latencies)
+        }
+
@@ -0,0 +1,465 @@
+"""
+Meal Parser for Food Tracker
+Turns free text like "2 roti, dal tadka and a bowl of curd" into nutrition lines
+"""
+
+import re
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from db_service import DatabaseService
+from nutrition_calculator import NutritionCalculator
+
+
+# Longest description accepted in one parse() call
+MAX_TEXT_LENGTH = 100000
+
+_TOKEN_PATTERN = re.compile(r'\d+\s*/\s*\d+|\d+(?:\.\d+)?|\.\d+|[a-z]+|[,;&+½¼¾]')
+
+# Tokens that end one food item and start the next
+_SEPARATORS = {',', ';', '&', '+', 'and', 'with', 'plus'}
+
+_NUMBER_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'dozen': 12,
+    'half': 0.5, 'quarter': 0.25, '½': 0.5, '¼': 0.25, '¾': 0.75
+}
+
+# Words that only qualify a name ("Roti Homemade"), so the name also matches without them
+_QUALIFIERS = {'homemade', 'home', 'made'}
+
+# Preferred measurement when the text doesn't name one
+_DEFAULT_UNITS = ('serving', 'piece', 'medium', 'roti', 'slice', 'cup', 'bowl')
+
+
+def _normalize(token: str) -> str:
+    """Fold simple plurals so "rotis" matches "roti" and "cups" matches "cup" """
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word, number and separator tokens"""
+    return [_normalize(token) for token in _TOKEN_PATTERN.findall((text or '').lower())]
+
+
+def _quantity(token: str) -> Optional[float]:
+    """Numeric value of a quantity token, or None"""
+    if token in _NUMBER_WORDS:
+        return _NUMBER_WORDS[token]
+    try:
+        if '/' in token:
+            numerator, denominator = (float(part) for part in token.split('/'))
+            return numerator / denominator if denominator else None
+        return float(token)
+    except ValueError:
+        return None
+
+
+def _unit_tokens(measurement_key: str) -> Tuple[str, ...]:
+    """Unit words of a measurement key, without its leading amount ("1_cup_uncooked" -> cup uncooked)"""
+    tokens = tokenize(measurement_key.replace('_', ' '))
+    while tokens and _quantity(tokens[0]) is not None and tokens[0] not in ('a', 'an'):
+        tokens = tokens[1:]
+    return tuple(tokens)
+
+
+def _measurement_amount(measurement_key: str) -> float:
+    """Leading amount of a measurement key ("8_ounce_box" -> 8), defaulting to 1"""
+    tokens = tokenize(measurement_key.replace('_', ' '))
+    value = _quantity(tokens[0]) if tokens else None
+    return value if value and tokens[0] not in ('a', 'an') else 1
+
+
+def meal_ingredient_data(lines: List[Dict]) -> List[Dict]:
+    """A meal's ingredient_data for parsed lines, one item per line that resolved.
+    
+    Items use the shape the web UI stores for a single ingredient ({category,
+    key, measurement, quantity}) plus the name; recipe lines are marked with
+    type 'recipe' and measured in servings.
+    """
+    items = []
+    for line in lines:
+        if 'error' in line:
+            continue
+        if line['type'] == 'recipe':
+            items.append({'type': 'recipe', 'key': line['key'], 'name': line['name'],
+                          'measurement': 'serving', 'quantity': line['quantity']})
+        else:
+            items.append({'category': line['category'], 'key': line['key'].split('.', 1)[1],
+                          'name': line['name'], 'measurement': line['measurement'],
+                          'quantity': line['quantity']})
+    return items
+
+
+class TokenAutomaton:
+    """Aho-Corasick automaton over word tokens with incremental pattern updates.
+    
+    Patterns can be added and removed at any time; failure links are recomputed
+    lazily (one BFS over the trie) before the next search after a change.
+    """
+    
+    def __init__(self):
+        self._goto = [{}]
+        self._outputs = [set()]
+        self._depth = [0]
+        self._fail = [0]
+        self._output_link = [None]
+        self._linked = True
+    
+    def add(self, tokens: Tuple[str, ...], payload):
+        """Add a token sequence that reports payload when matched"""
+        node = 0
+        for token in tokens:
+            child = self._goto[node].get(token)
+            if child is None:
+                child = len(self._goto)
+                self._goto.append({})
+                self._outputs.append(set())
+                self._depth.append(self._depth[node] + 1)
+                self._fail.append(0)
+                self._output_link.append(None)
+                self._goto[node][token] = child
+            node = child
+        self._outputs[node].add(payload)
+        self._linked = False
+    
+    def remove(self, tokens: Tuple[str, ...], payload):
+        """Stop reporting payload for a token sequence"""
+        node = 0
+        for token in tokens:
+            node = self._goto[node].get(token)
+            if node is None:
+                return
+        self._outputs[node].discard(payload)
+        self._linked = False
+    
+    def _link(self):
+        """Recompute failure and output links breadth-first"""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            self._output_link[child] = None
+            queue.append(child)
+        
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[child] = target if target != child else 0
+                suffix = self._fail[child]
+                self._output_link[child] = suffix if self._outputs[suffix] else self._output_link[suffix]
+                queue.append(child)
+        
+        self._linked = True
+    
+    def search(self, tokens: List[str]):
+        """Yield (start, end, payload) for every pattern occurrence, end exclusive"""
+        if not self._linked:
+            self._link()
+        
+        node = 0
+        for position, token in enumerate(tokens):
+            while node and token not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(token, 0)
+            
+            match = node if self._outputs[node] else self._output_link[node]
+            while match is not None and match:
+                depth = self._depth[match]
+                for payload in self._outputs[match]:
+                    yield position + 1 - depth, position + 1, payload
+                match = self._output_link[match]
+
+
+class MealParser:
+    """Free-text meal parser backed by automata over the ingredient and recipe catalog"""
+    
+    def __init__(self, db_service: DatabaseService, calculator: NutritionCalculator):
+        self.db = db_service
+        self.calculator = calculator
+        self._lock = threading.Lock()
+        self._built = False
+        self._foods = TokenAutomaton()
+        self._units = TokenAutomaton()
+        self._patterns = {}
+        self._entries = {}
+        self._unit_counts = {}
+    
+    # ============= BUILDING =============
+    
+    def build(self):
+        """Load every ingredient and recipe name into the automata"""
+        with self._lock:
+            self._foods = TokenAutomaton()
+            self._units = TokenAutomaton()
+            self._patterns = {}
+            self._entries = {}
+            self._unit_counts = {}
+            
+            for entity, rows in self._group_ingredient_rows(self.db.get_measurement_rows()).items():
+                self._register(entity, rows)
+            for row in self.db.get_recipe_nutrition_rows():
+                self._register(('recipe', row['key']), [row])
+            
+            self._built = True
+    
+    def handle_change(self, event: Dict):
+        """Re-register the patterns of one changed ingredient or recipe"""
+        if not self._built:
+            return
+        
+        if event.get('entity') == 'ingredient':
+            entity = ('ingredient', f'{event["category"]}.{event["key"]}')
+            rows = self.db.get_measurement_rows(event['category'], event['key'])
+        elif event.get('entity') == 'recipe':
+            entity = ('recipe', event['key'])
+            rows = self.db.get_recipe_nutrition_rows(event['key'])
+        else:
+            return
+        
+        with self._lock:
+            self._unregister(entity)
+            if rows:
+                self._register(entity, rows)
+    
+    @staticmethod
+    def _group_ingredient_rows(rows: List[Dict]) -> Dict:
+        """Group measurement rows by ingredient reference"""
+        grouped = {}
+        for row in rows:
+            ref = f'{row["category"]}.{row["ingredient_key"]}'
+            grouped.setdefault(('ingredient', ref), []).append(row)
+        return grouped
+    
+    def _register(self, entity: Tuple[str, str], rows: List[Dict]):
+        """Add the name, key and measurement patterns of one catalog entity"""
+        first = rows[0]
+        if entity[0] == 'ingredient':
+            name, key = first['ingredient_name'], first['ingredient_key']
+            measurements = [row['measurement_key'] for row in rows]
+        else:
+            name, key = first['name'], first['key']
+            measurements = []
+        
+        patterns = set()
+        for text in (name, key.replace('_', ' ')):
+            tokens = tokenize(text)
+            patterns.add(tuple(tokens))
+            patterns.add(tuple(token for token in tokens if token not in _QUALIFIERS))
+        patterns.discard(())
+        for pattern in patterns:
+            self._foods.add(pattern, entity)
+        
+        by_unit = {}
+        for measurement in measurements:
+            by_unit.setdefault(_unit_tokens(measurement), measurement)
+        units = set(by_unit)
+        units.discard(())
+        for unit in units:
+            self._unit_counts[unit] = self._unit_counts.get(unit, 0) + 1
+            self._units.add(unit, unit)
+        
+        self._patterns[entity] = (patterns, units)
+        self._entries[entity] = {
+            'type': entity[0],
+            'key': entity[1],
+            'name': name,
+            'category': first['category'],
+            'measurements': measurements,
+            'byUnit': by_unit
+        }
+    
+    def _unregister(self, entity: Tuple[str, str]):
+        """Remove every pattern registered for one catalog entity"""
+        patterns, units = self._patterns.pop(entity, (set(), set()))
+        self._entries.pop(entity, None)
+        
+        for pattern in patterns:
+            self._foods.remove(pattern, entity)
+        for unit in units:
+            self._unit_counts[unit] -= 1
+            if not self._unit_counts[unit]:
+                del self._unit_counts[unit]
+                self._units.remove(unit, unit)
+    
+    # ============= PARSING =============
+    
+    def parse(self, text: str) -> Dict:
+        """Parse free text into candidate ingredient/recipe lines with nutrition.
+        
+        Matching runs in one pass over the tokens. Each food match takes the
+        quantity and unit found in its own clause (clauses are split on commas,
+        "and", "with", ...). Ambiguous names are returned as alternatives.
+        """
+        if not self._built:
+            self.build()
+        
+        tokens = tokenize(text)
+        
+        with self._lock:
+            food_matches = list(self._foods.search(tokens))
+            unit_matches = list(self._units.search(tokens))
+            entries = dict(self._entries)
+        
+        foods = self._select_foods(food_matches)
+        covered = set()
+        for start, end, _ in foods:
+            covered.update(range(start, end))
+        
+        # Separators inside a matched name ("mac and cheese") don't split clauses
+        clause_of = []
+        clause_bounds = [[0, 0]]
+        for i, token in enumerate(tokens):
+            if token in _SEPARATORS and i not in covered:
+                clause_of.append(None)
+                clause_bounds.append([i + 1, i + 1])
+            else:
+                clause_of.append(len(clause_bounds) - 1)
+                clause_bounds[-1][1] = i + 1
+        
+        units = {}
+        for start, end, unit in unit_matches:
+            clause = clause_of[start]
+            if clause is None or clause != clause_of[end - 1] or not covered.isdisjoint(range(start, end)):
+                continue
+            if clause not in units or end - start > len(units[clause]):
+                units[clause] = unit
+        
+        lines = []
+        matched_clauses = set()
+        previous_end = 0
+        for start, end, entities in foods:
+            clause = clause_of[start]
+            clause_start, clause_end = clause_bounds[clause]
+            quantity = self._quantity_before(tokens, max(clause_start, previous_end), start)
+            if quantity is None and end + 1 < clause_end and tokens[end] == 'x':
+                quantity = _quantity(tokens[end + 1])
+            previous_end = end
+            
+            candidates = [entries[entity] for entity in sorted(entities) if entity in entries]
+            if not candidates:
+                continue
+            
+            # Recipes win over ingredients with the same name
+            candidates.sort(key=lambda entry: entry['type'] != 'recipe')
+            matched_clauses.add(clause)
+            lines.append(self._make_line(
+                candidates, quantity, units.get(clause), ' '.join(tokens[clause_start:clause_end])
+            ))
+        
+        unmatched = [
+            ' '.join(tokens[clause_start:clause_end])
+            for clause, (clause_start, clause_end) in enumerate(clause_bounds)
+            if clause_end > clause_start and clause not in matched_clauses
+        ]
+        
+        calculated = self.calculator.calculate([line['line'] for line in lines])
+        for line, result in zip(lines, calculated['lines']):
+            line['nutrition'] = result.get('nutrition')
+            if 'error' in result:
+                line['error'] = result['error']
+        
+        return {
+            'text': text,
+            'lines': lines,
+            'unmatched': unmatched,
+            'totals': calculated['totals']
+        }
+    
+    @staticmethod
+    def _quantity_before(tokens: List[str], start: int, end: int) -> Optional[float]:
+        """Quantity stated in tokens[start:end], e.g. "2", "1 ½", "half a" """
+        quantity = None
+        previous = None
+        for token in tokens[start:end]:
+            value = _quantity(token)
+            if value is None:
+                previous = None
+                continue
+            if previous is not None and token in ('a', 'an'):
+                continue
+            if previous is not None and previous >= 1 and token in ('½', '¼', '¾'):
+                quantity = previous + value
+            else:
+                quantity = value
+            previous = quantity
+        return quantity
+    
+    @staticmethod
+    def _select_foods(matches: List[Tuple]) -> List[Tuple]:
+        """Pick non-overlapping food matches, longest first then leftmost"""
+        spans = {}
+        for start, end, entity in matches:
+            spans.setdefault((start, end), set()).add(entity)
+        
+        chosen = []
+        taken = set()
+        for (start, end), entities in sorted(spans.items(), key=lambda item: (item[0][0] - item[0][1], item[0][0])):
+            if any(i in taken for i in range(start, end)):
+                continue
+            taken.update(range(start, end))
+            chosen.append((start, end, entities))
+        
+        chosen.sort()
+        return chosen
+    
+    @staticmethod
+    def _make_line(candidates: List[Dict], quantity: Optional[float], unit: Optional[Tuple],
+                   text: str) -> Dict:
+        """Build a calculator line for the best candidate, keeping the rest as alternatives"""
+        best = candidates[0]
+        quantity = quantity if quantity is not None else 1
+        
+        if best['type'] == 'recipe':
+            line = {'recipeKey': best['key'], 'servings': quantity}
+            measurement = 'serving'
+        else:
+            measurement, matched = MealParser._pick_measurement(best['measurements'], best['byUnit'], unit)
+            # "200 g" against "100g" is 2 servings; "2 bowls" against a "100g"
+            # fallback stays 2, since the stated unit wasn't found
+            amount = _measurement_amount(measurement) if matched else 1
+            line = {
+                'ingredientKey': best['key'],
+                'measurement': measurement,
+                'quantity': round(quantity / amount, 4)
+            }
+        
+        return {
+            'text': text,
+            'type': best['type'],
+            'key': best['key'],
+            'name': best['name'],
+            'category': best['category'],
+            'measurement': measurement,
+            'quantity': line.get('quantity', line.get('servings')),
+            'measurements': best['measurements'],
+            'alternatives': [
+                {'type': c['type'], 'key': c['key'], 'name': c['name'], 'category': c['category']}
+                for c in candidates[1:]
+            ],
+            'line': line
+        }
+    
+    @staticmethod
+    def _pick_measurement(measurements: List[str], by_unit: Dict, unit: Optional[Tuple]) -> Tuple[str, bool]:
+        """(measurement, matched): the measurement matching the parsed unit, or
+        a sensible default with matched False"""
+        if unit:
+            if unit in by_unit:
+                return by_unit[unit], True
+            for tokens, measurement in by_unit.items():
+                if tokens[:len(unit)] == unit:
+                    return measurement, True
+        
+        for preferred in _DEFAULT_UNITS:
+            for tokens, measurement in by_unit.items():
+                if tokens[:1] == (preferred,):
+                    return measurement, False
+        
+        return measurements[0], False
@@ -0,0 +1,212 @@
+"""
+Meal Planner for Food Tracker
+Selects recipe servings from the catalog to close the day's remaining nutrient gaps
+"""
+
+import heapq
+import threading
+import time
+from typing import Dict, List, Optional
+
+from db_service import DatabaseService, NUTRIENTS
+from ai_assistant import NUTRITION_TARGETS
+
+
+# Candidates kept per ranking when the catalog is pruned into a search pool
+POOL_SIZE_PER_RANKING = 40
+
+# Going over a nutrient's maximum costs more than falling short of its minimum
+OVER_TARGET_WEIGHT = 2.0
+
+
+def merge_targets(targets: Optional[Dict] = None) -> Dict:
+    """Daily {min, max} targets per nutrient with the given overrides applied.
+    
+    Each override is an object holding min, max or both as numbers; anything
+    else raises ValueError.
+    """
+    if targets is None:
+        targets = {}
+    if not isinstance(targets, dict):
+        raise ValueError('targets must be an object of {min, max} per nutrient')
+    
+    unknown = [n for n in targets if n not in NUTRIENTS]
+    if unknown:
+        raise ValueError(f'Unknown nutrient(s) in targets: {", ".join(map(str, unknown))}')
+    
+    merged = {}
+    for n in NUTRIENTS:
+        override = targets.get(n) or {}
+        if not isinstance(override, dict) or set(override) - {'min', 'max'}:
+            raise ValueError(f'targets.{n} must be an object with min and/or max')
+        for bound, value in override.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                raise ValueError(f'targets.{n}.{bound} must be a non-negative number')
+        merged[n] = dict(NUTRITION_TARGETS[n], **override)
+        if merged[n]['min'] > merged[n]['max']:
+            raise ValueError(f'targets.{n}.min must not exceed its max')
+    return merged
+
+
+class MealPlanner:
+    """Bounded integer search for recipe servings that hit macro targets"""
+    
+    def __init__(self, db_service: DatabaseService):
+        self.db = db_service
+        self._lock = threading.Lock()
+        self._changes = 0
+        self._built_changes = -1
+        self._pool = []
+    
+    def handle_change(self, event: Dict):
+        """Mark the candidate pool stale when a recipe changes"""
+        if event.get('entity') == 'recipe':
+            self._changes += 1
+    
+    def build(self):
+        """Rebuild the candidate pool from the recipe catalog"""
+        changes = self._changes
+        self.load_rows(self.db.get_recipe_nutrition_rows(), changes)
+    
+    def load_rows(self, rows: List[Dict], changes: Optional[int] = None):
+        """Precompute the nutrient matrix and prune it into a small search pool.
+        
+        The pool is the union of the recipes densest in each nutrient (per 100
+        kcal), the most energy-dense recipes, and the recipes whose macro split
+        is closest to the midpoint of the daily targets.
+        """
+        matrix = [
+            (row, tuple(float(row[n] or 0) for n in NUTRIENTS))
+            for row in rows
+            if row['calories'] and row['calories'] > 0
+        ]
+        
+        rankings = [lambda item: item[1][0]]
+        for i in range(1, len(NUTRIENTS)):
+            rankings.append(lambda item, i=i: item[1][i] / item[1][0])
+        
+        ideal = [(NUTRITION_TARGETS[n]['min'] + NUTRITION_TARGETS[n]['max']) / 2 for n in NUTRIENTS]
+        ideal_ratios = [value / ideal[0] for value in ideal]
+        rankings.append(lambda item: -sum(
+            abs(item[1][i] / item[1][0] - ideal_ratios[i]) / ideal_ratios[i]
+            for i in range(1, len(NUTRIENTS))
+        ))
+        
+        pool = {}
+        for ranking in rankings:
+            for row, vector in heapq.nlargest(POOL_SIZE_PER_RANKING, matrix, key=ranking):
+                pool[row['key']] = (row, vector)
+        
+        with self._lock:
+            self._pool = list(pool.values())
+            self._built_changes = self._changes if changes is None else changes
+    
+    def plan(self, date: str, targets: Optional[Dict] = None, budget_ms: float = 50,
+             max_items: int = 4, max_servings: int = 2) -> Dict:
+        """Propose recipe servings that close the gap between logged meals and targets.
+        
+        Starting from an empty plan, best-improvement search over add, remove and
+        swap moves runs until no move helps or the latency budget runs out; the
+        best plan found so far is always returned. Raises ValueError for
+        malformed targets (see merge_targets).
+        """
+        started = time.perf_counter()
+        deadline = started + budget_ms / 1000
+        targets = merge_targets(targets)
+        
+        if self._built_changes != self._changes:
+            self.build()
+        pool = self._pool
+        
+        summary = self.db.get_daily_summary(date)
+        logged = tuple(summary[f'total_{n}'] or 0 for n in NUTRIENTS)
+        
+        lows = tuple(targets[n]['min'] - logged[i] for i, n in enumerate(NUTRIENTS))
+        highs = tuple(targets[n]['max'] - logged[i] for i, n in enumerate(NUTRIENTS))
+        scales = tuple(targets[n]['min'] or 1 for n in NUTRIENTS)
+        
+        def penalty(totals):
+            cost = 0
+            for i in range(len(NUTRIENTS)):
+                if totals[i] < lows[i]:
+                    cost += (lows[i] - totals[i]) / scales[i]
+                elif totals[i] > highs[i]:
+                    cost += OVER_TARGET_WEIGHT * (totals[i] - highs[i]) / scales[i]
+            return cost
+        
+        def shift(totals, vector, sign):
+            return tuple(t + sign * v for t, v in zip(totals, vector))
+        
+        servings = {}
+        totals = (0.0,) * len(NUTRIENTS)
+        best_cost = penalty(totals)
+        complete = True
+        
+        while True:
+            if time.perf_counter() > deadline:
+                complete = False
+                break
+            
+            move = None
+            
+            # Remove one serving
+            for j in servings:
+                candidate = shift(totals, pool[j][1], -1)
+                cost = penalty(candidate)
+                if cost < best_cost - 1e-9:
+                    best_cost, move = cost, (candidate, j, None)
+            
+            # Add one serving, or swap a planned serving for it
+            for k, (_, vector) in enumerate(pool):
+                count = servings.get(k, 0)
+                if count >= max_servings:
+                    continue
+                
+                if count or len(servings) < max_items:
+                    candidate = shift(totals, vector, 1)
+                    cost = penalty(candidate)
+                    if cost < best_cost - 1e-9:
+                        best_cost, move = cost, (candidate, None, k)
+                
+                for j in servings:
+                    if j == k or (not count and servings[j] > 1 and len(servings) >= max_items):
+                        continue
+                    candidate = shift(shift(totals, pool[j][1], -1), vector, 1)
+                    cost = penalty(candidate)
+                    if cost < best_cost - 1e-9:
+                        best_cost, move = cost, (candidate, j, k)
+            
+            if move is None:
+                break
+            
+            totals, removed, added = move
+            if removed is not None:
+                servings[removed] -= 1
+                if not servings[removed]:
+                    del servings[removed]
+            if added is not None:
+                servings[added] = servings.get(added, 0) + 1
+        
+        plan = []
+        for k, count in sorted(servings.items(), key=lambda item: -item[1]):
+            row, vector = pool[k]
+            plan.append({
+                'key': row['key'],
+                'name': row['name'],
+                'category': row['category'],
+                'servings': count,
+                'nutrition': {n: round(vector[i] * count, 1) for i, n in enumerate(NUTRIENTS)}
+            })
+        
+        return {
+            'date': date,
+            'targets': targets,
+            'logged': dict(zip(NUTRIENTS, logged)),
+            'plan': plan,
+            'planTotals': {n: round(totals[i], 1) for i, n in enumerate(NUTRIENTS)},
+            'projected': {n: round(logged[i] + totals[i], 1) for i, n in enumerate(NUTRIENTS)},
+            'score': round(best_cost, 4),
+            'complete': complete,
+            'candidates': len(pool),
+            'elapsedMs': round((time.perf_counter() - started) * 1000, 2)
+        }
@@ -0,0 +1,250 @@
+"""
+Nutrient Density Index for Food Tracker
+Precomputed nutrient densities over the ingredient and recipe catalog
+"""
+
+import heapq
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from db_service import DatabaseService, NUTRIENTS
+
+
+def _make_entry(item_type: str, key: str, name: str, category: Optional[str],
+                measurement: Optional[str], row: Dict) -> Dict:
+    """Build an index entry with per-serving nutrition and densities per 100 kcal"""
+    nutrition = {n: row[n] or 0 for n in NUTRIENTS}
+    calories = nutrition['calories']
+    
+    # Calories have no meaningful density of their own, so they are
+    # ranked by the amount per serving instead
+    density = {
+        n: (nutrition[n] * 100 / calories if calories > 0 else 0)
+        for n in NUTRIENTS if n != 'calories'
+    }
+    density['calories'] = calories
+    
+    return {
+        'type': item_type,
+        'key': key,
+        'name': name,
+        'category': category,
+        'measurement': measurement,
+        'nutrition': nutrition,
+        'density': density
+    }
+
+
+def _rank_key(entry: Dict, nutrient: str, order: str) -> Tuple:
+    """Ascending sort key placing the entry in a ranking, best first"""
+    if order == 'amount':
+        return -entry['nutrition'][nutrient], -entry['density'][nutrient]
+    return (-entry['density'][nutrient],)
+
+
+def _group(item_id: Tuple) -> Tuple:
+    """The ingredient or recipe an item belongs to; an ingredient has one item per measurement"""
+    return item_id[:3] if item_id[0] == 'ingredient' else item_id
+
+
+# Each nutrient is ranked twice: by amount per serving (density breaking
+# ties), which orders how much of a gap an item closes, and by density
+RANKINGS = [(n, order) for n in NUTRIENTS for order in ('amount', 'density')]
+
+
+class NutrientDensityIndex:
+    """In-memory index ranking catalog items by how well they close nutrient gaps"""
+    
+    def __init__(self, db_service: DatabaseService):
+        self.db = db_service
+        self._items = {}
+        self._groups = {}
+        self._state = ({}, {}, {})
+        self._built = False
+        self._lock = threading.Lock()
+    
+    # ============= BUILDING =============
+    
+    def build(self):
+        """Build the index from the full catalog"""
+        items = self._ingredient_entries(self.db.get_measurement_rows())
+        items.update(self._recipe_entries(self.db.get_recipe_nutrition_rows()))
+        
+        groups = {}
+        for item_id in items:
+            groups.setdefault(_group(item_id), []).append(item_id)
+        
+        rankings = {}
+        for n, order in RANKINGS:
+            ranked = sorted(((_rank_key(entry, n, order), entry) for entry in items.values()),
+                            key=lambda pair: pair[0])
+            rankings[n, order] = ([key for key, _ in ranked], [entry for _, entry in ranked])
+        
+        with self._lock:
+            self._publish(items, groups, rankings)
+            self._built = True
+    
+    def handle_change(self, event: Dict):
+        """Apply a catalog change event from DatabaseService incrementally.
+        
+        The changed ingredient's or recipe's entries are removed from and
+        inserted into each ranking by binary search, instead of re-sorting
+        the catalog.
+        """
+        if not self._built:
+            return
+        
+        entity = event.get('entity')
+        
+        if entity == 'ingredient':
+            group = ('ingredient', event['category'], event['key'])
+            fresh = self._ingredient_entries(self.db.get_measurement_rows(event['category'], event['key']))
+        elif entity == 'recipe':
+            group = ('recipe', event['key'])
+            fresh = self._recipe_entries(self.db.get_recipe_nutrition_rows(event['key']))
+        else:
+            return
+        
+        # Copy-on-write so concurrent readers keep a consistent snapshot
+        with self._lock:
+            items = dict(self._items)
+            groups = dict(self._groups)
+            removed = [items.pop(item_id) for item_id in groups.pop(group, ())]
+            items.update(fresh)
+            if fresh:
+                groups[group] = list(fresh)
+            
+            rankings = {}
+            for (n, order), (keys, entries) in self._state[2].items():
+                keys, entries = list(keys), list(entries)
+                for entry in removed:
+                    key = _rank_key(entry, n, order)
+                    i = bisect_left(keys, key)
+                    while entries[i] is not entry:
+                        i += 1
+                    del keys[i], entries[i]
+                for entry in fresh.values():
+                    key = _rank_key(entry, n, order)
+                    i = bisect_right(keys, key)
+                    keys.insert(i, key)
+                    entries.insert(i, entry)
+                rankings[n, order] = (keys, entries)
+            
+            self._publish(items, groups, rankings)
+    
+    def _publish(self, items: Dict, groups: Dict, rankings: Dict):
+        """Swap in a new item table with its rankings and normalization scales.
+        
+        rankings maps (nutrient, 'amount' | 'density') to parallel lists of
+        sort keys and entries, best first.
+        """
+        scales = {}
+        for n in NUTRIENTS:
+            entries = rankings[n, 'density'][1]
+            scales[n] = (entries[0]['density'][n] if entries else 0) or 1
+        
+        self._state = (items, scales, rankings)
+        self._items = items
+        self._groups = groups
+    
+    @staticmethod
+    def _ingredient_entries(rows: List[Dict]) -> Dict:
+        """Index entries for ingredient measurement rows"""
+        return {
+            ('ingredient', row['category'], row['ingredient_key'], row['measurement_key']): _make_entry(
+                'ingredient', row['ingredient_key'], row['ingredient_name'],
+                row['category'], row['measurement_key'], row
+            )
+            for row in rows
+        }
+    
+    @staticmethod
+    def _recipe_entries(rows: List[Dict]) -> Dict:
+        """Index entries for recipe per-serving nutrition rows"""
+        return {
+            ('recipe', row['key']): _make_entry(
+                'recipe', row['key'], row['name'], row['category'], 'serving', row
+            )
+            for row in rows
+        }
+    
+    # ============= QUERIES =============
+    
+    def __len__(self):
+        return len(self._items)
+    
+    def top_k(self, nutrients: List[str], gaps: Dict[str, float], k: int = 5) -> List[Dict]:
+        """Return the k items that best close the given nutrient gaps per serving.
+        
+        Items are scored by the fraction of each gap one serving closes (capped
+        at 1 per nutrient), with normalized nutrient density as the tie-breaker.
+        
+        The precomputed rankings are read from the top, one depth at a time
+        across the requested nutrients (the threshold algorithm): no item
+        further down can score more than the entries at the current depth, so
+        reading stops once the k-th best score reaches that bound, usually
+        after the first few entries of each ranking.
+        """
+        if not self._built:
+            self.build()
+        
+        nutrients = [n for n in nutrients if n in NUTRIENTS]
+        if not nutrients or k <= 0:
+            return []
+        
+        items, scales, rankings = self._state
+        weights = [(n, max(gaps.get(n) or 0, 0), scales[n]) for n in nutrients]
+        # The amount ranking bounds the gap closed and the density ranking the
+        # tie-breaker; nutrients without a gap only count towards the latter
+        lists = [(n, gap, scale, rankings[n, 'amount'][1], 'amount') for n, gap, scale in weights if gap > 0]
+        lists.extend((n, gap, scale, rankings[n, 'density'][1], 'density') for n, gap, scale in weights)
+        
+        def score(entry):
+            nutrition = entry['nutrition']
+            density = entry['density']
+            closed = 0
+            dense = 0
+            for n, gap, scale in weights:
+                if gap > 0:
+                    closed += min(nutrition[n], gap) / gap
+                dense += density[n] / scale
+            return closed, dense
+        
+        # Min-heap of (score, -order, entry); order keeps earlier-read items ahead on ties
+        best = []
+        seen = set()
+        for depth in range(len(items)):
+            closed_bound = dense_bound = 0
+            for n, gap, scale, ranking, order in lists:
+                entry = ranking[depth]
+                if order == 'amount':
+                    closed_bound += min(entry['nutrition'][n], gap) / gap
+                else:
+                    dense_bound += entry['density'][n] / scale
+                
+                if id(entry) in seen:
+                    continue
+                seen.add(id(entry))
+                candidate = (score(entry), -len(seen), entry)
+                if len(best) < k:
+                    heapq.heappush(best, candidate)
+                elif candidate[:2] > best[0][:2]:
+                    heapq.heapreplace(best, candidate)
+            
+            if len(best) == k and best[0][0] >= (closed_bound, dense_bound):
+                break
+        
+        best.sort(key=lambda candidate: candidate[:2], reverse=True)
+        return [
+            {
+                'type': entry['type'],
+                'key': entry['key'],
+                'name': entry['name'],
+                'category': entry['category'],
+                'measurement': entry['measurement'],
+                'nutrition': entry['nutrition'],
+                'score': round(closed, 3)
+            }
+            for (closed, _), _, entry in best
+        ]
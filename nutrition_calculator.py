@@ -0,0 +1,164 @@
+"""
+Nutrition Calculator for Food Tracker
+Server-side batch nutrition for ingredient measurement and recipe serving lines
+"""
+
+import threading
+from typing import Dict, List
+
+from amount_parser import measurement_slug
+from db_service import DatabaseService, NUTRIENTS
+
+
+# Largest batch accepted in one calculate() call
+MAX_LINES = 10000
+
+
+class NutritionCalculator:
+    """Resolves nutrition lines against in-memory lookup tables of the catalog"""
+    
+    def __init__(self, db_service: DatabaseService):
+        self.db = db_service
+        self._lock = threading.Lock()
+        self._built = False
+        self._measurements = {}
+        self._bare_keys = {}
+        self._recipes = {}
+    
+    # ============= LOOKUP TABLES =============
+    
+    def build(self):
+        """Load every measurement and recipe serving into the lookup tables"""
+        measurements = {}
+        bare_keys = {}
+        for row in self.db.get_measurement_rows():
+            ref = f'{row["category"]}.{row["ingredient_key"]}'
+            measurements.setdefault(ref, {})[measurement_slug(row['measurement_key'])] = \
+                tuple(row[n] or 0 for n in NUTRIENTS)
+            bare_keys.setdefault(row['ingredient_key'], set()).add(ref)
+        
+        recipes = {
+            row['key']: tuple(row[n] or 0 for n in NUTRIENTS)
+            for row in self.db.get_recipe_nutrition_rows()
+        }
+        
+        with self._lock:
+            self._measurements = measurements
+            self._bare_keys = bare_keys
+            self._recipes = recipes
+            self._built = True
+    
+    def handle_change(self, event: Dict):
+        """Refresh the lookup entries for one changed ingredient or recipe"""
+        if not self._built:
+            return
+        
+        with self._lock:
+            if event.get('entity') == 'ingredient':
+                category, key = event['category'], event['key']
+                ref = f'{category}.{key}'
+                table = {
+                    measurement_slug(row['measurement_key']): tuple(row[n] or 0 for n in NUTRIENTS)
+                    for row in self.db.get_measurement_rows(category, key)
+                }
+                if table:
+                    self._measurements[ref] = table
+                    self._bare_keys.setdefault(key, set()).add(ref)
+                else:
+                    self._measurements.pop(ref, None)
+                    self._bare_keys.get(key, set()).discard(ref)
+            elif event.get('entity') == 'recipe':
+                rows = self.db.get_recipe_nutrition_rows(event['key'])
+                if rows:
+                    self._recipes[event['key']] = tuple(rows[0][n] or 0 for n in NUTRIENTS)
+                else:
+                    self._recipes.pop(event['key'], None)
+    
+    # ============= CALCULATION =============
+    
+    @staticmethod
+    def _text(line: Dict, field: str):
+        value = line.get(field)
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f'{field} must be a string')
+        return value
+    
+    @staticmethod
+    def _amount(line: Dict, field: str) -> float:
+        value = line.get(field, 1)
+        # bool is an int subclass, but true/false are not amounts
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            raise ValueError(f'{field} must be a non-negative number')
+        return value
+    
+    def _resolve(self, line: Dict) -> tuple:
+        """Per-line nutrition vector; raises ValueError for lines that can't be resolved"""
+        if not isinstance(line, dict):
+            raise ValueError('Line must be an object')
+        
+        recipe_key = self._text(line, 'recipeKey')
+        if recipe_key:
+            servings = self._amount(line, 'servings')
+            vector = self._recipes.get(recipe_key)
+            if vector is None:
+                raise ValueError(f'Recipe not found: {recipe_key}')
+            return tuple(v * servings for v in vector)
+        
+        ref = self._text(line, 'ingredientKey')
+        measurement = self._text(line, 'measurement')
+        category = self._text(line, 'category')
+        if not ref or not measurement:
+            raise ValueError('Line needs recipeKey, or ingredientKey and measurement')
+        
+        quantity = self._amount(line, 'quantity')
+        
+        if category:
+            ref = f'{category}.{ref}'
+        elif ref not in self._measurements and len(self._bare_keys.get(ref, ())) == 1:
+            ref = next(iter(self._bare_keys[ref]))
+        
+        table = self._measurements.get(ref)
+        if table is None:
+            raise ValueError(f'Ingredient not found: {ref}')
+        
+        vector = table.get(measurement_slug(measurement))
+        if vector is None:
+            raise ValueError(f'Measurement "{measurement}" not found for {ref}')
+        
+        return tuple(v * quantity for v in vector)
+    
+    def calculate(self, lines: List[Dict]) -> Dict:
+        """Calculate per-line and total nutrition for a batch of lines.
+        
+        A line is either {ingredientKey, measurement, quantity} (ingredientKey as
+        "category.key", or with a separate category) or {recipeKey, servings}.
+        Lines that can't be resolved are reported with an error and left out of
+        the totals.
+        """
+        if not self._built:
+            self.build()
+        
+        results = []
+        totals = [0.0] * len(NUTRIENTS)
+        errors = 0
+        
+        for index, line in enumerate(lines):
+            try:
+                vector = self._resolve(line)
+            except ValueError as e:
+                errors += 1
+                results.append({'index': index, 'error': str(e)})
+                continue
+            
+            for i, value in enumerate(vector):
+                totals[i] += value
+            results.append({
+                'index': index,
+                'nutrition': {n: round(vector[i], 2) for i, n in enumerate(NUTRIENTS)}
+            })
+        
+        return {
+            'lines': results,
+            'totals': {n: round(totals[i], 2) for i, n in enumerate(NUTRIENTS)},
+            'errors': errors
+        }
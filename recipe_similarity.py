@@ -0,0 +1,198 @@
+"""
+Recipe Similarity Index for Food Tracker
+Nearest-neighbor search over recipe per-serving nutrition profiles
+"""
+
+import heapq
+import math
+import threading
+from typing import Dict, List, Optional
+
+from db_service import DatabaseService, NUTRIENTS
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is listed in requirements.txt
+    np = None
+
+
+class RecipeVectorIndex:
+    """Cosine-similarity index over normalized recipe nutrition vectors.
+    
+    Recipe changes trigger a rebuild in a background thread; queries keep
+    using the previous vectors until it finishes, so they never wait for one.
+    """
+    
+    def __init__(self, db_service: DatabaseService):
+        self.db = db_service
+        self._lock = threading.Lock()
+        self._changes = 0
+        self._built_changes = -1
+        self._rebuilding = False
+        self._keys = []
+        self._positions = {}
+        self._rows = []
+        self._scale = [1.0] * len(NUTRIENTS)
+        self._raw = None
+        self._unit = None
+    
+    def handle_change(self, event: Dict):
+        """Rebuild the index in the background when a recipe is added, updated or deleted"""
+        if event.get('entity') != 'recipe':
+            return
+        
+        with self._lock:
+            self._changes += 1
+            # Until the first build, the first query builds from the current catalog
+            start = self._built_changes >= 0 and not self._rebuilding
+            if start:
+                self._rebuilding = True
+        if start:
+            threading.Thread(target=self._rebuild, name='recipe-index', daemon=True).start()
+    
+    def _rebuild(self):
+        """Rebuild until the index has caught up with every change made meanwhile"""
+        while True:
+            with self._lock:
+                if self._built_changes == self._changes:
+                    self._rebuilding = False
+                    return
+            try:
+                self.build()
+            except Exception as error:
+                print(f'Error rebuilding recipe index: {error}')
+                with self._lock:
+                    self._rebuilding = False
+                return
+    
+    def build(self):
+        """Rebuild the index from the recipe catalog"""
+        with self._lock:
+            changes = self._changes
+        self.load_rows(self.db.get_recipe_nutrition_rows(), changes)
+    
+    def load_rows(self, rows: List[Dict], changes: Optional[int] = None):
+        """Build the vector matrix from recipe nutrition rows"""
+        raw = [[float(row[n] or 0) for n in NUTRIENTS] for row in rows]
+        
+        # Scale each nutrient by its catalog mean so calories don't dominate
+        # the distance, then L2-normalize each row for cosine similarity
+        count = len(raw) or 1
+        scale = [(sum(vec[i] for vec in raw) / count) or 1.0 for i in range(len(NUTRIENTS))]
+        
+        if np is not None:
+            raw_matrix = np.asarray(raw, dtype=np.float64).reshape(-1, len(NUTRIENTS))
+            scaled = raw_matrix / np.asarray(scale)
+            norms = np.linalg.norm(scaled, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            unit = scaled / norms
+        else:
+            raw_matrix = raw
+            unit = [self._normalize(vec, scale) for vec in raw]
+        
+        with self._lock:
+            self._rows = rows
+            self._keys = [row['key'] for row in rows]
+            self._positions = {key: i for i, key in enumerate(self._keys)}
+            self._scale = scale
+            self._raw = raw_matrix
+            self._unit = unit
+            self._built_changes = self._changes if changes is None else changes
+    
+    @staticmethod
+    def _normalize(vec: List[float], scale: List[float]) -> List[float]:
+        """Scale and L2-normalize one vector (pure Python path)"""
+        scaled = [v / s for v, s in zip(vec, scale)]
+        norm = math.sqrt(sum(v * v for v in scaled)) or 1.0
+        return [v / norm for v in scaled]
+    
+    def __len__(self):
+        return len(self._keys)
+    
+    def similar(self, recipe_key: str, limit: int = 5, more: Optional[List[str]] = None,
+                less: Optional[List[str]] = None) -> Optional[Dict]:
+        """Find recipes with the most similar macro profile.
+        
+        `more` and `less` restrict results to recipes with strictly more or
+        less of the given nutrients per serving than the reference recipe.
+        Returns None if the recipe is not in the index.
+        """
+        if self._built_changes < 0:
+            self.build()
+        
+        with self._lock:
+            rows, positions, raw, unit = self._rows, self._positions, self._raw, self._unit
+        
+        position = positions.get(recipe_key)
+        if position is None:
+            return None
+        
+        more_idx = [NUTRIENTS.index(n) for n in (more or []) if n in NUTRIENTS]
+        less_idx = [NUTRIENTS.index(n) for n in (less or []) if n in NUTRIENTS]
+        
+        if np is not None:
+            ranked = self._rank_numpy(position, limit, more_idx, less_idx, raw, unit)
+        else:
+            ranked = self._rank_python(position, limit, more_idx, less_idx, raw, unit)
+        
+        reference = rows[position]
+        return {
+            'recipe': self._describe(reference),
+            'similar': [
+                {**self._describe(rows[i]), 'similarity': round(score, 4)}
+                for i, score in ranked
+            ]
+        }
+    
+    @staticmethod
+    def _rank_numpy(position, limit, more_idx, less_idx, raw, unit):
+        """Brute-force cosine ranking with one BLAS matrix-vector product"""
+        scores = unit @ unit[position]
+        mask = np.ones(len(scores), dtype=bool)
+        mask[position] = False
+        
+        for i in more_idx:
+            mask &= raw[:, i] > raw[position, i]
+        for i in less_idx:
+            mask &= raw[:, i] < raw[position, i]
+        
+        candidates = np.flatnonzero(mask)
+        if len(candidates) == 0:
+            return []
+        
+        candidate_scores = scores[candidates]
+        if len(candidates) > limit:
+            top = np.argpartition(-candidate_scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(-candidate_scores[top], kind='stable')]
+        
+        return [(int(candidates[i]), float(candidate_scores[i])) for i in top]
+    
+    @staticmethod
+    def _rank_python(position, limit, more_idx, less_idx, raw, unit):
+        """Pure Python fallback when numpy is unavailable"""
+        query = unit[position]
+        reference = raw[position]
+        
+        def candidates():
+            for i, vec in enumerate(unit):
+                if i == position:
+                    continue
+                if any(raw[i][j] <= reference[j] for j in more_idx):
+                    continue
+                if any(raw[i][j] >= reference[j] for j in less_idx):
+                    continue
+                yield i, sum(a * b for a, b in zip(vec, query))
+        
+        return heapq.nlargest(limit, candidates(), key=lambda pair: pair[1])
+    
+    @staticmethod
+    def _describe(row: Dict) -> Dict:
+        """Public representation of a recipe row"""
+        return {
+            'key': row['key'],
+            'name': row['name'],
+            'category': row['category'],
+            'nutrition': {n: row[n] or 0 for n in NUTRIENTS}
+        }
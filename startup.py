@@ -0,0 +1,99 @@
+"""
+Startup Profiling for Food Tracker
+Timed import and initialization steps, background subsystem start-up and readiness
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class Startup:
+    """Startup profile and readiness tracker.
+    
+    Imports and cheap setup are timed with step() on the importing thread;
+    heavy subsystems are initialized by run() in a background thread so the
+    server can accept connections right away. Each subsystem is pending,
+    ready or failed, and the app is ready once none is pending.
+    """
+    
+    def __init__(self, imports: Optional['Startup'] = None):
+        # An app's profile starts with the module imports timed before it was created
+        self.started_at = imports.started_at if imports else time.perf_counter()
+        self.ready_at = None
+        self.steps = list(imports.steps) if imports else []
+        self.subsystems = {}
+        self._events = {}
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def step(self, name: str):
+        """Time a block of start-up work under name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self.steps.append((name, elapsed, threading.current_thread().name))
+    
+    def run(self, subsystems: List[Tuple[str, Callable]], background: bool = True):
+        """Initialize subsystems in order, in a background thread unless told otherwise"""
+        with self._lock:
+            for name, _ in subsystems:
+                self.subsystems[name] = 'pending'
+                self._events[name] = threading.Event()
+        
+        if background:
+            threading.Thread(target=self._run, args=(subsystems,), name='startup', daemon=True).start()
+        else:
+            self._run(subsystems)
+    
+    def _run(self, subsystems):
+        for name, init in subsystems:
+            try:
+                with self.step(name):
+                    init()
+                status = 'ready'
+            except Exception as error:
+                print(f'❌ Failed to initialize {name}: {error}')
+                status = f'failed: {error}'
+            
+            with self._lock:
+                self.subsystems[name] = status
+            self._events[name].set()
+        
+        self.ready_at = time.perf_counter()
+        self.report()
+    
+    def wait(self, name: str, timeout: Optional[float] = None) -> bool:
+        """Wait for a subsystem to finish initializing; True if it is ready"""
+        event = self._events.get(name)
+        if event is not None:
+            event.wait(timeout)
+        return self.subsystems.get(name) == 'ready'
+    
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None and all(status == 'ready' for status in self.subsystems.values())
+    
+    def status(self) -> Dict:
+        """Readiness and per-subsystem status, for the readiness endpoint"""
+        with self._lock:
+            subsystems = dict(self.subsystems)
+        return {
+            'ready': self.ready,
+            'subsystems': subsystems,
+            'startupMs': round((self.ready_at - self.started_at) * 1000, 1) if self.ready_at else None
+        }
+    
+    def report(self):
+        """Print the time spent in each start-up step"""
+        with self._lock:
+            steps = list(self.steps)
+        
+        print('\n⏱️  Startup profile')
+        for name, elapsed, thread in steps:
+            print(f'   {name:<24} {elapsed:8.1f} ms  ({thread})')
+        print(f'   {"finished after":<24} {(self.ready_at - self.started_at) * 1000:8.1f} ms\n')
@@ -0,0 +1,45 @@
+"""
+Shared fixtures for the Food Tracker tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from db_service import DatabaseService  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Database service on a fresh database created from schema.sql"""
+    service = DatabaseService(str(tmp_path / 'food_tracker.db'))
+    service.connect()
+    yield service
+    service.close()
+
+
+@pytest.fixture
+def client(tmp_path):
+    """Test client for an app on a fresh database, started in the foreground"""
+    pytest.importorskip('flask')
+    from app import create_app
+    
+    app = create_app(background=False, db_path=str(tmp_path / 'food_tracker.db'))
+    return app.test_client()
+
+
+def meal(meal_id: int, date: str, description: str, calories: float = 100) -> dict:
+    """Meal in add_meal shape"""
+    return {
+        'id': meal_id,
+        'description': description,
+        'mealType': 'Lunch',
+        'date': date,
+        'timestamp': f'{date}T12:00:00.000Z',
+        'source': 'custom',
+        'nutrition': {'calories': calories, 'protein': 1, 'carbs': 2, 'fat': 3, 'fiber': 4},
+        'ingredient_data': None
+    }
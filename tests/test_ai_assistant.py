@@ -0,0 +1,83 @@
+"""
+Tests for the AI assistant's suggestion rules, chat context and response cache key
+"""
+
+import pytest
+
+from ai_assistant import AIAssistantService, compile_rules, evaluate_rules
+from ai_cache import AIResponseCache
+from conftest import meal
+
+
+def test_cache_key_changes_with_earlier_days(db):
+    """An answer isn't reused once meals outside today change the averages the prompt shows"""
+    assistant = AIAssistantService(db)
+    db.add_meal(meal(1, '2026-01-10', 'Oats', calories=400))
+    before = assistant.get_chat_context('2026-01-10')
+    
+    db.add_meal(meal(2, '2026-01-08', 'Dal', calories=900))
+    after = assistant.get_chat_context('2026-01-10')
+    
+    assert after['summary']['total_calories'] == before['summary']['total_calories']
+    assert (AIResponseCache.make_key('How am I doing?', before['sections'])
+            != AIResponseCache.make_key('How am I doing?', after['sections']))
+
+
+def test_cache_key_ignores_message_punctuation_and_case(db):
+    sections = AIAssistantService(db).get_chat_context('2026-01-10')['sections']
+    
+    assert (AIResponseCache.make_key('How am I doing?', sections)
+            == AIResponseCache.make_key('how am i doing', sections))
+
+
+def test_analyze_range_matches_each_day_analyzed_alone(db):
+    assistant = AIAssistantService(db)
+    db.add_meal(meal(1, '2026-01-01', 'Oats', calories=2500))
+    db.add_meal(meal(2, '2026-01-03', 'Dal', calories=400))
+    
+    report = assistant.analyze_range('2026-01-01', '2026-01-03')
+    
+    assert [day['date'] for day in report['days']] == ['2026-01-01', '2026-01-02', '2026-01-03']
+    assert report['days'] == [assistant.generate_suggestions(day['date']) for day in report['days']]
+
+
+def test_analyze_range_rejects_a_reversed_range(db):
+    with pytest.raises(ValueError):
+        AIAssistantService(db).analyze_range('2026-01-03', '2026-01-01')
+
+
+def test_rule_fires_its_first_matching_branch(db):
+    rules = compile_rules([{'category': 'calories', 'metric': 'calories', 'branches': [
+        {'when': ('<', 1000), 'type': 'warning', 'message': 'Low: {value} < {threshold}', 'recommendation': 'Eat more'},
+        {'when': ('<', 2000), 'type': 'info', 'message': 'Never reached'},
+        {'type': 'success', 'message': 'Fine'}
+    ]}])
+    summary = {**db.empty_daily_summary('2026-01-01'), 'total_calories': 600.4, 'meal_count': 1}
+    
+    result = evaluate_rules('2026-01-01', summary, ['Lunch'], rules)
+    
+    assert result['suggestions'] == [{'type': 'warning', 'category': 'calories',
+                                      'message': 'Low: 600 < 1000', 'recommendation': 'Eat more'}]
+    assert [insight['category'] for insight in result['insights']] == ['variety']
+
+
+def test_chat_prompt_keeps_the_sections_that_fit_the_budget(db):
+    assistant = AIAssistantService(db)
+    context = {'date': '2026-01-10', 'summary': None, 'sections': ['a' * 40, 'b' * 40, 'c' * 4]}
+    
+    prompt = assistant.build_chat_prompt('How am I doing?', context, token_budget=19)
+    
+    # Sections are 10, 10 and 1 tokens; the second doesn't fit, and neither does anything after it
+    assert 'a' * 40 in prompt
+    assert 'b' * 40 not in prompt and 'c' * 4 not in prompt
+    assert prompt.endswith('User question: How am I doing?\n\nResponse:')
+
+
+def test_chat_context_lists_today_first(db):
+    db.add_meal(meal(1, '2026-01-10', 'Oats (2 servings)', calories=400))
+    db.add_meal(meal(2, '2026-01-09', 'Oats', calories=300))
+    
+    sections = AIAssistantService(db).get_chat_context('2026-01-10')['sections']
+    
+    assert sections[0].startswith('Today (2026-01-10) the user has logged 1 meals with 400 calories')
+    assert sections[-1] == 'Most logged foods recently: Oats (2x).'
@@ -0,0 +1,49 @@
+"""
+Tests for the AI response cache
+"""
+
+import ai_cache
+from ai_cache import AIResponseCache
+
+
+def cache_row(db, key):
+    return db.fetch_one('SELECT hits, last_used_at FROM ai_response_cache WHERE cache_key = ?', (key,))
+
+
+def test_hits_are_written_back_in_batches(db):
+    cache = AIResponseCache(db)
+    cache.store('key', 'How am I doing?', 'Fine')
+    
+    for _ in range(3):
+        assert cache.get('key') == 'Fine'
+    assert cache_row(db, 'key')['hits'] == 0
+    
+    cache.flush_hits()
+    assert cache_row(db, 'key')['hits'] == 3
+    assert cache.metrics()['hits'] == 3
+
+
+def test_hits_flush_once_enough_entries_are_pending(db, monkeypatch):
+    monkeypatch.setattr(ai_cache, 'HIT_FLUSH_EVERY', 2)
+    cache = AIResponseCache(db)
+    cache.store('first', 'a', 'A')
+    cache.store('second', 'b', 'B')
+    
+    cache.get('first')
+    assert cache_row(db, 'first')['hits'] == 0
+    cache.get_or_compute('second', 'b', lambda: 'unused')
+    assert cache_row(db, 'first')['hits'] == 1
+    assert cache_row(db, 'second')['hits'] == 1
+
+
+def test_miss_computes_once_and_stores(db):
+    cache = AIResponseCache(db)
+    calls = []
+    
+    def compute():
+        calls.append(1)
+        return 'Eat more fiber'
+    
+    assert cache.get_or_compute('key', 'Tips?', compute) == ('Eat more fiber', False)
+    assert cache.get_or_compute('key', 'Tips?', compute) == ('Eat more fiber', True)
+    assert len(calls) == 1
@@ -0,0 +1,32 @@
+"""
+Tests for amount_parser
+"""
+
+import pytest
+
+from amount_parser import measurement_slug, parse_amount, per_serving
+
+
+@pytest.mark.parametrize('amount, expected', [
+    ('1.33x 1 cup uncooked', (1.33, '1cupuncooked')),
+    ('2X 100 g', (2.0, '100g')),
+    ('.5x 1_tbsp', (0.5, '1tbsp')),
+    ('1/4 × 1 cup', (0.25, '1cup'))
+])
+def test_parse_amount(amount, expected):
+    assert parse_amount(amount) == expected
+
+
+@pytest.mark.parametrize('amount', ['', 'a pinch', '1/0x 1 cup', '2 cups'])
+def test_unparseable_amounts_return_none(amount):
+    assert parse_amount(amount) is None
+
+
+def test_measurement_key_and_display_text_share_a_slug():
+    assert measurement_slug('1_cup_uncooked') == measurement_slug('1  Cup uncooked')
+
+
+def test_per_serving_rounds_half_up_like_the_web_ui():
+    totals = {'calories': 5, 'protein': 0.5, 'carbs': 0, 'fat': 0, 'fiber': 0}
+    
+    assert per_serving(totals, 2) == {'calories': 3, 'protein': 0.3, 'carbs': 0, 'fat': 0, 'fiber': 0}
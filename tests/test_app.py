@@ -0,0 +1,87 @@
+"""
+Tests for the app factory and start-up readiness
+"""
+
+import threading
+
+import pytest
+
+pytest.importorskip('flask')
+
+import app as app_module  # noqa: E402
+from conftest import meal  # noqa: E402
+from startup import Startup  # noqa: E402
+
+
+ADD_OATS = {'method': 'POST', 'path': '/api/meals', 'body': {'date': '2026-01-01', 'meal': meal(1, '2026-01-01', 'Oats')}}
+
+
+def test_apps_do_not_share_services(tmp_path):
+    first = app_module.create_app(background=False, db_path=str(tmp_path / 'first.db'))
+    second = app_module.create_app(background=False, db_path=str(tmp_path / 'second.db'))
+    
+    first.extensions[app_module.EXTENSION].db.add_meal(meal(1, '2026-01-01', 'Oats'))
+    
+    assert len(first.test_client().get('/api/meals?date=2026-01-01').get_json()) == 1
+    assert second.test_client().get('/api/meals?date=2026-01-01').get_json() == []
+
+
+def test_ready_once_every_subsystem_started(client):
+    response = client.get('/api/ready')
+    
+    assert response.status_code == 200
+    assert set(response.get_json()['subsystems'].values()) == {'ready'}
+
+
+def test_not_ready_while_a_subsystem_is_starting():
+    startup = Startup()
+    release = threading.Event()
+    startup.run([('slow', lambda: release.wait(5))])
+    
+    assert not startup.ready
+    assert startup.status()['subsystems'] == {'slow': 'pending'}
+    assert not startup.wait('slow', 0.01)
+    
+    release.set()
+    assert startup.wait('slow', 5)
+    assert startup.ready
+
+
+def test_failed_subsystem_is_reported():
+    def fail():
+        raise RuntimeError('no SDK')
+    
+    startup = Startup()
+    startup.run([('AI backend', fail)], background=False)
+    
+    assert not startup.ready
+    assert startup.status()['subsystems'] == {'AI backend': 'failed: no SDK'}
+
+
+def test_transactional_batch_rejects_ai_calls(client):
+    operations = [ADD_OATS, {'method': 'POST', 'path': '/api/ai/chat', 'body': {'message': 'What should I eat?'}}]
+    
+    response = client.post('/api/batch', json={'operations': operations, 'transaction': True})
+    
+    assert response.status_code == 400
+    assert client.get('/api/meals?date=2026-01-01').get_json() == []
+
+
+def test_transactional_batch_commits_ordinary_calls(client):
+    response = client.post('/api/batch', json={'operations': [ADD_OATS], 'transaction': True})
+    
+    assert response.get_json()['committed']
+    assert len(client.get('/api/meals?date=2026-01-01').get_json()) == 1
+
+
+def test_bootstrap_rejects_an_invalid_date(client):
+    assert client.get('/api/bootstrap?date=2026-13-01').status_code == 400
+
+
+def test_bootstrap_returns_the_day(client):
+    client.post('/api/meals', json={'date': '2026-01-01', 'meal': meal(1, '2026-01-01', 'Oats')})
+    
+    payload = client.get('/api/bootstrap?date=2026-01-01').get_json()
+    
+    assert [logged['description'] for logged in payload['meals']] == ['Oats']
+    assert payload['catalogChanged']
@@ -0,0 +1,46 @@
+"""
+Tests for the autocomplete index
+"""
+
+from autocomplete import AutocompleteIndex
+
+
+def row(kind, name):
+    return {'type': kind, 'key': name.lower().replace(' ', '_'), 'name': name,
+            'category': 'other' if kind == 'ingredient' else 'Main'}
+
+
+def index_of(rows):
+    index = AutocompleteIndex(None)
+    index.load_rows(rows)
+    return index
+
+
+def test_type_filter_finds_matches_behind_many_of_another_type():
+    index = index_of([row('ingredient', f'Apple {i:03d}') for i in range(1000)] + [row('recipe', 'Apple Pie Deluxe')])
+    
+    assert [s['name'] for s in index.complete('apple', types=['recipe'])] == ['Apple Pie Deluxe']
+
+
+def test_shortest_names_rank_first_across_all_matches():
+    index = index_of([row('ingredient', f'Aa Long Name {i:03d}') for i in range(1000)] + [row('recipe', 'Az')])
+    
+    assert [s['name'] for s in index.complete('a', limit=2)] == ['Az', 'Aa Long Name 000']
+
+
+def test_name_matches_rank_before_later_word_matches():
+    index = index_of([row('recipe', 'Lauki Sambar'), row('recipe', 'Sambar Rice Bowl Special')])
+    
+    assert [s['name'] for s in index.complete('samb')] == ['Sambar Rice Bowl Special', 'Lauki Sambar']
+
+
+def test_recipe_rename_moves_entry_to_its_new_name(db):
+    index = AutocompleteIndex(db)
+    db.add_change_listener(index.handle_change)
+    db.add_recipe('dal', {'name': 'Dal', 'servings': 1})
+    index.build()
+    
+    db.update_recipe('dal', {'name': 'Yellow Dal Tadka', 'servings': 1})
+    
+    assert [s['name'] for s in index.complete('yel')] == ['Yellow Dal Tadka']
+    assert [s['name'] for s in index.complete('dal')] == ['Yellow Dal Tadka']
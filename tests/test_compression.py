@@ -0,0 +1,46 @@
+"""
+Tests for precompressed static assets
+"""
+
+import gzip
+
+import pytest
+
+flask = pytest.importorskip('flask')
+
+from compression import StaticAssets  # noqa: E402
+
+
+@pytest.fixture
+def root(tmp_path):
+    (tmp_path / 'food_tracker.html').write_text('<html>' + 'meals ' * 500 + '</html>')
+    (tmp_path / 'database').mkdir()
+    (tmp_path / 'database' / 'migrate.js').write_text('console.log("migrate");' * 100)
+    return tmp_path
+
+
+def send(assets, filename):
+    with flask.Flask(__name__).test_request_context(headers={'Accept-Encoding': 'gzip'}):
+        response = assets.send(filename)
+        response.direct_passthrough = False
+        return response.headers.get('Content-Encoding'), response.get_data()
+
+
+def test_allow_listed_file_is_served_precompressed(root):
+    assets = StaticAssets(str(root))
+    assets.precompress_all()
+    
+    encoding, body = send(assets, 'food_tracker.html')
+    
+    assert encoding == 'gzip'
+    assert gzip.decompress(body) == (root / 'food_tracker.html').read_bytes()
+
+
+def test_other_files_are_served_without_writing_variants(root):
+    assets = StaticAssets(str(root))
+    
+    encoding, body = send(assets, 'database/migrate.js')
+    
+    assert encoding is None
+    assert body == (root / 'database' / 'migrate.js').read_bytes()
+    assert sorted(path.name for path in (root / 'database').iterdir()) == ['migrate.js']
@@ -0,0 +1,178 @@
+"""
+Tests for DatabaseService transactions, recipe recomputation, search and bootstrap
+"""
+
+import threading
+
+import pytest
+
+from conftest import meal
+
+
+class Rollback(Exception):
+    pass
+
+
+def test_concurrent_reader_never_sees_rolled_back_meal(db):
+    """An atomic batch (/api/batch with transaction: true) that rolls back is invisible to other requests"""
+    written, release = threading.Event(), threading.Event()
+    errors = []
+    
+    def atomic_batch():
+        try:
+            with db.transaction():
+                db.add_meal(meal(1, '2026-01-01', 'Rolled back'))
+                written.set()
+                release.wait(5)
+                raise Rollback()
+        except Rollback:
+            pass
+        except Exception as error:
+            errors.append(error)
+            written.set()
+    
+    seen = []
+    reader = threading.Thread(target=lambda: seen.append(db.get_meals_by_date('2026-01-01')))
+    
+    batch = threading.Thread(target=atomic_batch)
+    batch.start()
+    assert written.wait(5)
+    reader.start()
+    
+    # The reader waits for the open transaction instead of reading its writes
+    reader.join(0.2)
+    assert reader.is_alive()
+    
+    release.set()
+    batch.join(5)
+    reader.join(5)
+    assert not errors
+    assert seen == [[]]
+
+
+def test_rolled_back_transaction_leaves_no_rows(db):
+    with pytest.raises(Rollback):
+        with db.transaction():
+            db.add_meal(meal(1, '2026-01-01', 'Rolled back'))
+            raise Rollback()
+    
+    assert db.get_meals_by_date('2026-01-01') == []
+
+
+def rice(calories):
+    return {'name': 'Rice', 'measurements': {
+        '1_cup': {'calories': calories, 'protein': 4, 'carbs': 40, 'fat': 1, 'fiber': 2}
+    }}
+
+
+def add_rice_bowl(db, calories):
+    db.add_ingredient('grains', 'rice', rice(calories))
+    db.add_recipe('rice_bowl', {
+        'name': 'Rice bowl', 'servings': 2,
+        'total_per_serving': {'calories': calories, 'protein': 4, 'carbs': 40, 'fat': 1, 'fiber': 2},
+        'ingredients': [{'key': 'grains.rice', 'name': 'Rice', 'amount': '2x 1 cup',
+                         'nutrition': {'calories': 2 * calories, 'protein': 8, 'carbs': 80, 'fat': 2, 'fiber': 4}}]
+    })
+
+
+def test_updating_an_ingredient_recomputes_recipes_using_it(db):
+    add_rice_bowl(db, 200)
+    
+    result = db.update_ingredient('grains', 'rice', rice(300))
+    
+    assert result['recipesUpdated'] == 1
+    assert db.get_recipe_nutrition_rows('rice_bowl')[0]['calories'] == 300
+
+
+def test_dry_run_reports_changes_without_writing(db):
+    add_rice_bowl(db, 200)
+    db.execute('UPDATE ingredient_measurements SET calories = 250')
+    
+    report = db.recompute_recipes(dry_run=True)
+    
+    assert [(recipe['key'], recipe['before']['calories'], recipe['after']['calories'])
+            for recipe in report['recipes']] == [('rice_bowl', 200, 250)]
+    assert db.get_recipe_nutrition_rows('rice_bowl')[0]['calories'] == 200
+
+
+def test_unparseable_amounts_are_reported_unresolved(db):
+    add_rice_bowl(db, 200)
+    db.execute("UPDATE recipe_ingredients SET amount = 'a handful'")
+    
+    report = db.recompute_recipes([('grains', 'rice')])
+    
+    assert report['unresolved'] == [{'recipe': 'rice_bowl', 'ingredient': 'grains.rice', 'amount': 'a handful'}]
+
+
+def test_search_matches_word_prefixes_across_types(db):
+    add_rice_bowl(db, 200)
+    db.add_meal(meal(1, '2026-01-01', 'Rice and dal'))
+    
+    results = db.search('ric')['results']
+    
+    assert sorted((result['type'], result['name']) for result in results) == [
+        ('ingredient', 'Rice'), ('meal', 'Rice and dal'), ('recipe', 'Rice bowl')]
+
+
+def test_recipes_match_through_ingredient_names(db):
+    add_rice_bowl(db, 200)
+    db.execute("UPDATE recipes SET name = 'Khichdi'")
+    
+    results = db.search('rice', ['recipe'])['results']
+    
+    assert [(result['key'], result['name']) for result in results] == [('rice_bowl', 'Khichdi')]
+
+
+def test_search_text_is_not_fts_syntax(db):
+    db.add_meal(meal(1, '2026-01-01', 'Rice and dal'))
+    
+    assert [result['id'] for result in db.search('rice "dal*')['results']] == [1]
+    # OR is a word to match, not an operator
+    assert db.search('poha OR dal')['results'] == []
+    assert db.search('NEAR(')['results'] == []
+
+
+def test_search_index_follows_meal_updates(db):
+    db.add_meal(meal(1, '2026-01-01', 'Rice and dal'))
+    db.update_meal(1, meal(1, '2026-01-01', 'Poha'))
+    
+    assert db.search('rice')['results'] == []
+    assert [result['name'] for result in db.search('poha')['results']] == ['Poha']
+
+
+def test_search_pages(db):
+    for meal_id in range(1, 4):
+        db.add_meal(meal(meal_id, '2026-01-01', f'Oats {meal_id}'))
+    
+    first = db.search('oats', limit=2)
+    last = db.search('oats', limit=2, offset=2)
+    
+    assert first['hasMore'] and not last['hasMore']
+    assert len({result['id'] for result in first['results'] + last['results']}) == 3
+
+
+def test_catalog_version_changes_on_catalog_writes_only(db):
+    start = db.get_catalog_version()
+    
+    db.add_meal(meal(1, '2026-01-01', 'Oats'))
+    assert db.get_catalog_version() == start
+    
+    add_rice_bowl(db, 200)
+    after_add = db.get_catalog_version()
+    assert after_add > start
+    
+    db.update_ingredient('grains', 'rice', rice(300))
+    assert db.get_catalog_version() > after_add
+
+
+def test_bootstrap_leaves_out_a_current_catalog(db):
+    add_rice_bowl(db, 200)
+    db.add_meal(meal(1, '2026-01-07', 'Oats', calories=300))
+    
+    first = db.get_bootstrap('2026-01-07')
+    again = db.get_bootstrap('2026-01-07', first['catalogVersion'])
+    
+    assert first['catalogChanged'] and 'rice_bowl' in first['recipes']['dishes']
+    assert not again['catalogChanged'] and again['ingredients'] is None and again['recipes'] is None
+    assert [day['date'] for day in again['weeklySummary']] == ['2026-01-07']
+    assert again['dailySummary']['total_calories'] == 300
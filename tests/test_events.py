@@ -0,0 +1,26 @@
+"""
+Tests for the Server-Sent Events broker
+"""
+
+import pytest
+
+from events import EventBroker, TooManySubscribers
+
+
+def test_streams_beyond_the_subscriber_cap_are_refused(db):
+    broker = EventBroker(db, max_subscribers=2)
+    first, second = broker.open_stream(), broker.open_stream()
+    assert broker.subscribers == 2
+    
+    with pytest.raises(TooManySubscribers):
+        broker.open_stream()
+    assert broker.subscribers == 2
+    
+    first.close()
+    assert broker.subscribers == 1
+    third = broker.open_stream()
+    assert next(third).startswith('retry:')
+    
+    second.close()
+    third.close()
+    assert broker.subscribers == 0
@@ -0,0 +1,81 @@
+"""
+Tests for excel_export
+"""
+
+import threading
+
+import pytest
+
+from conftest import meal
+from excel_export import MonthlyWorkbooks, ingredients_text, months_from_request
+
+
+def test_writers_are_not_blocked_while_a_workbook_is_built(db, tmp_path, monkeypatch):
+    pytest.importorskip('openpyxl')
+    for index in range(5):
+        db.add_meal(meal(index + 1, '2026-01-01', f'Meal {index}'))
+    monkeypatch.setattr('excel_export.EXCEL_CHUNK_SIZE', 2)
+    
+    added = []
+    
+    def add_meal():
+        db.add_meal(meal(100 + len(added), '2026-02-01', 'Logged during the export'))
+        added.append(True)
+    
+    original = db.iter_meals
+    
+    def iter_meals(*args, **kwargs):
+        for chunk in original(*args, **kwargs):
+            # Another request writes between chunks of the build
+            writer = threading.Thread(target=add_meal)
+            writer.start()
+            writer.join(2)
+            yield chunk
+        assert len(added) == 3, 'writes blocked while the workbook was being built'
+    
+    monkeypatch.setattr(db, 'iter_meals', iter_meals)
+    result = MonthlyWorkbooks(db, str(tmp_path)).export('2026-01')
+    
+    assert result['meals'] == 5
+
+
+def test_export_is_rebuilt_when_the_month_changes(db, tmp_path):
+    pytest.importorskip('openpyxl')
+    db.add_meal(meal(1, '2026-01-01', 'Oats'))
+    workbooks = MonthlyWorkbooks(db, str(tmp_path))
+    
+    assert workbooks.export('2026-01')['cached'] is False
+    assert workbooks.export('2026-01')['cached'] is True
+    
+    db.add_meal(meal(2, '2026-01-02', 'Dal'))
+    result = workbooks.export('2026-01')
+    assert result['cached'] is False
+    assert result['meals'] == 2
+
+
+def test_a_date_range_exports_every_month_in_it():
+    assert months_from_request({'startDate': '2025-11-15', 'endDate': '2026-01-02'}) == ['2025-11', '2025-12', '2026-01']
+    assert months_from_request({'startDate': '2025-11-15', 'endDate': None}) == ['2025-11']
+
+
+@pytest.mark.parametrize('data', [
+    {'month': 202512},
+    {'month': '2025-13'},
+    {'startDate': 5},
+    {'startDate': '2026-01-01', 'endDate': '2025-12-01'}
+])
+def test_malformed_months_are_rejected(data):
+    with pytest.raises(ValueError):
+        months_from_request(data)
+
+
+@pytest.mark.parametrize('ingredient_data, text', [
+    ({'category': 'grains', 'key': 'basmati_rice', 'measurement': '1_cup', 'quantity': 2}, 'basmati_rice'),
+    ([{'category': 'dairy', 'key': 'curd', 'name': 'Curd', 'measurement': '1_bowl', 'quantity': 1},
+      {'type': 'recipe', 'key': 'dal_tadka', 'name': 'Dal Tadka', 'measurement': 'serving', 'quantity': 1}],
+     'Curd, Dal Tadka'),
+    (None, ''),
+    ('rice', '')
+])
+def test_ingredients_text(ingredient_data, text):
+    assert ingredients_text(ingredient_data) == text
@@ -0,0 +1,32 @@
+"""
+Tests for exporter
+"""
+
+import json
+import threading
+
+from conftest import meal
+from exporter import export_data
+
+
+def test_json_export_reads_catalog_and_meals_in_one_snapshot(db, tmp_path, monkeypatch):
+    db.add_meal(meal(1, '2026-01-01', 'Oats'))
+    original = db.iter_meals
+    writer = threading.Thread(target=lambda: db.add_meal(meal(2, '2026-01-01', 'Logged during the export')))
+    
+    def iter_meals(*args, **kwargs):
+        # Another request writes after the catalog has been read
+        writer.start()
+        writer.join(0.2)
+        yield from original(*args, **kwargs)
+    
+    monkeypatch.setattr(db, 'iter_meals', iter_meals)
+    path = tmp_path / 'export.json'
+    counts = export_data(db, str(path))
+    writer.join(5)
+    
+    with open(path) as f:
+        exported = json.load(f)
+    assert counts['meals'] == 1
+    assert [m['description'] for m in exported['meals']['2026-01-01']] == ['Oats']
+    assert len(db.get_meals_by_date('2026-01-01')) == 2
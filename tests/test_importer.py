@@ -0,0 +1,79 @@
+"""
+Tests for importer
+"""
+
+import io
+
+import pytest
+
+from conftest import meal
+from importer import import_stream
+import json_codec
+
+
+class CountingStream(io.BytesIO):
+    """Binary stream recording the most bytes any one read returned"""
+    
+    largest_read = 0
+    
+    def read(self, size=-1):
+        data = super().read(size)
+        self.largest_read = max(self.largest_read, len(data))
+        return data
+
+
+def document(meals_by_date, **options):
+    return json_codec.dumps_bytes({**options, 'meals': meals_by_date})
+
+
+def test_stream_is_read_incrementally(db):
+    meals = {'2026-01-01': [meal(index + 1, '2026-01-01', f'Meal {index}') for index in range(2000)]}
+    stream = CountingStream(document(meals))
+    
+    report = import_stream(db, stream)
+    
+    assert report['counts']['meals']['inserted'] == 2000
+    assert stream.largest_read < len(stream.getvalue())
+
+
+def test_merge_strategy_listed_before_the_data_is_used(db):
+    db.add_meal(meal(1, '2025-12-31', 'Logged before the import'))
+    body = document({'2026-01-01': [meal(2, '2026-01-01', 'Oats')]}, mergeStrategy='replace')
+    
+    report = import_stream(db, io.BytesIO(body))
+    
+    assert report['mergeStrategy'] == 'replace'
+    assert [row['description'] for row in db.fetch_all('SELECT description FROM meals')] == ['Oats']
+
+
+def test_explicit_merge_strategy_wins(db):
+    db.add_meal(meal(1, '2026-01-01', 'Original'))
+    body = document({'2026-01-01': [meal(1, '2026-01-01', 'Changed')]}, mergeStrategy='merge-duplicates')
+    
+    report = import_stream(db, io.BytesIO(body), 'merge')
+    
+    assert report['counts']['meals']['skipped'] == 1
+    assert db.get_meals_by_date('2026-01-01')[0]['description'] == 'Original'
+
+
+@pytest.mark.parametrize('body', [b'{"mergeStrategy": "overwrite", "meals": {}}', b'{"meals": {"2026-01-01": [1'])
+def test_invalid_documents_raise_value_error(db, body):
+    with pytest.raises(ValueError):
+        import_stream(db, io.BytesIO(body))
+
+
+@pytest.mark.parametrize('body', [b'{"ingredients": [1]}', b'{"recipes": {"dishes": [1]}}',
+                                  b'{"ingredients": {"basic_ingredients": {"grains": 1}}}'])
+def test_sections_that_are_not_objects_raise_value_error(db, body):
+    with pytest.raises(ValueError):
+        import_stream(db, io.BytesIO(body))
+
+
+def test_meal_that_is_not_an_object_is_counted_as_failed(db):
+    body = document({'2026-01-01': [1, meal(2, '2026-01-01', 'Oats')]})
+    
+    report = import_stream(db, io.BytesIO(body))
+    
+    assert report['counts']['meals']['failed'] == 1
+    assert report['counts']['meals']['inserted'] == 1
+    assert report['errors'][0]['error'] == 'Invalid meals: expected an object, got int'
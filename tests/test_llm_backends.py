@@ -0,0 +1,104 @@
+"""
+Tests for the LLM backends and prompt micro-batching
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from llm_backends import BatchingBackend, HTTPBackend, LLMBackend, TemplateBackend
+
+
+class RecordingBackend(TemplateBackend):
+    """Template backend recording the prompts of each batch call"""
+    
+    def __init__(self, latency_ms=0):
+        super().__init__(latency_ms)
+        self.batches = []
+    
+    def generate_batch(self, prompts, timeout=None):
+        self.batches.append(list(prompts))
+        return super().generate_batch(prompts, timeout)
+
+
+@pytest.fixture
+def completions_server():
+    """Local /v1/completions server answering with the choices set on it"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            body = json.dumps({'choices': server.choices}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    server.choices = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_backend_must_implement_generate():
+    with pytest.raises(TypeError):
+        LLMBackend()
+
+
+def test_concurrent_prompts_share_one_batch_call():
+    backend = RecordingBackend()
+    batching = BatchingBackend(backend, window_ms=100)
+    answers = []
+    threads = [threading.Thread(target=lambda i=i: answers.append(batching.generate(f'User question: protein {i}')))
+               for i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    
+    assert len(answers) == 3
+    assert len(backend.batches) == 1 and len(backend.batches[0]) == 3
+
+
+def test_generate_gives_up_after_the_callers_timeout():
+    batching = BatchingBackend(RecordingBackend(latency_ms=500), window_ms=0)
+    
+    start = time.monotonic()
+    with pytest.raises(FutureTimeout):
+        batching.generate('User question: fiber', timeout=0.05)
+    assert time.monotonic() - start < 0.4
+
+
+def test_timed_out_prompt_is_left_out_of_its_batch():
+    backend = RecordingBackend()
+    batching = BatchingBackend(backend, window_ms=300)
+    
+    with pytest.raises(FutureTimeout):
+        batching.generate('User question: dropped', timeout=0.01)
+    assert batching.generate('User question: kept', timeout=5)
+    
+    assert backend.batches == [['User question: kept']]
+
+
+def test_http_backend_returns_completions_in_prompt_order(completions_server):
+    completions_server.choices = [{'index': 1, 'text': 'second'}, {'index': 0, 'text': 'first'}]
+    backend = HTTPBackend(f'http://127.0.0.1:{completions_server.server_port}')
+    
+    assert backend.generate_batch(['a', 'b'], timeout=5) == ['first', 'second']
+
+
+def test_http_backend_raises_when_completions_are_missing(completions_server):
+    completions_server.choices = [{'index': 0, 'text': 'only one'}]
+    backend = HTTPBackend(f'http://127.0.0.1:{completions_server.server_port}')
+    
+    with pytest.raises(ValueError):
+        backend.generate_batch(['a', 'b'], timeout=5)
@@ -0,0 +1,65 @@
+"""
+Tests for the free-text meal parser
+"""
+
+import pytest
+
+from meal_parser import MealParser, meal_ingredient_data
+from nutrition_calculator import NutritionCalculator
+
+
+def nutrition(calories):
+    return {'calories': calories, 'protein': 1, 'carbs': 2, 'fat': 3, 'fiber': 4}
+
+
+@pytest.fixture
+def parser(db):
+    db.add_ingredient('grains', 'rice', {'name': 'Rice', 'measurements': {'100g': nutrition(130)}})
+    db.add_ingredient('dairy', 'curd', {'name': 'Curd', 'measurements': {
+        '1_bowl': nutrition(120), '100g': nutrition(60)
+    }})
+    db.add_recipe('dal_tadka', {'name': 'Dal Tadka', 'servings': 1, 'total_per_serving': nutrition(250)})
+    return MealParser(db, NutritionCalculator(db))
+
+
+def only_line(result):
+    assert len(result['lines']) == 1
+    return result['lines'][0]
+
+
+def test_amount_in_the_measurement_unit_is_scaled(parser):
+    line = only_line(parser.parse('200 g rice'))
+    
+    assert (line['measurement'], line['quantity']) == ('100g', 2)
+    assert line['nutrition']['calories'] == 260
+
+
+def test_unit_missing_from_the_catalog_keeps_the_stated_count(parser):
+    line = only_line(parser.parse('2 bowls of rice'))
+    
+    assert (line['measurement'], line['quantity']) == ('100g', 2)
+    assert line['nutrition']['calories'] == 260
+
+
+def test_named_unit_picks_its_measurement(parser):
+    line = only_line(parser.parse('a bowl of curd'))
+    
+    assert (line['measurement'], line['quantity']) == ('1_bowl', 1)
+
+
+def test_several_items_and_recipes(parser):
+    result = parser.parse('2 bowls curd, dal tadka and some mystery stew')
+    
+    assert [(line['type'], line['name'], line['quantity']) for line in result['lines']] == [
+        ('ingredient', 'Curd', 2), ('recipe', 'Dal Tadka', 1)]
+    assert result['totals']['calories'] == 490
+    assert result['unmatched'] == ['some mystery stew']
+
+
+def test_ingredient_data_uses_the_web_ui_item_shape(parser):
+    items = meal_ingredient_data(parser.parse('2 bowls curd and dal tadka')['lines'])
+    
+    assert items == [
+        {'category': 'dairy', 'key': 'curd', 'name': 'Curd', 'measurement': '1_bowl', 'quantity': 2},
+        {'type': 'recipe', 'key': 'dal_tadka', 'name': 'Dal Tadka', 'measurement': 'serving', 'quantity': 1}
+    ]
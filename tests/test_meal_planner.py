@@ -0,0 +1,66 @@
+"""
+Tests for the meal planner and POST /api/ai/plan
+"""
+
+import pytest
+
+from conftest import meal
+from meal_planner import MealPlanner, merge_targets
+
+
+def add_recipe(db, key, calories, protein, carbs, fat, fiber):
+    db.add_recipe(key, {'name': key.title(), 'category': 'Main', 'servings': 1, 'total_per_serving': {
+        'calories': calories, 'protein': protein, 'carbs': carbs, 'fat': fat, 'fiber': fiber
+    }})
+
+
+@pytest.fixture
+def planner(db):
+    add_recipe(db, 'dal', 300, 18, 40, 8, 10)
+    add_recipe(db, 'paneer', 400, 25, 10, 30, 2)
+    add_recipe(db, 'rice', 250, 5, 55, 1, 1)
+    add_recipe(db, 'salad', 120, 4, 15, 5, 8)
+    return MealPlanner(db)
+
+
+def test_plan_closes_the_remaining_gap(db, planner):
+    db.add_meal(meal(1, '2026-01-01', 'Breakfast', calories=1200))
+    empty = planner.plan('2026-01-01', max_items=0)
+    
+    result = planner.plan('2026-01-01', budget_ms=200)
+    
+    assert result['plan']
+    assert result['score'] < empty['score']
+    assert all(item['servings'] <= 2 for item in result['plan'])
+    assert result['projected']['calories'] == pytest.approx(
+        1200 + sum(item['nutrition']['calories'] for item in result['plan']))
+
+
+def test_target_overrides_are_merged_with_the_defaults():
+    targets = merge_targets({'protein': {'min': 120}})
+    
+    assert targets['protein']['min'] == 120
+    assert targets['protein']['max'] == 175
+    assert targets['calories'] == {'min': 1800, 'max': 2400}
+
+
+@pytest.mark.parametrize('targets', [
+    {'protein': 60},
+    {'protein': [60, 120]},
+    {'protein': {'min': '60'}},
+    {'protein': {'min': True}},
+    {'protein': {'low': 60}},
+    {'protein': {'min': 200, 'max': 100}},
+    {'sugar': {'max': 30}},
+    ['protein']
+])
+def test_malformed_targets_are_rejected(planner, targets):
+    with pytest.raises(ValueError):
+        planner.plan('2026-01-01', targets)
+
+
+def test_plan_route_rejects_bare_number_target(client):
+    response = client.post('/api/ai/plan', json={'date': '2026-01-01', 'targets': {'protein': 60}})
+    
+    assert response.status_code == 400
+    assert 'targets.protein' in response.get_json()['error']
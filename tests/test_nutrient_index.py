@@ -0,0 +1,105 @@
+"""
+Tests for the nutrient density index
+"""
+
+import random
+
+import pytest
+
+from db_service import NUTRIENTS
+from nutrient_index import NutrientDensityIndex
+
+
+def random_nutrition(rng):
+    return {n: rng.choice([0, 1, 2, 5, 10, round(rng.uniform(0, 60), 2)]) for n in NUTRIENTS}
+
+
+def add_ingredients(db, rng, count):
+    """Ingredients with one random measurement each; returns their nutrition by key"""
+    catalog = {}
+    with db.transaction():
+        for number in range(count):
+            catalog[f'item{number}'] = random_nutrition(rng)
+            db.add_ingredient('other', f'item{number}', {'name': f'Item {number}',
+                                                         'measurements': {'serving': catalog[f'item{number}']}})
+    return catalog
+
+
+def brute_force_scores(catalog, nutrients, gaps, k):
+    """Scores of the k best items found by scoring every item, which top_k must match"""
+    scores = [round(sum(min(nutrition[n], gaps[n]) / gaps[n] for n in nutrients if gaps[n] > 0), 3)
+              for nutrition in catalog.values()]
+    return sorted(scores, reverse=True)[:k]
+
+
+def random_queries(rng, count):
+    for _ in range(count):
+        nutrients = rng.sample(NUTRIENTS, rng.randint(1, 3))
+        yield nutrients, {n: rng.choice([0, 1, 5, 25, 100]) for n in nutrients}, rng.randint(1, 20)
+
+
+def recipe(name, calories, protein):
+    return {'name': name, 'servings': 1, 'total_per_serving': {
+        'calories': calories, 'protein': protein, 'carbs': 10, 'fat': 5, 'fiber': 2
+    }}
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_top_k_matches_a_full_scan(db, seed):
+    rng = random.Random(seed)
+    catalog = add_ingredients(db, rng, 300)
+    index = NutrientDensityIndex(db)
+    index.build()
+    
+    for nutrients, gaps, k in random_queries(rng, 50):
+        result = index.top_k(nutrients, gaps, k)
+        assert [item['score'] for item in result] == brute_force_scores(catalog, nutrients, gaps, k)
+
+
+def test_incremental_updates_match_a_rebuild(db):
+    rng = random.Random(7)
+    catalog = add_ingredients(db, rng, 100)
+    index = NutrientDensityIndex(db)
+    db.add_change_listener(index.handle_change)
+    index.build()
+    
+    for number in rng.sample(range(100), 30):
+        key = f'item{number}'
+        if number % 3:
+            catalog[key] = random_nutrition(rng)
+            db.update_ingredient('other', key, {'name': f'Item {number}', 'measurements': {'serving': catalog[key]}})
+        else:
+            del catalog[key]
+            db.delete_ingredient('other', key)
+    
+    rebuilt = NutrientDensityIndex(db)
+    rebuilt.build()
+    assert len(index) == len(rebuilt) == len(catalog)
+    for nutrients, gaps, k in random_queries(rng, 50):
+        expected = brute_force_scores(catalog, nutrients, gaps, k)
+        assert [item['score'] for item in index.top_k(nutrients, gaps, k)] == expected
+        assert [item['score'] for item in rebuilt.top_k(nutrients, gaps, k)] == expected
+
+
+def test_rankings_follow_recipe_changes(db):
+    index = NutrientDensityIndex(db)
+    db.add_change_listener(index.handle_change)
+    db.add_recipe('dal', recipe('Dal', 200, 12))
+    index.build()
+    assert [item['key'] for item in index.top_k(['protein'], {'protein': 50}, 2)] == ['dal']
+    
+    db.add_recipe('paneer', recipe('Paneer', 300, 20))
+    assert [item['key'] for item in index.top_k(['protein'], {'protein': 50}, 2)] == ['paneer', 'dal']
+    
+    db.update_recipe('dal', recipe('Dal', 200, 30))
+    assert [item['key'] for item in index.top_k(['protein'], {'protein': 50}, 2)] == ['dal', 'paneer']
+    
+    db.delete_recipe('dal')
+    assert [item['key'] for item in index.top_k(['protein'], {'protein': 50}, 2)] == ['paneer']
+
+
+@pytest.mark.parametrize('gaps', [{'protein': '20'}, {'protein': None}, {'protein': True}, [20]])
+def test_recommendations_route_rejects_non_numeric_gaps(client, gaps):
+    response = client.post('/api/ai/recommendations', json={'deficientNutrients': ['protein'], 'gaps': gaps})
+    
+    assert response.status_code == 400
@@ -0,0 +1,55 @@
+"""
+Tests for the batch nutrition calculator
+"""
+
+import pytest
+
+from nutrition_calculator import NutritionCalculator
+
+
+@pytest.fixture
+def calculator(db):
+    db.add_ingredient('grains', 'rice', {'name': 'Rice', 'measurements': {
+        '1 cup': {'calories': 200, 'protein': 4, 'carbs': 44, 'fat': 0.5, 'fiber': 1}
+    }})
+    db.add_recipe('dal', {'name': 'Dal', 'servings': 2, 'total_per_serving': {
+        'calories': 150, 'protein': 9, 'carbs': 20, 'fat': 4, 'fiber': 5
+    }})
+    return NutritionCalculator(db)
+
+
+def test_ingredient_and_recipe_lines_are_totalled(calculator):
+    result = calculator.calculate([
+        {'ingredientKey': 'grains.rice', 'measurement': '1 cup', 'quantity': 1.5},
+        {'recipeKey': 'dal', 'servings': 2}
+    ])
+    
+    assert result['errors'] == 0
+    assert result['lines'][0]['nutrition']['calories'] == 300
+    assert result['totals']['calories'] == 600
+    assert result['totals']['protein'] == 24
+
+
+@pytest.mark.parametrize('line', [
+    {'recipeKey': ['dal']},
+    {'recipeKey': {'key': 'dal'}},
+    {'ingredientKey': ['grains.rice'], 'measurement': '1 cup'},
+    {'ingredientKey': 'rice', 'category': ['grains'], 'measurement': '1 cup'},
+    {'ingredientKey': 'grains.rice', 'measurement': {'cup': 1}},
+    {'recipeKey': 'dal', 'servings': True},
+    {'ingredientKey': 'grains.rice', 'measurement': '1 cup', 'quantity': False},
+    {'ingredientKey': 'grains.rice', 'measurement': '1 cup', 'quantity': -1},
+    'rice'
+])
+def test_malformed_line_is_reported_without_failing_the_batch(calculator, line):
+    result = calculator.calculate([line, {'recipeKey': 'dal'}])
+    
+    assert result['errors'] == 1
+    assert 'error' in result['lines'][0]
+    assert result['totals']['calories'] == 150
+
+
+def test_bare_ingredient_key_resolves_when_unambiguous(calculator):
+    result = calculator.calculate([{'ingredientKey': 'rice', 'measurement': '1 cup'}])
+    
+    assert result['totals']['calories'] == 200
@@ -0,0 +1,61 @@
+"""
+Tests for the recipe similarity index
+"""
+
+import time
+
+import pytest
+
+import recipe_similarity
+from recipe_similarity import RecipeVectorIndex
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def index(request, db, monkeypatch):
+    """Index over a small catalog, on the numpy path and the pure Python fallback"""
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(recipe_similarity, 'np', None)
+    
+    add_recipe(db, 'dal', 300, 18, 40, 8, 10)
+    add_recipe(db, 'chana', 320, 19, 42, 9, 11)
+    add_recipe(db, 'paneer', 400, 25, 10, 30, 2)
+    add_recipe(db, 'rice', 250, 5, 55, 1, 1)
+    index = RecipeVectorIndex(db)
+    db.add_change_listener(index.handle_change)
+    index.build()
+    return index
+
+
+def add_recipe(db, key, calories, protein, carbs, fat, fiber, update=False):
+    data = {'name': key.title(), 'category': 'Main', 'servings': 1, 'total_per_serving': {
+        'calories': calories, 'protein': protein, 'carbs': carbs, 'fat': fat, 'fiber': fiber
+    }}
+    (db.update_recipe if update else db.add_recipe)(key, data)
+
+
+def similar_keys(index, key, **options):
+    return [item['key'] for item in index.similar(key, **options)['similar']]
+
+
+def test_closest_macro_profile_ranks_first(index):
+    assert similar_keys(index, 'dal', limit=1) == ['chana']
+
+
+def test_more_and_less_filters(index):
+    assert similar_keys(index, 'dal', more=['fat']) == ['chana', 'paneer']
+    assert similar_keys(index, 'dal', less=['protein', 'fat']) == ['rice']
+
+
+def test_unknown_recipe(index):
+    assert index.similar('nope') is None
+
+
+def test_recipe_changes_are_picked_up_in_the_background(db, index):
+    add_recipe(db, 'rice', 300, 18, 40, 8, 10, update=True)
+    
+    deadline = time.monotonic() + 5
+    while similar_keys(index, 'dal', limit=1) != ['rice'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert similar_keys(index, 'dal', limit=1) == ['rice']
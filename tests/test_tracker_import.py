@@ -0,0 +1,57 @@
+"""
+Tests for tracker_import
+"""
+
+import csv
+
+from conftest import meal
+from tracker_import import import_trackers
+
+
+HEADINGS = ['Date', 'Time', 'Meal Type', 'Meal Description', 'Calories',
+            'Protein (g)', 'Carbs (g)', 'Fat (g)', 'Fiber (g)', 'Source', 'Ingredients']
+
+
+def write_tracker(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADINGS)
+        writer.writerows(rows)
+    return str(path)
+
+
+def meal_descriptions(db):
+    return sorted(row['description'] for row in db.fetch_all('SELECT description FROM meals'))
+
+
+def test_replace_keeps_meals_from_every_file(db, tmp_path):
+    db.add_meal(meal(1, '2025-11-30', 'Logged before the import'))
+    first = write_tracker(tmp_path / 'a.csv', [['2026-01-01', '08:00', 'Breakfast', 'Oats', 300, 10, 50, 5, 8, 'Custom', '']])
+    second = write_tracker(tmp_path / 'b.csv', [['2026-01-02', '13:00', 'Lunch', 'Dal', 400, 20, 60, 8, 9, 'Custom', '']])
+    
+    report = import_trackers(db, [first, second], merge_strategy='replace', workers=1)
+    
+    assert meal_descriptions(db) == ['Dal', 'Oats']
+    assert report['counts']['inserted'] == 2
+
+
+def test_replace_with_parallel_parsing(db, tmp_path):
+    db.add_meal(meal(1, '2025-11-30', 'Logged before the import'))
+    paths = [write_tracker(tmp_path / f'{day}.csv', [[f'2026-01-0{day}', '08:00', 'Breakfast', f'Meal {day}',
+                                                      100, 1, 1, 1, 1, 'Custom', '']])
+             for day in range(1, 4)]
+    
+    report = import_trackers(db, paths, merge_strategy='replace', workers=2)
+    
+    assert meal_descriptions(db) == ['Meal 1', 'Meal 2', 'Meal 3']
+    assert report['importedCount'] == 3
+
+
+def test_reimport_skips_meals_already_imported(db, tmp_path):
+    path = write_tracker(tmp_path / 'a.csv', [['2026-01-01', '08:00', 'Breakfast', 'Oats', 300, 10, 50, 5, 8, 'Custom', '']])
+    
+    import_trackers(db, [path], workers=1)
+    report = import_trackers(db, [path], workers=1)
+    
+    assert report['counts']['skipped'] == 1
+    assert meal_descriptions(db) == ['Oats']
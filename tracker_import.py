@@ -0,0 +1,289 @@
+"""
+Tracker Import for Food Tracker
+Loads monthly tracker workbooks (XLSX, one sheet per day) and tracker CSVs
+into the meals table, parsing several files in parallel
+"""
+
+import csv
+import hashlib
+import os
+import re
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date as Date, datetime, time as Time, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from db_service import DatabaseService, NUTRIENTS
+from excel_export import SOURCE_LABELS
+from importer import Importer, IMPORT_BATCH_SIZE, MAX_REPORTED_ERRORS
+
+
+TRACKER_EXTENSIONS = ('.xlsx', '.csv')
+
+# Column headings, lowercased, and the meal field each one holds. Covers the
+# tracker workbooks, tracker CSVs (the same columns plus Date) and meal CSVs
+# written by `cli.py export`.
+COLUMNS = {
+    'date': 'date', 'time': 'time', 'timestamp': 'timestamp',
+    'meal type': 'mealType', 'mealtype': 'mealType',
+    'meal description': 'description', 'description': 'description',
+    'calories': 'calories', 'protein (g)': 'protein', 'protein': 'protein',
+    'carbs (g)': 'carbs', 'carbs': 'carbs', 'fat (g)': 'fat', 'fat': 'fat',
+    'fiber (g)': 'fiber', 'fiber': 'fiber', 'source': 'source'
+}
+
+SOURCES = {label: source for source, label in SOURCE_LABELS.items()}
+
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+TITLE_DATE = re.compile(r'([A-Z][a-z]+ \d{1,2}, \d{4})')
+
+# Meals logged without a time are placed at midday, so the timestamp stays on
+# the same date in any timezone
+DEFAULT_TIME = '12:00'
+
+# Generated meal ids lie in [2^52, 2^53): above millisecond timestamps, the
+# ids the app assigns, and below the largest integer JavaScript keeps exact
+GENERATED_ID_BASE = 1 << 52
+
+
+def find_tracker_files(paths: List[str]) -> List[str]:
+    """Tracker files among paths, expanding directories to the files they hold"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.lower().endswith(TRACKER_EXTENSIONS) and not name.startswith(('.', '~$'))))
+        else:
+            files.append(path)
+    return files
+
+
+def _text(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, Time)):
+        return value.strftime('%H:%M')
+    return str(value).strip()
+
+
+def _number(value, heading: str) -> float:
+    if value is None or value == '':
+        return 0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{heading} is not a number: {value!r}')
+
+
+def sheet_date(name: str, title: str) -> Optional[str]:
+    """Date a day sheet covers, from its name or its '📅 Wednesday, December 3, 2025' title"""
+    if DATE_PATTERN.match(name):
+        return name
+    match = TITLE_DATE.search(title or '')
+    if match:
+        return datetime.strptime(match.group(1), '%B %d, %Y').strftime('%Y-%m-%d')
+    return None
+
+
+def local_timestamp(date: str, clock: str) -> str:
+    """UTC ISO timestamp for a date and HH:MM in server local time"""
+    moment = datetime.strptime(f'{date} {clock or DEFAULT_TIME}', '%Y-%m-%d %H:%M').astimezone()
+    return moment.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def meal_from_tracker_row(row: Dict, date: Optional[str] = None) -> Optional[Dict]:
+    """Meal in add_meal shape from a row keyed by meal field, or None for title,
+    blank and daily total rows.
+    
+    Nutrition comes from the row. The Ingredients column only names what
+    was in the meal, so it is not turned back into ingredient data.
+    """
+    description = _text(row.get('description'))
+    source = _text(row.get('source'))
+    if not description or source == 'SUMMARY' or description.startswith(('📅', '📊')):
+        return None
+    
+    if isinstance(row.get('date'), (datetime, Date)):
+        date = row['date'].strftime('%Y-%m-%d')
+    else:
+        date = _text(row.get('date')) or date
+    if not date or not DATE_PATTERN.match(date):
+        raise ValueError(f'Missing or invalid date for {description!r}')
+    
+    clock = _text(row.get('time'))[:5]
+    return {
+        'description': description,
+        'mealType': _text(row.get('mealType')),
+        'date': date,
+        'timestamp': _text(row.get('timestamp')) or local_timestamp(date, clock),
+        'source': SOURCES.get(source, source),
+        'nutrition': {nutrient: _number(row.get(nutrient), nutrient) for nutrient in NUTRIENTS},
+        'ingredient_data': None
+    }
+
+
+def _fields(headings) -> Dict[int, str]:
+    """Column index to meal field for a header row"""
+    return {index: COLUMNS[_text(heading).lower()] for index, heading in enumerate(headings)
+            if _text(heading).lower() in COLUMNS}
+
+
+def iter_xlsx_rows(path: str) -> Iterator[Tuple[Dict, Optional[str]]]:
+    """(row, sheet date) pairs from a tracker workbook, read in read-only mode
+    so rows are streamed from the file instead of loaded as a whole"""
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            fields = _fields(next(rows, ()))
+            if 'description' not in fields.values():
+                continue
+            date = sheet_date(sheet.title, '')
+            for values in rows:
+                row = {fields[index]: value for index, value in enumerate(values) if index in fields}
+                if date is None and _text(row.get('description')).startswith('📅'):
+                    date = sheet_date(sheet.title, row['description'])
+                yield row, date
+    finally:
+        workbook.close()
+
+
+def iter_csv_rows(path: str) -> Iterator[Tuple[Dict, Optional[str]]]:
+    """(row, None) pairs from a tracker CSV; each row carries its own date"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        fields = _fields(next(reader, ()))
+        for values in reader:
+            yield {fields[index]: value for index, value in enumerate(values) if index in fields}, None
+
+
+def parse_tracker(path: str) -> Dict:
+    """Meals from one tracker file, with row counts and row errors.
+    
+    Runs in a worker process when several files are imported, so it only
+    takes and returns plain data.
+    """
+    start = time.perf_counter()
+    rows = iter_csv_rows(path) if path.lower().endswith('.csv') else iter_xlsx_rows(path)
+    meals, errors, skipped, invalid = [], [], 0, 0
+    for number, (row, date) in enumerate(rows, 1):
+        try:
+            meal = meal_from_tracker_row(row, date)
+        except ValueError as error:
+            invalid += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({'entity': 'rows', 'key': str(number), 'error': str(error)})
+            continue
+        if meal is None:
+            skipped += 1
+        else:
+            meals.append(meal)
+    
+    return {'path': path, 'meals': meals, 'rows': len(meals) + skipped + invalid,
+            'skippedRows': skipped, 'invalidRows': invalid, 'errors': errors,
+            'parseSeconds': round(time.perf_counter() - start, 3)}
+
+
+def _fingerprint(meal: Dict) -> Tuple:
+    # Times are left out: a workbook written in another timezone shows the
+    # same meals at different times
+    return meal['date'], meal['mealType'], meal['description'], round(meal['nutrition']['calories'] or 0, 1)
+
+
+def tracker_records(db: DatabaseService, meals: List[Dict]) -> Iterator[Tuple[str, int, Dict]]:
+    """Import records for parsed meals, with ids that make re-imports dedupe.
+    
+    A row matching a meal already logged (same date, meal type, description
+    and calories) takes that meal's id, timestamp and ingredient data, which
+    a tracker only holds to the minute and by name; other rows get an id
+    derived from their content, so importing the same tracker twice finds
+    them again. Repeated identical rows on one day are told apart by their
+    order.
+    """
+    if not meals:
+        return
+    existing = defaultdict(list)
+    dates = [meal['date'] for meal in meals]
+    for date_meals in db.get_meals_by_date_range(min(dates), max(dates)).values():
+        for meal in date_meals:
+            existing[_fingerprint(meal)].append(meal)
+    
+    occurrences = defaultdict(int)
+    for meal in meals:
+        fingerprint = _fingerprint(meal)
+        occurrence = occurrences[fingerprint]
+        occurrences[fingerprint] += 1
+        if occurrence < len(existing[fingerprint]):
+            logged = existing[fingerprint][occurrence]
+            yield 'meals', logged['id'], {**meal, 'id': logged['id'], 'timestamp': logged['timestamp'],
+                                          'ingredient_data': logged['ingredient_data']}
+        else:
+            digest = hashlib.blake2b(repr((fingerprint, occurrence)).encode(), digest_size=8).digest()
+            meal_id = GENERATED_ID_BASE | (int.from_bytes(digest, 'big') & (GENERATED_ID_BASE - 1))
+            yield 'meals', meal_id, {**meal, 'id': meal_id}
+
+
+def tracker_source(path: str) -> str:
+    """Import progress key for a tracker file, which changes when the file does"""
+    stat = os.stat(path)
+    return f'tracker:{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}'
+
+
+def import_trackers(db: DatabaseService, paths: List[str], merge_strategy: str = 'merge',
+                    batch_size: int = IMPORT_BATCH_SIZE, workers: Optional[int] = None,
+                    restart: bool = False) -> Dict:
+    """Import tracker workbooks and CSVs and return per-file and total counts.
+    
+    Files are parsed in a process pool when there are several, while the
+    main process writes each one, in file order, through the batched
+    Importer. An interrupted import of an unchanged file resumes where it
+    stopped unless restart is set.
+    
+    'replace' clears meals once for the whole set of files, before the
+    first one is written; the files are then imported as merge-duplicates,
+    so later files don't wipe the meals earlier ones imported.
+    """
+    start = time.perf_counter()
+    paths = find_tracker_files(paths)
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    sources = {path: tracker_source(path) for path in paths}
+    if restart:
+        for source in sources.values():
+            db.delete_import_progress(source)
+    
+    if merge_strategy == 'replace':
+        # A resumed import has already cleared meals and committed some files
+        if not any(db.get_import_progress(source) for source in sources.values()):
+            with db.transaction():
+                db.delete_all_meals()
+        merge_strategy = 'merge-duplicates'
+    
+    def write(parsed: Dict) -> Dict:
+        source = sources[parsed['path']]
+        report = Importer(db, merge_strategy, batch_size, source).run(tracker_records(db, parsed['meals']))
+        parsed_counts = {key: parsed[key] for key in ('path', 'rows', 'skippedRows', 'invalidRows', 'parseSeconds')}
+        return {**parsed_counts, **report, 'counts': report['counts']['meals'],
+                'errors': parsed['errors'] + report['errors']}
+    
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            files = [write(parsed) for parsed in pool.map(parse_tracker, paths)]
+    else:
+        files = [write(parse_tracker(path)) for path in paths]
+    
+    elapsed = time.perf_counter() - start
+    rows = sum(report['rows'] for report in files)
+    counts = {outcome: sum(report['counts'][outcome] for report in files)
+              for outcome in ('inserted', 'updated', 'skipped', 'failed')}
+    return {
+        'files': files,
+        'rows': rows,
+        'counts': counts,
+        'importedCount': counts['inserted'] + counts['updated'],
+        'workers': workers,
+        'elapsedSeconds': round(elapsed, 3),
+        'rowsPerSecond': round(rows / elapsed) if elapsed else 0
+    }